@@ -1,169 +1,132 @@
 import streamlit as st
-import pandas as pd
-import requests
-from docx import Document
-from docx.shared import Pt, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
 import os
 from datetime import datetime
-import io
-import PyPDF2
-from PIL import Image
-import pytesseract
-
-# Set path Tesseract untuk Windows
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-
-# Konfigurasi API OpenAI (AMAN melalui secrets)
-OPENAI_API_KEY = st.secrets["openai"]["api_key"]
-OPENAI_MODEL = "gpt-4o"  # atau "gpt-4o-mini" jika ingin lebih hemat
-
-# Konfigurasi halaman
-st.set_page_config(
-    page_title="Rapport Writer Assistance",
-    page_icon="📊",
-    layout="wide"
-)
-
-# Fungsi untuk normalisasi nama HSH
-def normalize_hsh(hsh_name):
-    if pd.isna(hsh_name):
-        return ""
-    normalized = str(hsh_name).strip().upper()
-    normalized = ' '.join(normalized.split())
-    return normalized
-
-def find_matching_hsh(target_hsh, hsh_list):
-    target_normalized = normalize_hsh(target_hsh)
-    for hsh in hsh_list:
-        if normalize_hsh(hsh) == target_normalized:
-            return hsh
-    for hsh in hsh_list:
-        normalized = normalize_hsh(hsh)
-        if target_normalized in normalized or normalized in target_normalized:
-            return hsh
-    return None
-
-@st.cache_data
+import uuid
+import json
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from text_chunker import estimate_tokens, split_text
+from section_graph import prompt_inputs
+# SECTION_WORKERS, set_rate_limiter, context var, dan read_uploaded_files diekspor ulang untuk
+# batch_report dan job_worker
+from section_runtime import (SECTION_WORKERS, METRICS_PATH, notify, streaming_disabled, force_refresh_var,
+                             session_id_var, get_metrics, run_sections_concurrently, is_error_result)
+from llm_service import OPENAI_MODEL, SYSTEM_PROMPT, call_openai, set_rate_limiter, get_llm_cache
+from upload_extraction import UPLOAD_TYPES, get_extraction_cache, read_uploaded_files
+from job_queue import ACTIVE_STATUSES, JOB_TTL_HOURS, JOB_WORKERS, JobQueue, start_worker_process
+from report_archive import ReportArchive
+
+# Modul berat (pandas, python-docx, PyPDF2, PIL/pytesseract, openpyxl, requests) baru di-import saat
+# pertama dipakai agar cold start dan rerun UI tidak menunggu library yang belum diperlukan
+
+# Analisis Strategi & Program Budaya digabung dalam satu panggilan LLM (dokumen PCB dikirim sekali)
+COMBINED_PCB_ANALYSIS = os.environ.get("RAPPORT_COMBINED_PCB", "1") == "1"
+
+# Dokumen PCB/Impact di atas DOC_TOKEN_BUDGET dianalisis map-reduce: dipotong per CHUNK_TOKENS,
+# tiap potongan diringkas paralel (CHUNK_WORKERS), lalu ringkasannya dianalisis dengan format biasa
+DOC_TOKEN_BUDGET = int(os.environ.get("RAPPORT_DOC_TOKEN_BUDGET", "60000"))
+CHUNK_TOKENS = int(os.environ.get("RAPPORT_CHUNK_TOKENS", "20000"))
+CHUNK_WORKERS = int(os.environ.get("RAPPORT_CHUNK_WORKERS", "4"))
+CHUNK_MAX_COUNT = int(os.environ.get("RAPPORT_CHUNK_MAX_COUNT", "40"))
+# Catatan per potongan dibatasi CHUNK_NOTES_MAX_TOKENS; catatan yang masih melebihi DOC_TOKEN_BUDGET
+# diringkas ulang paling banyak CHUNK_MAX_ROUNDS putaran, sisanya dipotong
+CHUNK_NOTES_MAX_TOKENS = 1500
+CHUNK_MAX_ROUNDS = int(os.environ.get("RAPPORT_CHUNK_MAX_ROUNDS", "3"))
+if CHUNK_TOKENS < 4 * CHUNK_NOTES_MAX_TOKENS:
+    # Potongan yang tidak jauh lebih besar dari catatannya tidak mengecil di setiap putaran
+    raise ValueError(f"RAPPORT_CHUNK_TOKENS ({CHUNK_TOKENS}) minimal {4 * CHUNK_NOTES_MAX_TOKENS} "
+                     f"(4x batas catatan per potongan)")
+
+# Jumlah kejadian metrik terakhir yang diringkas di panel debug (dibaca dari akhir file)
+METRICS_PANEL_EVENTS = int(os.environ.get("RAPPORT_METRICS_PANEL_EVENTS", "5000"))
+
+# Interval UI memeriksa progres job yang sedang berjalan (detik)
+JOB_POLL_SECONDS = float(os.environ.get("RAPPORT_JOB_POLL_SECONDS", "2"))
+
+# Mode streaming (server-sent events) untuk menampilkan teks di tab selagi dihasilkan
+STREAM_OUTPUT = os.environ.get("RAPPORT_STREAM_OUTPUT", "1") == "1"
+
 def load_excel_files():
+    """Data referensi bersama (ReferenceData, bisa di-unpack jadi 4 DataFrame); jangan diubah."""
     try:
-        skor_total = pd.read_excel('documents/SKOR_TOTAL_ALL.xlsx', sheet_name='SKOR TOTAL_ALL')
-        skor_survei = pd.read_excel('documents/Skor_SURVEI_ALL.xlsx', sheet_name='Skor_SURVEI_ALL_FUNGSI')
-        skor_benchmark_evidence = pd.read_excel('documents/Skor_benchmark.xlsx', sheet_name='Evidence')
-        skor_benchmark_survei = pd.read_excel('documents/Skor_benchmark.xlsx', sheet_name='Survei')
-        
-        if 'HSH' in skor_total.columns:
-            skor_total['HSH_normalized'] = skor_total['HSH'].apply(normalize_hsh)
-        if 'HSH' in skor_survei.columns:
-            skor_survei['HSH_normalized'] = skor_survei['HSH'].apply(normalize_hsh)
-        
-        skor_benchmark_evidence['HSH_normalized'] = skor_benchmark_evidence.iloc[:, 0].apply(normalize_hsh)
-        skor_benchmark_survei['HSH_normalized'] = skor_benchmark_survei.iloc[:, 0].apply(normalize_hsh)
-        
-        return skor_total, skor_survei, skor_benchmark_evidence, skor_benchmark_survei
+        from reference_data import get_reference_data
+        return get_reference_data()
     except Exception as e:
         st.error(f"Error loading Excel files: {str(e)}")
         st.info("Pastikan folder 'documents' ada dan berisi file: SKOR_TOTAL_ALL.xlsx, Skor_SURVEI_ALL.xlsx, dan Skor_benchmark.xlsx")
         return None, None, None, None
 
-def extract_text_from_pdf(pdf_file):
-    try:
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text
-    except Exception as e:
-        return f"Error reading PDF: {str(e)}"
-
-def extract_text_from_image(image_file):
-    try:
-        image = Image.open(image_file)
-        text = pytesseract.image_to_string(image, lang='ind+eng')
-        return text
-    except Exception as e:
-        return f"Error reading image: {str(e)}"
-
-def read_uploaded_file(uploaded_file):
-    if uploaded_file is None:
-        return None
-    
-    file_extension = uploaded_file.name.split('.')[-1].lower()
-    
-    try:
-        if file_extension in ['xlsx', 'xls']:
-            df = pd.read_excel(uploaded_file)
-            return df.to_string()
-        elif file_extension == 'pdf':
-            return extract_text_from_pdf(uploaded_file)
-        elif file_extension in ['png', 'jpg', 'jpeg']:
-            return extract_text_from_image(uploaded_file)
-        else:
-            return "Format file tidak didukung"
-    except Exception as e:
-        return f"Error reading file: {str(e)}"
-
-# Fungsi untuk memanggil OpenAI API
-def call_openai(prompt, max_tokens=4500):
-    """Memanggil OpenAI API untuk analisis"""
-    try:
-        headers = {
-            "Authorization": f"Bearer {OPENAI_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        data = {
-            "model": OPENAI_MODEL,
-            "messages": [
-                {
-                    "role": "system",
-                    "content": """Anda adalah konsultan senior budaya kerja perusahaan yang berpengalaman dengan pendekatan apresiatif dan profesional. 
-
-TONE & GAYA KOMUNIKASI:
-- Gunakan bahasa yang apresiatif, menghargai usaha yang telah dilakukan
-- Profesional namun hangat dan mendukung
-- Fokus pada kekuatan (strength-based approach) sebelum memberikan saran perbaikan
-- Hindari kata-kata negatif atau menghakimi
-- Gunakan frasa seperti "telah menunjukkan komitmen yang baik", "dapat lebih dioptimalkan", "peluang untuk pengembangan lebih lanjut"
-- Berikan apresiasi spesifik terhadap pencapaian yang ada
-
-FOKUS ANALISIS:
-- Fokus pada aspek PERILAKU (behavior): perubahan mindset, kolaborasi, komunikasi, kepemimpinan, keterlibatan, partisipasi
-- Hindari aspek teknis operasional
-- Berikan analisis yang singkat, padat, jelas, dan actionable
-- Setiap poin harus spesifik dan dapat ditindaklanjuti
-
-FORMAT OUTPUT:
-- Mulai dengan apresiasi umum
-- "Hal yang Sudah Baik" harus spesifik dan menghargai pencapaian
-- "Hal yang Dapat Diperbaiki" disampaikan sebagai peluang pengembangan, bukan kritik"""
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            "temperature": 0.3,
-            "max_completion_tokens": max_tokens  # ✅ DIPERBAIKI: max_tokens → max_completion_tokens
-        }
-        # ✅ DIPERBAIKI: hapus spasi ekstra di URL
-        response = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=data, timeout=60)
-        if response.status_code == 200:
-            result = response.json()
-            return result['choices'][0]['message']['content']
-        else:
-            return f"Error calling OpenAI API: {response.status_code} - {response.text}"
-    except Exception as e:
-        return f"Exception in OpenAI API call: {str(e)}"
-
 # === Fungsi Analisis (semua menggunakan call_openai) ===
 
-def analyze_strategi_budaya(pcb_content):
-    prompt = f"""
-Analisis form PCB berikut dengan pendekatan APRESIATIF dan PROFESIONAL, fokus pada aspek PERILAKU:
-
-{pcb_content}
-
-EVALUASI:
+CHUNK_NOTES_PROMPT = """Berikut bagian {index} dari {count} dokumen {doc_label} yang terlalu panjang untuk dianalisis sekaligus.
+Catat secara ringkas dan faktual semua informasi penting dari bagian ini sebagai poin-poin:
+- Goals, Business Initiatives, kendala/Peluang Perbaikan Bisnis, dan improvement
+- Program budaya (One Hour Meeting, ONE Action, ONE KOLAB) beserta judul dan deliverables
+- Kondisi sebelum dan sesudah, angka, dan capaian
+- Indikasi perubahan PERILAKU: kolaborasi, komunikasi, kepemimpinan, keterlibatan, mindset, nilai AKHLAK
+
+Jangan memberi penilaian atau saran; hanya catatan isi dokumen.
+
+{chunk}"""
+
+def summarize_chunks(chunks, doc_label):
+    """Tahap map: catatan per potongan dokumen, dijalankan paralel; urutan hasil sesuai urutan potongan."""
+    def summarize(index, chunk):
+        prompt = CHUNK_NOTES_PROMPT.format(index=index + 1, count=len(chunks), doc_label=doc_label, chunk=chunk)
+        return call_openai(prompt, max_tokens=CHUNK_NOTES_MAX_TOKENS)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(CHUNK_WORKERS, len(chunks)))) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, summarize, index, chunk)
+                   for index, chunk in enumerate(chunks)]
+        notes = [future.result() for future in futures]
+    for note in notes:
+        if is_error_result(note):
+            raise RuntimeError(f"Gagal meringkas potongan dokumen {doc_label}: {note}")
+    return notes
+
+def condense_document(content, doc_label):
+    """Dokumen yang melebihi DOC_TOKEN_BUDGET diganti dengan catatan per bagian (map-reduce).
+
+    Jika gabungan catatan masih terlalu besar, catatan diringkas lagi (bertingkat, paling banyak
+    CHUNK_MAX_ROUNDS putaran; setelah itu catatan dipotong ke DOC_TOKEN_BUDGET).
+    """
+    if content is None:
+        return None
+    tokens = estimate_tokens(content)
+    if tokens <= DOC_TOKEN_BUDGET:
+        return content
+    chunks = split_text(content, CHUNK_TOKENS)
+    notify('info', f"ℹ️ Dokumen {doc_label} besar (~{tokens:,} token), dianalisis bertahap dalam {len(chunks)} bagian.")
+    truncated = len(chunks) > CHUNK_MAX_COUNT
+    if truncated:
+        notify('warning', f"⚠️ Hanya {CHUNK_MAX_COUNT} bagian pertama dokumen {doc_label} yang dianalisis.")
+        chunks = chunks[:CHUNK_MAX_COUNT]
+    notes_truncated = False
+    for round_number in range(1, max(1, CHUNK_MAX_ROUNDS) + 1):
+        notes = summarize_chunks(chunks, doc_label)
+        condensed = "\n\n".join(f"### Bagian {index}/{len(notes)}\n{note.strip()}"
+                                 for index, note in enumerate(notes, start=1))
+        condensed_tokens = estimate_tokens(condensed)
+        if condensed_tokens <= DOC_TOKEN_BUDGET or len(chunks) == 1:
+            break
+        if round_number >= CHUNK_MAX_ROUNDS:
+            notify('warning', f"⚠️ Catatan dokumen {doc_label} masih ~{condensed_tokens:,} token setelah "
+                              f"{round_number} putaran ringkasan; hanya {DOC_TOKEN_BUDGET:,} token pertama yang dianalisis.")
+            condensed = split_text(condensed, DOC_TOKEN_BUDGET)[0]
+            notes_truncated = True
+            break
+        chunks = split_text(condensed, CHUNK_TOKENS)
+    header = f"[Catatan isi dokumen {doc_label} (~{tokens:,} token) yang diringkas per bagian"
+    if truncated:
+        header += f"; hanya {CHUNK_MAX_COUNT} bagian pertama"
+    if notes_truncated:
+        header += "; catatan dipotong"
+    return f"{header}]\n\n{condensed}"
+
+STRATEGI_BUDAYA_INTRO = "Analisis form PCB berikut dengan pendekatan APRESIATIF dan PROFESIONAL, fokus pada aspek PERILAKU:"
+
+STRATEGI_BUDAYA_INSTRUCTIONS = """EVALUASI:
 1. Apakah Goals/Business Initiatives/Improvement menggunakan metode SMART (Specific, Measurable, Achievable, Relevant, Time-bound)?
 2. Apakah ada kerunutan logis dari identifikasi kendala/Peluang Perbaikan Bisnis ke Business Initiatives/improvement?
 3. Apakah PCB lengkap dan utuh dalam menggambarkan strategi budaya?
@@ -193,15 +156,20 @@ Berikan output dalam format:
 - [Saran 2 - disampaikan sebagai peluang, bukan kritik, fokus perilaku]
 - [Saran 3 - jika perlu]
 """
-    return call_openai(prompt)
 
-def analyze_program_budaya(pcb_content):
+def analyze_strategi_budaya(pcb_content):
+    pcb_content = condense_document(pcb_content, 'PCB')
     prompt = f"""
-Analisis Program Budaya dari form PCB berikut dengan pendekatan APRESIATIF dan PROFESIONAL, fokus pada aspek PERILAKU:
+{STRATEGI_BUDAYA_INTRO}
 
 {pcb_content}
 
-EVALUASI PROGRAM:
+{STRATEGI_BUDAYA_INSTRUCTIONS}"""
+    return call_openai(prompt)
+
+PROGRAM_BUDAYA_INTRO = "Analisis Program Budaya dari form PCB berikut dengan pendekatan APRESIATIF dan PROFESIONAL, fokus pada aspek PERILAKU:"
+
+PROGRAM_BUDAYA_INSTRUCTIONS = """EVALUASI PROGRAM:
 1. **Program Standar (One Hour Meeting)**: Kualitas dialog, keterbukaan komunikasi, partisipasi aktif
 2. **Program Mandatory (ONE Action)**: Implementasi aksi nyata, keterlibatan pekerja, dampak perilaku
 3. **Program Spesifik (ONE KOLAB)**: Kolaborasi lintas fungsi, sinergi tim, inovasi bersama
@@ -231,11 +199,72 @@ Berikan output dalam format:
 - [Saran pengembangan 2 - sebagai peluang optimalisasi, fokus perilaku]
 - [Saran pengembangan 3 - jika perlu]
 """
+
+def analyze_program_budaya(pcb_content):
+    pcb_content = condense_document(pcb_content, 'PCB')
+    prompt = f"""
+{PROGRAM_BUDAYA_INTRO}
+
+{pcb_content}
+
+{PROGRAM_BUDAYA_INSTRUCTIONS}"""
     return call_openai(prompt)
 
+def analyze_pcb_combined(pcb_content):
+    """Strategi & Program Budaya dalam satu panggilan (respons JSON).
+
+    Jika respons tidak bisa di-parse/validasi, kembali ke dua panggilan terpisah.
+    """
+    pcb_content = condense_document(pcb_content, 'PCB')
+    prompt = f"""
+Analisis form PCB berikut dengan pendekatan APRESIATIF dan PROFESIONAL, fokus pada aspek PERILAKU.
+Dokumen diberikan satu kali dan digunakan untuk DUA analisis terpisah: Strategi Budaya dan Program Budaya.
+
+{pcb_content}
+
+=== ANALISIS 1: STRATEGI BUDAYA ===
+{STRATEGI_BUDAYA_INSTRUCTIONS}
+=== ANALISIS 2: PROGRAM BUDAYA ===
+{PROGRAM_BUDAYA_INSTRUCTIONS}
+=== FORMAT JAWABAN ===
+Kembalikan HANYA satu objek JSON yang valid dengan dua key berikut (nilai berupa teks markdown sesuai format di atas):
+{{"strategi_budaya": "<hasil Analisis 1>", "program_budaya": "<hasil Analisis 2>"}}
+"""
+    with streaming_disabled():
+        response = call_openai(prompt, max_tokens=9000, response_format={"type": "json_object"})
+    sections = parse_pcb_combined(response)
+    if sections is not None:
+        return sections
+    if not is_error_result(response):
+        notify('info', "ℹ️ Respons gabungan PCB tidak valid, analisis Strategi dan Program Budaya dijalankan terpisah.")
+    with streaming_disabled():
+        return {
+            'strategi_budaya': analyze_strategi_budaya(pcb_content),
+            'program_budaya': analyze_program_budaya(pcb_content),
+        }
+
+def parse_pcb_combined(response):
+    """Validasi respons JSON gabungan; None jika tidak memenuhi format."""
+    if is_error_result(response):
+        return None
+    try:
+        parsed = json.loads(response)
+    except ValueError:
+        return None
+    if not isinstance(parsed, dict):
+        return None
+    sections = {}
+    for key in ('strategi_budaya', 'program_budaya'):
+        text = parsed.get(key)
+        if not isinstance(text, str) or '**Hal yang Sudah Baik:**' not in text:
+            return None
+        sections[key] = text.strip()
+    return sections
+
 def analyze_impact(impact_content):
     if impact_content is None:
         return "Analisis impact tidak dapat dilakukan karena tidak ada file impact to business yang di upload"
+    impact_content = condense_document(impact_content, 'Impact to Business')
     
     prompt = f"""
 Analisis form Impact to Business berikut dengan pendekatan APRESIATIF dan PROFESIONAL, fokus pada aspek PERILAKU:
@@ -274,362 +303,332 @@ Berikan output dalam format:
 """
     return call_openai(prompt)
 
-def analyze_evidence_comparison(skor_total, skor_benchmark_evidence, selected_hsh, selected_fungsi):
-    try:
-        fungsi_data = skor_total[skor_total['Fungsi'] == selected_fungsi]
-        if fungsi_data.empty:
-            return "Data fungsi tidak ditemukan dalam file SKOR_TOTAL_ALL"
-        
-        fungsi_hsh = fungsi_data.iloc[0]['HSH'] if 'HSH' in fungsi_data.columns else selected_hsh
-        fungsi_hsh_normalized = normalize_hsh(fungsi_hsh)
-        
-        benchmark_data = skor_benchmark_evidence[
-            skor_benchmark_evidence['HSH_normalized'] == fungsi_hsh_normalized
-        ]
-        
-        if benchmark_data.empty:
-            st.warning(f"⚠️ HSH '{fungsi_hsh}' tidak ditemukan exact match di benchmark. Mencoba fuzzy matching...")
-            for idx, row in skor_benchmark_evidence.iterrows():
-                benchmark_hsh_norm = row['HSH_normalized']
-                if fungsi_hsh_normalized in benchmark_hsh_norm or benchmark_hsh_norm in fungsi_hsh_normalized:
-                    benchmark_data = skor_benchmark_evidence.iloc[[idx]]
-                    st.info(f"✓ Ditemukan match: '{row.iloc[0]}' untuk HSH '{fungsi_hsh}'")
-                    break
-        
-        if benchmark_data.empty:
-            st.warning(f"⚠️ Data benchmark untuk HSH '{fungsi_hsh}' tidak ditemukan. Menggunakan benchmark 'Pertamina Group' sebagai referensi.")
-            benchmark_data = skor_benchmark_evidence[
-                skor_benchmark_evidence['HSH_normalized'].str.contains('PERTAMINA GROUP', na=False)
-            ]
-            if benchmark_data.empty:
-                benchmark_data = skor_benchmark_evidence.iloc[[0]]
-                st.info(f"Menggunakan benchmark: '{benchmark_data.iloc[0, 0]}'")
-        
-        kolom_names = ['Strategi Budaya', 'Monitoring & Evaluasi', 'Sosialisasi & Partisipasi', 
-                       'Pelaporan Bulanan', 'Apresiasi Pelanggan', 'Pemahaman Program', 
-                       'Reward & Consequences', 'SK AoC', 'Impact to Business']
-        fungsi_values = {}
-        for i, name in enumerate(kolom_names):
-            col_idx = 3 + i
-            if col_idx < len(fungsi_data.columns):
-                fungsi_values[name] = fungsi_data.iloc[0, col_idx]
-        
-        benchmark_values = {}
-        for i, name in enumerate(kolom_names):
-            col_idx = 1 + i
-            if col_idx < len(benchmark_data.columns):
-                benchmark_values[name] = benchmark_data.iloc[0, col_idx]
-        
-        differences = {}
-        for name in kolom_names:
-            if name in fungsi_values and name in benchmark_values:
-                try:
-                    diff = float(fungsi_values[name]) - float(benchmark_values[name])
-                    differences[name] = diff
-                except:
-                    differences[name] = 'N/A'
-        
-        benchmark_hsh_display = benchmark_data.iloc[0, 0]
-        
-        comparison_text = f"""
-PERBANDINGAN EVIDENCE
-
-Fungsi: {selected_fungsi}
-HSH Fungsi: {fungsi_hsh}
-HSH Benchmark: {benchmark_hsh_display}
-
-=== DATA FUNGSI ===
-"""
-        for name, value in fungsi_values.items():
-            comparison_text += f"- {name}: {value}\n"
-        
-        comparison_text += f"""
-=== BENCHMARK ({benchmark_hsh_display}) ===
-"""
-        for name, value in benchmark_values.items():
-            comparison_text += f"- {name}: {value}\n"
-        
-        comparison_text += f"""
-=== SELISIH (Fungsi - Benchmark) ===
-"""
-        for name, diff in differences.items():
-            if diff != 'N/A':
-                status = "✓ LEBIH BAIK" if diff > 0 else "⚠ PELUANG PENGEMBANGAN" if diff < 0 else "= SESUAI"
-                comparison_text += f"- {name}: {diff:+.2f} {status}\n"
-        
-        comparison_text += """
-Catatan:
-- Nilai positif (+) = Fungsi LEBIH BAIK dari benchmark
-- Nilai negatif (-) = Fungsi memiliki PELUANG PENGEMBANGAN
-"""
-        
-        prompt = f"""
-Analisis perbandingan Evidence berikut dengan pendekatan APRESIATIF dan PROFESIONAL:
-
-{comparison_text}
-
-EVALUASI:
-Bandingkan performa fungsi dengan benchmark pada aspek:
-1. Strategi Budaya dan implementasinya
-2. Monitoring & Evaluasi oleh AoC dan Pimpinan
-3. Sosialisasi & Partisipasi dalam program budaya
-4. Sistem pelaporan dan apresiasi
-5. Pemahaman program dan sistem reward
-6. Impact to Business dari program budaya
-
-FOKUS: Aspek PERILAKU dalam implementasi budaya kerja
-
-TONE: Apresiatif, profesional, berbasis data
-
-Berikan output dalam format:
-
-**Apresiasi Pencapaian:**
-[Apresiasi terhadap area yang sudah di atas atau sesuai benchmark, soroti komitmen dan konsistensi]
-
-**Hal yang Sudah Baik:**
-- [Area spesifik 1 yang di atas benchmark - dengan angka dan apresiasi]
-- [Area spesifik 2 yang di atas benchmark - dengan angka dan apresiasi]
-- [Area spesifik 3 - jika ada]
-
-**Peluang Pengembangan Lebih Lanjut:**
-- [Area 1 yang dapat dioptimalkan - dengan saran konkret berbasis perilaku]
-- [Area 2 yang dapat dioptimalkan - dengan saran konkret berbasis perilaku]
-- [Area 3 - jika perlu]
-"""
-        return call_openai(prompt, max_tokens=3000)
-    except Exception as e:
-        return f"Error dalam analisis evidence: {str(e)}\n\nDetail error: {e.__class__.__name__}"
-
-def analyze_survei_comparison(skor_survei, skor_benchmark_survei, selected_hsh, selected_fungsi):
-    try:
-        fungsi_data = skor_survei[skor_survei['Fungsi'] == selected_fungsi]
-        if fungsi_data.empty:
-            return "Data survei fungsi tidak ditemukan dalam file Skor_SURVEI_ALL"
-        
-        fungsi_hsh = fungsi_data.iloc[0]['HSH'] if 'HSH' in fungsi_data.columns else selected_hsh
-        fungsi_hsh_normalized = normalize_hsh(fungsi_hsh)
-        
-        benchmark_data = skor_benchmark_survei[
-            skor_benchmark_survei['HSH_normalized'] == fungsi_hsh_normalized
-        ]
-        
-        if benchmark_data.empty:
-            st.warning(f"⚠️ HSH '{fungsi_hsh}' tidak ditemukan exact match di benchmark survei. Mencoba fuzzy matching...")
-            for idx, row in skor_benchmark_survei.iterrows():
-                benchmark_hsh_norm = row['HSH_normalized']
-                if fungsi_hsh_normalized in benchmark_hsh_norm or benchmark_hsh_norm in fungsi_hsh_normalized:
-                    benchmark_data = skor_benchmark_survei.iloc[[idx]]
-                    st.info(f"✓ Ditemukan match: '{row.iloc[0]}' untuk HSH '{fungsi_hsh}'")
-                    break
-        
-        if benchmark_data.empty:
-            st.warning(f"⚠️ Data benchmark survei untuk HSH '{fungsi_hsh}' tidak ditemukan. Menggunakan benchmark 'Pertamina Group' sebagai referensi.")
-            benchmark_data = skor_benchmark_survei[
-                skor_benchmark_survei['HSH_normalized'].str.contains('PERTAMINA GROUP', na=False)
-            ]
-            if benchmark_data.empty:
-                benchmark_data = skor_benchmark_survei.iloc[[0]]
-                st.info(f"Menggunakan benchmark: '{benchmark_data.iloc[0, 0]}'")
-        
-        skor_survei_val = fungsi_data.iloc[0]['Skor Survei'] if 'Skor Survei' in fungsi_data.columns else 'N/A'
-        skor_pekerja_val = fungsi_data.iloc[0]['SKOR PEKERJA'] if 'SKOR PEKERJA' in fungsi_data.columns else 'N/A'
-        skor_mitra_val = fungsi_data.iloc[0]['SKOR MITRA KERJA'] if 'SKOR MITRA KERJA' in fungsi_data.columns else 'N/A'
-        
-        p_akhlak = fungsi_data.iloc[0]['P. AKHLAK'] if 'P. AKHLAK' in fungsi_data.columns else 'N/A'
-        p_one = fungsi_data.iloc[0]['P. ONE Pertamina'] if 'P. ONE Pertamina' in fungsi_data.columns else 'N/A'
-        p_program = fungsi_data.iloc[0]['P. Program Budaya'] if 'P. Program Budaya' in fungsi_data.columns else 'N/A'
-        p_keberlanjutan = fungsi_data.iloc[0]['P. Keberlanjutan'] if 'P. Keberlanjutan' in fungsi_data.columns else 'N/A'
-        p_safety = fungsi_data.iloc[0]['P. Safety'] if 'P. Safety' in fungsi_data.columns else 'N/A'
-        
-        mk_akhlak = fungsi_data.iloc[0]['MK. AKHLAK'] if 'MK. AKHLAK' in fungsi_data.columns else 'N/A'
-        mk_one = fungsi_data.iloc[0]['MK. ONE Pertamina'] if 'MK. ONE Pertamina' in fungsi_data.columns else 'N/A'
-        mk_program = fungsi_data.iloc[0]['MK. Program Budaya'] if 'MK. Program Budaya' in fungsi_data.columns else 'N/A'
-        mk_keberlanjutan = fungsi_data.iloc[0]['MK. Keberlanjutan'] if 'MK. Keberlanjutan' in fungsi_data.columns else 'N/A'
-        mk_safety = fungsi_data.iloc[0]['MK. Safety'] if 'MK. Safety' in fungsi_data.columns else 'N/A'
-        
-        benchmark_pekerja = benchmark_data.iloc[0, 6] if len(benchmark_data.columns) > 6 else 'N/A'
-        benchmark_mitra = benchmark_data.iloc[0, 12] if len(benchmark_data.columns) > 12 else 'N/A'
-        benchmark_survei = benchmark_data.iloc[0, 13] if len(benchmark_data.columns) > 13 else 'N/A'
-        
-        b_p_akhlak = benchmark_data.iloc[0, 1] if len(benchmark_data.columns) > 1 else 'N/A'
-        b_p_one = benchmark_data.iloc[0, 2] if len(benchmark_data.columns) > 2 else 'N/A'
-        b_p_program = benchmark_data.iloc[0, 3] if len(benchmark_data.columns) > 3 else 'N/A'
-        b_p_keberlanjutan = benchmark_data.iloc[0, 4] if len(benchmark_data.columns) > 4 else 'N/A'
-        b_p_safety = benchmark_data.iloc[0, 5] if len(benchmark_data.columns) > 5 else 'N/A'
-        
-        b_mk_akhlak = benchmark_data.iloc[0, 7] if len(benchmark_data.columns) > 7 else 'N/A'
-        b_mk_one = benchmark_data.iloc[0, 8] if len(benchmark_data.columns) > 8 else 'N/A'
-        b_mk_program = benchmark_data.iloc[0, 9] if len(benchmark_data.columns) > 9 else 'N/A'
-        b_mk_keberlanjutan = benchmark_data.iloc[0, 10] if len(benchmark_data.columns) > 10 else 'N/A'
-        b_mk_safety = benchmark_data.iloc[0, 11] if len(benchmark_data.columns) > 11 else 'N/A'
-        
-        try:
-            diff_survei = float(skor_survei_val) - float(benchmark_survei) if skor_survei_val != 'N/A' and benchmark_survei != 'N/A' else 'N/A'
-            diff_pekerja = float(skor_pekerja_val) - float(benchmark_pekerja) if skor_pekerja_val != 'N/A' and benchmark_pekerja != 'N/A' else 'N/A'
-            diff_mitra = float(skor_mitra_val) - float(benchmark_mitra) if skor_mitra_val != 'N/A' and benchmark_mitra != 'N/A' else 'N/A'
-        except:
-            diff_survei = diff_pekerja = diff_mitra = 'N/A'
-        
-        benchmark_hsh_display = benchmark_data.iloc[0, 0]
-        
-        comparison_text = f"""
-PERBANDINGAN SKOR SURVEI
-
-Fungsi: {selected_fungsi}
-HSH Fungsi: {fungsi_hsh}
-HSH Benchmark: {benchmark_hsh_display}
-
-=== RINGKASAN SKOR FUNGSI ===
-• Skor Survei Total: {skor_survei_val}
-• SKOR PEKERJA: {skor_pekerja_val}
-  - P. AKHLAK: {p_akhlak}
-  - P. ONE Pertamina: {p_one}
-  - P. Program Budaya: {p_program}
-  - P. Keberlanjutan: {p_keberlanjutan}
-  - P. Safety: {p_safety}
-
-• SKOR MITRA KERJA: {skor_mitra_val}
-  - MK. AKHLAK: {mk_akhlak}
-  - MK. ONE Pertamina: {mk_one}
-  - MK. Program Budaya: {mk_program}
-  - MK. Keberlanjutan: {mk_keberlanjutan}
-  - MK. Safety: {mk_safety}
-
-=== BENCHMARK ({benchmark_hsh_display}) ===
-• Skor Survei Total: {benchmark_survei}
-• SKOR PEKERJA: {benchmark_pekerja}
-  - P. AKHLAK: {b_p_akhlak}
-  - P. ONE Pertamina: {b_p_one}
-  - P. Program Budaya: {b_p_program}
-  - P. Keberlanjutan: {b_p_keberlanjutan}
-  - P. Safety: {b_p_safety}
-
-• SKOR MITRA KERJA: {benchmark_mitra}
-  - MK. AKHLAK: {b_mk_akhlak}
-  - MK. ONE Pertamina: {b_mk_one}
-  - MK. Program Budaya: {b_mk_program}
-  - MK. Keberlanjutan: {b_mk_keberlanjutan}
-  - MK. Safety: {b_mk_safety}
-
-=== SELISIH (Fungsi - Benchmark) ===
-• Skor Survei Total: {diff_survei} {'✓' if diff_survei != 'N/A' and diff_survei > 0 else '⚠' if diff_survei != 'N/A' and diff_survei < 0 else ''}
-• SKOR PEKERJA: {diff_pekerja} {'✓' if diff_pekerja != 'N/A' and diff_pekerja > 0 else '⚠' if diff_pekerja != 'N/A' and diff_pekerja < 0 else ''}
-• SKOR MITRA KERJA: {diff_mitra} {'✓' if diff_mitra != 'N/A' and diff_mitra > 0 else '⚠' if diff_mitra != 'N/A' and diff_mitra < 0 else ''}
-
-Catatan:
-✓ = Fungsi LEBIH BAIK dari benchmark
-⚠ = Fungsi memiliki PELUANG PENGEMBANGAN
-"""
-        
-        prompt = f"""
-Analisis perbandingan Survei berikut dengan pendekatan APRESIATIF dan PROFESIONAL:
-
-{comparison_text}
-
-EVALUASI:
-Bandingkan persepsi pekerja dan mitra kerja terhadap implementasi budaya pada fungsi dengan benchmark, meliputi:
-1. Pemahaman dan penerapan nilai AKHLAK
-2. Implementasi ONE Pertamina
-3. Partisipasi dalam Program Budaya
-4. Komitmen terhadap Keberlanjutan
-5. Budaya Safety
-
-FOKUS: Aspek PERILAKU - persepsi dan pengalaman pekerja & mitra kerja terhadap budaya kerja
+def create_word_document(fungsi_name, analyses):
+    from report_docx import create_word_document as render
+    return render(fungsi_name, analyses)
+
+def safe_fungsi_name(fungsi_name):
+    return fungsi_name.replace(' ', '_').replace('/', '_')
+
+def report_filename(fungsi_name, today=None):
+    today = today or datetime.now().strftime('%m_%d')
+    return f"Rapp_{safe_fungsi_name(fungsi_name)}_{today}.docx"
+
+SECTION_LABELS = {
+    'strategi_budaya': "Strategi Budaya",
+    'program_budaya': "Program Budaya",
+    'impact': "Impact to Business",
+    'evidence_comparison': "Perbandingan Evidence",
+    'survei_comparison': "Perbandingan Survei",
+}
+
+def build_sections(pcb_content, impact_content, reference_data, selected_hsh, selected_fungsi,
+                   combined_pcb=COMBINED_PCB_ANALYSIS):
+    """Daftar analisis untuk run_sections_concurrently (dipakai UI dan mode batch)."""
+    from comparison import analyze_evidence_comparison, analyze_survei_comparison
+    skor_total, skor_survei, skor_benchmark_evidence, skor_benchmark_survei = reference_data
+    if combined_pcb:
+        sections = {
+            'pcb_combined': ("Strategi & Program Budaya", analyze_pcb_combined, (pcb_content,)),
+        }
+    else:
+        sections = {
+            'strategi_budaya': (SECTION_LABELS['strategi_budaya'], analyze_strategi_budaya, (pcb_content,)),
+            'program_budaya': (SECTION_LABELS['program_budaya'], analyze_program_budaya, (pcb_content,)),
+        }
+    sections.update({
+        'impact': (SECTION_LABELS['impact'], analyze_impact, (impact_content,)),
+        'evidence_comparison': (SECTION_LABELS['evidence_comparison'], analyze_evidence_comparison,
+                                (skor_total, skor_benchmark_evidence, selected_hsh, selected_fungsi)),
+        'survei_comparison': (SECTION_LABELS['survei_comparison'], analyze_survei_comparison,
+                              (skor_survei, skor_benchmark_survei, selected_hsh, selected_fungsi)),
+    })
+    return sections
+
+@st.cache_resource
+def get_job_queue():
+    return JobQueue()
+
+@st.cache_resource
+def get_report_archive():
+    return ReportArchive()
+
+@st.cache_resource
+def get_job_workers():
+    """{nama: proses} worker antrean laporan per server: satu proses untuk RAPPORT_JOB_WORKERS job
+    bersamaan, sehingga single-flight, admission control, dan cache LLM berlaku untuk semua job."""
+    return {'w1': None} if JOB_WORKERS > 0 else {}
+
+_job_workers_lock = threading.Lock()
+
+def ensure_job_workers():
+    """Jalankan (ulang) worker yang belum hidup atau berhenti karena error."""
+    workers = get_job_workers()
+    with _job_workers_lock:
+        for name, process in workers.items():
+            if process is None or process.poll() is not None:
+                workers[name] = start_worker_process(name, jobs=JOB_WORKERS)
+
+def enqueue_report_job(selected_hsh, selected_fungsi, uploaded_pcb, uploaded_impact, force_refresh, stream_output):
+    files = {
+        'pcb': [(f.name, f.getvalue()) for f in uploaded_pcb],
+        'impact': [(f.name, f.getvalue()) for f in uploaded_impact or []],
+    }
+    params = {
+        'force_refresh': force_refresh,
+        'stream': stream_output,
+        'session_id': st.session_state['session_id'],
+    }
+    return get_job_queue().enqueue(selected_hsh, selected_fungsi, files, params)
 
-TONE: Apresiatif, profesional, berbasis data survei
+def draw_result_tabs():
+    """Header dan tab hasil; mengembalikan placeholder per bagian."""
+    st.markdown("---")
+    st.header("📊 Hasil Analisis")
+    
+    # 🔲 TAB - NUANSA ABU-ABU
+    st.markdown("""
+    <style>
+    .stTabs [data-baseweb="tab-list"] {
+        background-color: #f8f9fa;
+        padding: 10px;
+        border-radius: 8px;
+    }
+    .stTabs [data-baseweb="tab"] {
+        height: 40px;
+        white-space: pre-wrap;
+        background-color: #e9ecef;
+        border-radius: 6px;
+        color: #495057;
+        font-weight: bold;
+        padding: 0 16px;
+        margin-right: 8px;
+    }
+    .stTabs [aria-selected="true"] {
+        background-color: #6c757d;
+        color: white;
+    }
+    </style>
+    """, unsafe_allow_html=True)
 
-Berikan output dalam format:
+    # Tab digambar lebih dulu supaya teks tiap bagian bisa tampil selagi dihasilkan
+    tabs = st.tabs(list(SECTION_LABELS.values()))
+    placeholders = {}
+    for tab, (key, label) in zip(tabs, SECTION_LABELS.items()):
+        with tab:
+            placeholders[key] = st.empty()
+            placeholders[key].markdown(f"### Analisis {label}\n⏳ Menunggu hasil...")
+    return placeholders
+
+def show_failure_notice(error):
+    st.error("⚠️ Sebagian analisis gagal setelah beberapa kali percobaan. Dokumen Word tidak dibuat; "
+             "silakan klik **Mulai Analisis** lagi (bagian yang berhasil diambil dari cache).\n\n"
+             f"Detail: {error}")
+
+def show_job_sections(job, placeholders):
+    for key, placeholder in placeholders.items():
+        text = job['sections'].get(key)
+        if text is not None:
+            placeholder.markdown(f"### Analisis {SECTION_LABELS[key]}\n" + str(text))
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def show_job_progress(job_id):
+    """Progres job yang masih antre/berjalan; digambar ulang berkala tanpa rerun seluruh halaman."""
+    jobs = get_job_queue()
+    job = jobs.get(job_id)
+    if job is None or job['status'] not in ACTIVE_STATUSES:
+        st.session_state['finished_job'] = job_id
+        st.rerun()
+    progress = job['progress']
+    st.progress(progress.get('percent', 0))
+    if job['status'] == 'queued':
+        if job['error']:
+            retry_at = datetime.fromtimestamp(job['not_before']).strftime('%H:%M:%S')
+            st.warning(f"⚠️ Percobaan {job['attempts']}/{job['max_attempts']} gagal ({job['error']}); "
+                       f"dicoba ulang otomatis sekitar pukul {retry_at}.")
+        twin = jobs.running_twin(job_id)
+        if twin:
+            st.text(f"⏳ Menunggu job {twin} dengan input yang sama selesai; hasilnya akan dipakai ulang")
+        else:
+            ahead = jobs.position(job_id)
+            st.text(f"⏳ Menunggu giliran worker ({ahead} job di depan)" if ahead else "⏳ Menunggu giliran worker...")
+    else:
+        st.text(progress.get('status', ''))
+    if progress.get('reused'):
+        st.caption(f"♻️ {progress['reused']} bagian tidak berubah dan dipakai ulang")
+    for level, message in progress.get('notices', []):
+        getattr(st, level)(message)
+    show_job_sections(job, draw_result_tabs())
+
+def show_job(job_id):
+    """Progres atau hasil job; bisa dibuka lagi kapan pun lewat ID job (parameter ?job= di URL)."""
+    job = get_job_queue().get(job_id, with_docx=True)
+    if job is None:
+        st.warning(f"⚠️ Job `{job_id}` tidak ditemukan (hasil job dihapus setelah {JOB_TTL_HOURS} jam).")
+        return
+    st.success(f"✅ Analisis untuk **{job['fungsi']}** (HSH: {job['hsh']}) · ID job `{job_id}`")
+    if job['status'] in ACTIVE_STATUSES:
+        st.info("ℹ️ Analisis berjalan di server: halaman ini boleh ditutup. Buka lagi dengan ID job di atas "
+                "(atau URL halaman ini) untuk melihat progres dan mengunduh hasilnya.")
+        show_job_progress(job_id)
+        return
+    if job['status'] == 'done' and st.session_state.pop('finished_job', None) == job_id:
+        st.balloons()
+    if job['progress'].get('unchanged_since'):
+        st.info(f"♻️ Dokumen, skor, dan model tidak berubah sejak laporan periode "
+                f"{job['progress']['unchanged_since']}; teks laporan diambil dari arsip tanpa analisis ulang.")
+    for level, message in job['progress'].get('notices', []):
+        getattr(st, level)(message)
+    show_job_sections(job, draw_result_tabs())
+    if job['status'] == 'failed':
+        show_failure_notice(job['error'])
+    else:
+        show_download(job)
+
+def archive_label(entry):
+    return f"{entry['period']} · dibuat {datetime.fromtimestamp(entry['created_at']).strftime('%d/%m/%Y %H:%M')}"
+
+def show_archived_report(report_id):
+    """Laporan dari arsip: teks per bagian, snapshot skor, dan .docx tersimpan (tanpa memanggil LLM)."""
+    archive = get_report_archive()
+    report = archive.get(report_id)
+    if report is None:
+        st.warning("⚠️ Laporan arsip tidak ditemukan.")
+        return
+    st.success(f"🗂️ Laporan arsip **{report['fungsi']}** (HSH: {report['hsh']}) · {archive_label(report)}")
+    previous = archive.find_unchanged(report['hsh'], report['fungsi'], report['input_hash'],
+                                      before_period=report['period'])
+    if previous is not None:
+        st.info(f"♻️ Input laporan ini tidak berubah sejak periode {previous['period']}.")
+    with st.expander("📊 Snapshot skor saat laporan dibuat"):
+        import pandas as pd
+        for name, label in (('skor_total', "Evidence"), ('skor_survei', "Survei")):
+            st.caption(label)
+            st.dataframe(pd.DataFrame(report['scores'].get(name, [])), hide_index=True, use_container_width=True)
+    show_job_sections(report, draw_result_tabs())
+    show_download(report)
+
+def show_download(report):
+    st.markdown("---")
+    if report['docx'] is None:
+        return
+    filename = report['filename']
+
+    # 🔲 TOMBOL DOWNLOAD - NUANSA ABU-ABU
+    st.markdown("""
+    <style>
+    .stDownloadButton > button {
+        background-color: #6c757d !important;
+        color: white !important;
+        border: none !important;
+        padding: 12px 24px !important;
+        border-radius: 8px !important;
+        font-weight: bold !important;
+        font-size: 16px !important;
+        width: 100% !important;
+        transition: background-color 0.3s ease !important;
+    }
+    .stDownloadButton > button:hover {
+        background-color: #5a6268 !important;
+    }
+    </style>
+    """, unsafe_allow_html=True)
 
-**Apresiasi Pencapaian:**
-[Apresiasi terhadap skor yang sudah di atas atau sesuai benchmark, soroti area kekuatan dalam persepsi pekerja dan mitra kerja]
+    st.download_button(
+        label="📥 Download Hasil Analisis (.docx)",
+        data=report['docx'],
+        file_name=filename,
+        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        use_container_width=True
+    )
 
-**Hal yang Sudah Baik:**
-- [Area spesifik 1 dengan skor di atas benchmark - apresiasi dengan data]
-- [Area spesifik 2 dengan skor di atas benchmark - apresiasi dengan data]
-- [Area spesifik 3 - jika ada]
+    # 🔲 PESAN SUKSES - NUANSA ABU-ABU MUDA
+    st.markdown(f"""
+    <div style="
+        background-color: #f8f9fa;
+        padding: 12px;
+        border-radius: 8px;
+        border-left: 4px solid #6c757d;
+        margin-top: 10px;
+        color: #495057;
+        font-weight: bold;
+    ">
+        ✅ Dokumen siap didownload: <strong>{filename}</strong>
+    </div>
+    """, unsafe_allow_html=True)
 
-**Peluang Pengembangan Lebih Lanjut:**
-- [Area 1 yang dapat ditingkatkan - saran konkret untuk meningkatkan persepsi dan pengalaman]
-- [Area 2 yang dapat ditingkatkan - saran konkret untuk meningkatkan persepsi dan pengalaman]
-- [Area 3 - jika perlu]
-"""
-        return call_openai(prompt, max_tokens=3500)
-    except Exception as e:
-        return f"Error dalam analisis survei: {str(e)}\n\nDetail error: {e.__class__.__name__}"
+def show_reference_status():
+    from reference_data import get_reference_store
+    store = get_reference_store()
+    if store.last_error:
+        st.sidebar.warning(f"⚠️ Pembaruan data skor gagal dimuat, data sebelumnya tetap dipakai: {store.last_error}")
+    elif store.version > 1:
+        st.sidebar.caption(f"📊 Data skor diperbarui {datetime.fromtimestamp(store.loaded_at).strftime('%d/%m %H:%M')}")
+
+def show_metrics_panel():
+    # Panggilan LLM berjalan di proses worker: metrik dibaca dari file bersama, bukan recorder proses UI
+    from metrics import load_events, summarize
+    summary = summarize(load_events(METRICS_PATH, limit=METRICS_PANEL_EVENTS)) if os.path.exists(METRICS_PATH) else []
+    if not summary:
+        st.sidebar.caption("Belum ada metrik.")
+        return
+    import pandas as pd
+    st.sidebar.dataframe(pd.DataFrame(summary), hide_index=True, use_container_width=True)
+
+# Key hasil yang dihasilkan tiap bagian (bagian gabungan menghasilkan lebih dari satu)
+SECTION_OUTPUTS = {'pcb_combined': ('strategi_budaya', 'program_budaya')}
+
+def section_prompts():
+    """Fungsi dan template yang membentuk prompt tiap bagian (di-hash ke fingerprint bagian)."""
+    from comparison import analyze_evidence_comparison, analyze_survei_comparison
+    strategi = (analyze_strategi_budaya, STRATEGI_BUDAYA_INTRO, STRATEGI_BUDAYA_INSTRUCTIONS)
+    program = (analyze_program_budaya, PROGRAM_BUDAYA_INTRO, PROGRAM_BUDAYA_INSTRUCTIONS)
+    return {
+        # Gabungan PCB kembali ke dua panggilan terpisah jika respons JSON tidak valid
+        'pcb_combined': (analyze_pcb_combined, parse_pcb_combined) + strategi + program,
+        'strategi_budaya': strategi,
+        'program_budaya': program,
+        'impact': (analyze_impact,),
+        'evidence_comparison': (analyze_evidence_comparison,),
+        'survei_comparison': (analyze_survei_comparison,),
+    }
 
-def create_word_document(fungsi_name, analyses):
-    doc = Document()
-    style = doc.styles['Normal']
-    font = style.font
-    font.name = 'Calibri'
-    font.size = Pt(11)
-    
-    title = doc.add_heading('Rapport Writer Assistance', 0)
-    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    today = datetime.now().strftime('%d %B %Y')
-    subtitle = doc.add_paragraph()
-    subtitle_run = subtitle.add_run(f'Laporan Analisis Implementasi Budaya Kerja\n{fungsi_name}\n{today}')
-    subtitle_run.bold = True
-    subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    doc.add_paragraph()
-    doc.add_paragraph('_' * 80)
-    doc.add_paragraph()
-    
-    intro = doc.add_paragraph()
-    intro_run = intro.add_run(
-        'Laporan ini disusun dengan pendekatan apresiatif untuk memberikan gambaran komprehensif '
-        'mengenai implementasi budaya kerja dengan fokus pada aspek perilaku (behavior). '
-        'Analisis dilakukan berdasarkan data evidence, survei, dan perbandingan dengan benchmark.'
-    )
-    intro_run.italic = True
-    doc.add_paragraph()
-    
-    doc.add_heading('1. Analisis Strategi Budaya', 1)
-    doc.add_paragraph(analyses['strategi_budaya'])
-    doc.add_paragraph()
-    
-    doc.add_heading('2. Analisis Program Budaya', 1)
-    doc.add_paragraph(analyses['program_budaya'])
-    doc.add_paragraph()
-    
-    doc.add_heading('3. Analisis Impact to Business', 1)
-    doc.add_paragraph(analyses['impact'])
-    doc.add_paragraph()
-    
-    doc.add_heading('4. Analisis Perbandingan Evidence dengan Benchmark', 1)
-    doc.add_paragraph(analyses['evidence_comparison'])
-    doc.add_paragraph()
-    
-    doc.add_heading('5. Analisis Perbandingan Survei dengan Benchmark', 1)
-    doc.add_paragraph(analyses['survei_comparison'])
-    doc.add_paragraph()
-    
-    doc.add_paragraph()
-    doc.add_paragraph('_' * 80)
-    doc.add_paragraph()
-    
-    closing = doc.add_paragraph()
-    closing_run = closing.add_run(
-        'Laporan ini disusun sebagai bahan refleksi dan pengembangan berkelanjutan dalam implementasi '
-        'budaya kerja. Kami mengapresiasi komitmen dan dedikasi seluruh tim dalam mewujudkan '
-        'transformasi budaya yang positif dan berkelanjutan.'
-    )
-    closing_run.italic = True
-    
-    doc.add_paragraph()
-    footer = doc.add_paragraph()
-    footer.add_run(f'\nDibuat oleh Rapport Writer Assistance\n{datetime.now().strftime("%d %B %Y, %H:%M WIB")}').italic = True
-    footer.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    doc_io = io.BytesIO()
-    doc.save(doc_io)
-    doc_io.seek(0)
-    return doc_io
+def section_inputs(pcb_content, impact_content, reference_data, selected_hsh, selected_fungsi):
+    """Input yang menjadi dependensi bagian-bagian laporan (lihat section_graph.SECTION_DEPENDENCIES)."""
+    skor_total, skor_survei, skor_benchmark_evidence, skor_benchmark_survei = reference_data
+
+    def fungsi_rows(df):
+        return df[df['Fungsi'] == selected_fungsi] if 'Fungsi' in df.columns else df
+
+    inputs = {
+        'model': (OPENAI_MODEL, SYSTEM_PROMPT),
+        'map_reduce': (DOC_TOKEN_BUDGET, CHUNK_TOKENS, CHUNK_MAX_COUNT, CHUNK_MAX_ROUNDS, CHUNK_NOTES_MAX_TOKENS,
+                       CHUNK_NOTES_PROMPT, summarize_chunks, condense_document),
+        'pcb': pcb_content,
+        'impact': impact_content,
+        'fungsi': (selected_hsh, selected_fungsi),
+        'evidence_scores': (fungsi_rows(skor_total), skor_benchmark_evidence),
+        'survei_scores': (fungsi_rows(skor_survei), skor_benchmark_survei),
+    }
+    inputs.update(prompt_inputs(section_prompts()))
+    return inputs
+
+def section_outputs(fingerprints, keys, analyses):
+    """{fingerprint: {key hasil: teks}} untuk bagian keys (disimpan agar bisa dipakai ulang)."""
+    return {
+        fingerprints[key]: {output: analyses.get(output) for output in SECTION_OUTPUTS.get(key, (key,))}
+        for key in keys
+    }
 
 # Main App
 def main():
+    # Konfigurasi halaman
+    st.set_page_config(
+        page_title="Rapport Writer Assistance",
+        page_icon="📊",
+        layout="wide"
+    )
+    
     st.title("📊 Rapport Writer Assistance")
     st.caption("Asisten Analisis Implementasi Budaya Kerja dengan Pendekatan Apresiatif")
     
@@ -661,8 +660,8 @@ def main():
     
     st.sidebar.markdown("---")
     st.sidebar.subheader("📁 Upload Dokumen")
-    uploaded_pcb = st.sidebar.file_uploader("Upload PCB", type=['xlsx', 'xls', 'pdf', 'png', 'jpg', 'jpeg'])
-    uploaded_impact = st.sidebar.file_uploader("Upload Impact to Business", type=['xlsx', 'xls', 'pdf', 'png', 'jpg', 'jpeg'])
+    uploaded_pcb = st.sidebar.file_uploader("Upload PCB", type=UPLOAD_TYPES, accept_multiple_files=True)
+    uploaded_impact = st.sidebar.file_uploader("Upload Impact to Business", type=UPLOAD_TYPES, accept_multiple_files=True)
     st.sidebar.markdown("---")
     
     # 🔲 TOMBOL MULAI ANALISIS - NUANSA ABU-ABU
@@ -685,144 +684,58 @@ def main():
     </style>
     """, unsafe_allow_html=True)
 
-    analyze_button = st.sidebar.button("🚀 Mulai Analisis", use_container_width=True)
+    force_refresh = st.sidebar.checkbox("🔄 Paksa refresh (abaikan cache)", value=False,
+                                        help="Panggil ulang OpenAI walaupun hasil untuk input yang sama sudah ada di cache")
+    st.session_state.setdefault('session_id', uuid.uuid4().hex)
+    stream_output = st.sidebar.checkbox("⚡ Tampilkan hasil secara streaming", value=STREAM_OUTPUT,
+                                        help="Teks tiap bagian langsung tampil di tab selagi dihasilkan")
+    # Klik analisis menutup laporan arsip yang sedang dibuka agar progres job baru yang tampil
+    analyze_button = st.sidebar.button("🚀 Mulai Analisis", use_container_width=True,
+                                       on_click=lambda: st.session_state.update(archived_report=None))
+    job_id = st.sidebar.text_input("🔎 ID job", value=st.query_params.get('job', ''),
+                                   help="Buka kembali progres atau hasil analisis sebelumnya").strip()
+    archived = {entry['id']: entry for entry in get_report_archive().list_reports(selected_hsh, selected_fungsi)}
+    archived_report = st.sidebar.selectbox(
+        "🗂️ Arsip laporan", options=[None, *archived], key='archived_report',
+        format_func=lambda report_id: "—" if report_id is None else archive_label(archived[report_id]),
+        help="Laporan yang sudah pernah dibuat untuk Fungsi ini (dibuka tanpa analisis ulang)"
+    )
+    
+    ensure_job_workers()
+    job_stats = get_job_queue().stats()
+    st.sidebar.caption(f"Antrean laporan: {job_stats.get('running', 0)} berjalan · "
+                       f"{job_stats.get('queued', 0)} menunggu")
+    cache_stats = get_llm_cache().stats()
+    # Hit/miss dicatat worker di database cache yang sama
+    st.sidebar.caption(
+        f"Cache LLM: {cache_stats['hits']} hit / {cache_stats['misses']} miss · "
+        f"{cache_stats['entries']} entri ({cache_stats['bytes'] / 1024:.0f} KB)"
+    )
+    extract_stats = get_extraction_cache().stats()
+    st.sidebar.caption(
+        f"Cache ekstraksi file: {extract_stats['entries']} file ({extract_stats['bytes'] / 1024:.0f} KB)"
+    )
+    show_reference_status()
+    if st.sidebar.checkbox("🐞 Panel debug metrik", value=False,
+                           help="Durasi p50/p95 per tahap dan pemakaian token LLM (seluruh worker di server ini)"):
+        show_metrics_panel()
     
     if analyze_button:
-        if uploaded_pcb is None:
+        if not uploaded_pcb:
             st.error("⚠️ Silakan upload file PCB terlebih dahulu!")
             st.stop()
-        
-        st.success(f"✅ Memproses analisis untuk **{selected_fungsi}** (HSH: {selected_hsh})")
-        
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        pcb_content = read_uploaded_file(uploaded_pcb)
-        impact_content = read_uploaded_file(uploaded_impact) if uploaded_impact else None
-        
-        status_text.text("🔍 Menganalisis Strategi Budaya...")
-        progress_bar.progress(25)
-        strategi_budaya = analyze_strategi_budaya(pcb_content)
-        
-        status_text.text("🔍 Menganalisis Program Budaya...")
-        progress_bar.progress(40)
-        program_budaya = analyze_program_budaya(pcb_content)
-        
-        status_text.text("🔍 Menganalisis Impact to Business...")
-        progress_bar.progress(55)
-        impact = analyze_impact(impact_content)
-        
-        status_text.text("🔍 Menganalisis Perbandingan Evidence...")
-        progress_bar.progress(70)
-        evidence_comparison = analyze_evidence_comparison(skor_total, skor_benchmark_evidence, selected_hsh, selected_fungsi)
-        
-        status_text.text("🔍 Menganalisis Perbandingan Survei...")
-        progress_bar.progress(85)
-        survei_comparison = analyze_survei_comparison(skor_survei, skor_benchmark_survei, selected_hsh, selected_fungsi)
-        
-        analyses = {
-            'strategi_budaya': strategi_budaya,
-            'program_budaya': program_budaya,
-            'impact': impact,
-            'evidence_comparison': evidence_comparison,
-            'survei_comparison': survei_comparison
-        }
-        
-        status_text.text("📝 Membuat dokumen Word...")
-        progress_bar.progress(95)
-        doc_io = create_word_document(selected_fungsi, analyses)
-        
-        progress_bar.progress(100)
-        status_text.text("✅ Analisis selesai!")
-        st.balloons()
-        
-        st.markdown("---")
-        st.header("📊 Hasil Analisis")
-        
-        # 🔲 TAB - NUANSA ABU-ABU
-        st.markdown("""
-        <style>
-        .stTabs [data-baseweb="tab-list"] {
-            background-color: #f8f9fa;
-            padding: 10px;
-            border-radius: 8px;
-        }
-        .stTabs [data-baseweb="tab"] {
-            height: 40px;
-            white-space: pre-wrap;
-            background-color: #e9ecef;
-            border-radius: 6px;
-            color: #495057;
-            font-weight: bold;
-            padding: 0 16px;
-            margin-right: 8px;
-        }
-        .stTabs [aria-selected="true"] {
-            background-color: #6c757d;
-            color: white;
-        }
-        </style>
-        """, unsafe_allow_html=True)
-
-        tab1, tab2, tab3, tab4, tab5 = st.tabs([
-            "Strategi Budaya", 
-            "Program Budaya", 
-            "Impact to Business",
-            "Perbandingan Evidence",
-            "Perbandingan Survei"
-        ])
-        
-        with tab1: st.markdown("### Analisis Strategi Budaya\n" + strategi_budaya)
-        with tab2: st.markdown("### Analisis Program Budaya\n" + program_budaya)
-        with tab3: st.markdown("### Analisis Impact to Business\n" + impact)
-        with tab4: st.markdown("### Analisis Perbandingan Evidence\n" + evidence_comparison)
-        with tab5: st.markdown("### Analisis Perbandingan Survei\n" + survei_comparison)
-        
-        st.markdown("---")
-        today = datetime.now().strftime('%m_%d')
-        filename = f"Rapp_{selected_fungsi.replace(' ', '_').replace('/', '_')}_{today}.docx"
-
-        # 🔲 TOMBOL DOWNLOAD - NUANSA ABU-ABU
-        st.markdown("""
-        <style>
-        .stDownloadButton > button {
-            background-color: #6c757d !important;
-            color: white !important;
-            border: none !important;
-            padding: 12px 24px !important;
-            border-radius: 8px !important;
-            font-weight: bold !important;
-            font-size: 16px !important;
-            width: 100% !important;
-            transition: background-color 0.3s ease !important;
-        }
-        .stDownloadButton > button:hover {
-            background-color: #5a6268 !important;
-        }
-        </style>
-        """, unsafe_allow_html=True)
-
-        st.download_button(
-            label="📥 Download Hasil Analisis (.docx)",
-            data=doc_io,
-            file_name=filename,
-            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            use_container_width=True
-        )
-
-        # 🔲 PESAN SUKSES - NUANSA ABU-ABU MUDA
-        st.markdown(f"""
-        <div style="
-            background-color: #f8f9fa;
-            padding: 12px;
-            border-radius: 8px;
-            border-left: 4px solid #6c757d;
-            margin-top: 10px;
-            color: #495057;
-            font-weight: bold;
-        ">
-            ✅ Dokumen siap didownload: <strong>{filename}</strong>
-        </div>
-        """, unsafe_allow_html=True)
+        # Analisis berjalan di proses worker; UI hanya menyimpan ID job (juga di URL agar bisa dibuka lagi)
+        st.query_params['job'] = enqueue_report_job(selected_hsh, selected_fungsi, uploaded_pcb, uploaded_impact,
+                                                    force_refresh, stream_output)
+        st.rerun()
+    
+    if archived_report is not None:
+        show_archived_report(archived_report)
+    
+    elif job_id:
+        if st.query_params.get('job') != job_id:
+            st.query_params['job'] = job_id
+        show_job(job_id)
     
     else:
         st.info("👈 Silakan pilih HSH, Fungsi, upload file, dan klik tombol **Mulai Analisis** di sidebar")
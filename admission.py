@@ -0,0 +1,161 @@
+"""Kontrol masuk (admission control) request LLM untuk seluruh sesi dalam satu proses.
+
+Dua token bucket (request per menit dan token per menit) diisi ulang terus-menerus. Request
+yang belum bisa dilayani menunggu di antrean terbatas; giliran dibagi round-robin antar sesi
+sehingga satu sesi dengan banyak request tidak menutup sesi lain.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class AdmissionRejected(Exception):
+    """Request ditolak karena antrean penuh atau waktu tunggu habis."""
+
+
+class TokenBucket:
+    """Bucket berkapasitas capacity yang terisi rate_per_minute unit per menit (tidak thread-safe)."""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else rate_per_minute)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount, now):
+        """Detik sampai amount tersedia (0 jika sudah tersedia)."""
+        self._refill(now)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= amount
+
+    def give_back(self, amount):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class _Waiter:
+    __slots__ = ('session', 'tokens')
+
+    def __init__(self, session, tokens):
+        self.session = session
+        self.tokens = tokens
+
+
+class AdmissionController:
+    """Batas RPM/TPM bersama dengan antrean adil per sesi.
+
+    rpm/tpm <= 0 berarti tanpa batas untuk dimensi tersebut.
+    """
+
+    def __init__(self, rpm=0, tpm=0, max_queue=100, max_wait=300.0):
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._queues = OrderedDict()  # sesi -> deque waiter, urutan = giliran round-robin
+        self._waiting = 0
+        self._cond = threading.Condition()
+
+    def _clamp(self, tokens):
+        # Request lebih besar dari kapasitas bucket tetap bisa lewat saat bucket penuh
+        if self.tokens is None:
+            return 0
+        return min(int(tokens), int(self.tokens.capacity))
+
+    def _position(self, waiter):
+        """Jumlah request yang akan dilayani sebelum waiter (penjadwalan round-robin)."""
+        own = self._queues[waiter.session]
+        index = own.index(waiter)
+        ahead = 0
+        before = True
+        for session, waiters in self._queues.items():
+            if session == waiter.session:
+                before = False
+                continue
+            ahead += min(len(waiters), index + 1 if before else index)
+        return ahead + index
+
+    def _is_next(self, waiter):
+        session, waiters = next(iter(self._queues.items()))
+        return session == waiter.session and waiters[0] is waiter
+
+    def _wait_time(self, tokens, now):
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1, now))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(tokens, now))
+        return wait
+
+    def _remove(self, waiter, admitted):
+        waiters = self._queues[waiter.session]
+        waiters.remove(waiter)
+        self._waiting -= 1
+        if not waiters:
+            del self._queues[waiter.session]
+        elif admitted:
+            # Sesi ini sudah dapat giliran; pindah ke akhir putaran
+            self._queues.move_to_end(waiter.session)
+        self._cond.notify_all()
+
+    def acquire(self, session, tokens, on_position=None):
+        """Blok sampai request boleh dikirim; kembalikan jumlah token yang dipesan (untuk settle).
+
+        on_position(n) dipanggil setiap kali posisi antrean berubah (n = request di depannya).
+        """
+        tokens = self._clamp(tokens)
+        deadline = time.monotonic() + self.max_wait
+        with self._cond:
+            if self._waiting >= self.max_queue:
+                raise AdmissionRejected(f"antrean request LLM penuh ({self.max_queue} request menunggu)")
+            waiter = _Waiter(session, tokens)
+            self._queues.setdefault(session, deque()).append(waiter)
+            self._waiting += 1
+            # Posisi waiter lain bisa berubah karena giliran round-robin
+            self._cond.notify_all()
+            last_position = None
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self._is_next(waiter):
+                        wait = self._wait_time(tokens, now)
+                        if wait <= 0:
+                            if self.requests is not None:
+                                self.requests.take(1)
+                            if self.tokens is not None:
+                                self.tokens.take(tokens)
+                            self._remove(waiter, admitted=True)
+                            return tokens
+                    else:
+                        wait = None
+                    position = self._position(waiter)
+                    if on_position is not None and position != last_position:
+                        on_position(position)
+                        last_position = position
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise AdmissionRejected(f"menunggu antrean request LLM lebih dari {self.max_wait:g} detik")
+                    self._cond.wait(remaining if wait is None else min(wait, remaining))
+            except BaseException:
+                if waiter in self._queues.get(session, ()):
+                    self._remove(waiter, admitted=False)
+                raise
+
+    def settle(self, reserved, used):
+        """Kembalikan token yang dipesan tetapi tidak terpakai (used dari blok usage respons)."""
+        if self.tokens is None or used is None or used >= reserved:
+            return
+        with self._cond:
+            self.tokens.give_back(reserved - used)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {'waiting': self._waiting, 'sessions_waiting': len(self._queues)}
@@ -0,0 +1,220 @@
+"""Mode batch: membuat laporan .docx untuk setiap Fungsi di SKOR TOTAL_ALL tanpa UI Streamlit.
+
+Struktur folder input (satu subfolder per Fungsi, nama mengikuti safe_fungsi_name):
+
+    <input-dir>/<Nama_Fungsi>/PCB*.xlsx|pdf|png|jpg|jpeg|tif|tiff      (boleh lebih dari satu file)
+    <input-dir>/<Nama_Fungsi>/Impact*.xlsx|pdf|png|jpg|jpeg|tif|tiff   (opsional)
+
+Contoh:
+    OPENAI_API_KEY=sk-... python batch_report.py --input-dir uploads --output-dir reports --workers 4 --rpm 60
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import RapportLCV_3fabuabu as app
+from gap_engine import get_evidence_gaps, get_survei_gaps
+from report_archive import ReportArchive, report_input_hash, score_snapshot
+from section_graph import section_fingerprints
+
+SUPPORTED_EXTENSIONS = tuple(app.UPLOAD_TYPES)
+MANIFEST_NAME = 'batch_manifest.jsonl'
+
+
+class RateLimiter:
+    """Membatasi jumlah request per menit secara global (aman dipakai banyak thread)."""
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class LocalUpload(io.BytesIO):
+    """File lokal yang meniru objek UploadedFile Streamlit (punya atribut name)."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            super().__init__(f.read())
+        self.name = os.path.basename(path)
+
+
+def find_input_files(fungsi_dir, prefix):
+    """Semua file berawalan prefix (mis. PCB_1.png, PCB_2.png), urut nama."""
+    if not os.path.isdir(fungsi_dir):
+        return []
+    paths = []
+    for filename in sorted(os.listdir(fungsi_dir)):
+        stem, _, extension = filename.rpartition('.')
+        if stem.lower().startswith(prefix) and extension.lower() in SUPPORTED_EXTENSIONS:
+            paths.append(os.path.join(fungsi_dir, filename))
+    return paths
+
+
+def load_manifest(output_dir):
+    """Status terakhir per Fungsi dari run sebelumnya (untuk resume)."""
+    manifest = {}
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entry = json.loads(line)
+                    manifest[entry['fungsi']] = entry
+    return manifest
+
+
+class ManifestWriter:
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self._lock = threading.Lock()
+
+    def write(self, entry):
+        entry = dict(entry, timestamp=datetime.now().isoformat(timespec='seconds'))
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+
+def generate_report(fungsi, hsh, data, input_dir, output_dir, section_workers, archive, regenerate=False):
+    # Setiap laporan mendapat giliran antrean LLM sendiri
+    app.session_id_var.set(fungsi)
+    fungsi_dir = os.path.join(input_dir, app.safe_fungsi_name(fungsi))
+    pcb_paths = find_input_files(fungsi_dir, 'pcb')
+    if not pcb_paths:
+        return {'fungsi': fungsi, 'hsh': hsh, 'status': 'skipped', 'reason': 'file PCB tidak ditemukan'}
+    impact_paths = find_input_files(fungsi_dir, 'impact')
+
+    metrics = app.get_metrics()
+    with metrics.timed('read_uploads', section='pcb'):
+        pcb_content = app.read_uploaded_files([LocalUpload(path) for path in pcb_paths])
+    with metrics.timed('read_uploads', section='impact'):
+        impact_content = app.read_uploaded_files([LocalUpload(path) for path in impact_paths]) if impact_paths else None
+
+    sections = app.build_sections(pcb_content, impact_content, data, hsh, fungsi)
+    fingerprints = section_fingerprints(sections, app.section_inputs(pcb_content, impact_content, data, hsh, fungsi))
+    # Input sama persis dengan laporan yang sudah diarsipkan (mis. periode lalu): teksnya dipakai ulang
+    unchanged = None if regenerate else archive.find_unchanged(hsh, fungsi, report_input_hash(fingerprints))
+    notices = []
+    if unchanged is not None:
+        analyses = unchanged['sections']
+    else:
+        with metrics.timed('analyses'):
+            analyses = app.run_sections_concurrently(
+                sections, max_workers=section_workers, notice_handler=lambda level, message: notices.append(message)
+            )
+
+    failed = [key for key in app.SECTION_LABELS if app.is_error_result(analyses.get(key))]
+    if failed:
+        return {'fungsi': fungsi, 'hsh': hsh, 'status': 'failed', 'sections': failed,
+                'reason': str(analyses.get(failed[0]))[:300], 'notices': notices}
+
+    filename = app.report_filename(fungsi)
+    path = os.path.join(output_dir, filename)
+    with metrics.timed('create_word_document'):
+        doc_io = app.create_word_document(fungsi, analyses)
+    # Tulis ke file sementara dulu agar file setengah jadi tidak dianggap selesai saat resume
+    tmp_path = path + '.part'
+    with open(tmp_path, 'wb') as f:
+        f.write(doc_io.getvalue())
+    os.replace(tmp_path, path)
+    archive.store(hsh, fungsi, fingerprints, analyses, score_snapshot(data, fungsi), doc_io.getvalue(), filename,
+                  source_id=unchanged['id'] if unchanged else None)
+    entry = {'fungsi': fungsi, 'hsh': hsh, 'status': 'done', 'file': filename, 'notices': notices}
+    if unchanged is not None:
+        entry['unchanged_since'] = unchanged['period']
+    return entry
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate laporan Rapport untuk semua Fungsi (mode batch)")
+    parser.add_argument('--input-dir', required=True, help="Folder berisi subfolder per Fungsi dengan file PCB/Impact")
+    parser.add_argument('--output-dir', required=True, help="Folder tujuan file .docx")
+    parser.add_argument('--workers', type=int, default=2, help="Jumlah laporan yang diproses bersamaan")
+    parser.add_argument('--section-workers', type=int, default=app.SECTION_WORKERS,
+                        help="Jumlah analisis per laporan yang berjalan bersamaan")
+    parser.add_argument('--rpm', type=float, default=60, help="Batas global request OpenAI per menit (0 = tanpa batas)")
+    parser.add_argument('--hsh', action='append', help="Hanya proses HSH ini (boleh diulang)")
+    parser.add_argument('--no-resume', action='store_true', help="Proses ulang Fungsi yang sudah selesai")
+    parser.add_argument('--regenerate', action='store_true',
+                        help="Analisis ulang walaupun input sama dengan laporan di arsip")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    data = app.load_excel_files()
+    skor_total = data[0]
+    if skor_total is None:
+        print("Gagal memuat file Excel di folder 'documents'", file=sys.stderr)
+        return 1
+
+    # Tabel gap seluruh portofolio (selisih Fungsi vs benchmark) sebagai lampiran run batch
+    get_evidence_gaps(data[0], data[2]).to_frame().to_csv(
+        os.path.join(args.output_dir, 'gap_evidence.csv'), index=False)
+    get_survei_gaps(data[1], data[3]).to_frame().to_csv(
+        os.path.join(args.output_dir, 'gap_survei.csv'), index=False)
+
+    rows = skor_total[['Fungsi', 'HSH']].drop_duplicates(subset='Fungsi')
+    if args.hsh:
+        rows = rows[rows['HSH'].isin(args.hsh)]
+
+    manifest = {} if args.no_resume else load_manifest(args.output_dir)
+    pending = []
+    for fungsi, hsh in rows.itertuples(index=False):
+        entry = manifest.get(fungsi)
+        if entry and entry['status'] == 'done' and os.path.exists(os.path.join(args.output_dir, entry['file'])):
+            continue
+        pending.append((fungsi, hsh))
+
+    print(f"{len(rows)} Fungsi, {len(rows) - len(pending)} sudah selesai, {len(pending)} akan diproses")
+    app.set_rate_limiter(RateLimiter(args.rpm))
+    writer = ManifestWriter(args.output_dir)
+    archive = ReportArchive()
+    counts = {'done': 0, 'failed': 0, 'skipped': 0}
+
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = {
+            executor.submit(generate_report, fungsi, hsh, data, args.input_dir, args.output_dir,
+                            args.section_workers, archive, args.regenerate): fungsi
+            for fungsi, hsh in pending
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            fungsi = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                entry = {'fungsi': fungsi, 'status': 'failed', 'reason': f"{e.__class__.__name__}: {e}"}
+            writer.write(entry)
+            counts[entry['status']] += 1
+            print(f"[{done}/{len(pending)}] {entry['status'].upper()}: {fungsi}"
+                  + (f" - {entry['reason']}" if entry.get('reason') else "")
+                  + (f" (tidak berubah sejak {entry['unchanged_since']})" if entry.get('unchanged_since') else ""))
+
+    app.get_metrics().flush_prometheus()
+    print(f"Selesai: {counts['done']} berhasil, {counts['failed']} gagal, {counts['skipped']} dilewati")
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""Server lokal pengganti endpoint chat completions OpenAI untuk benchmark.
+
+Latensi, kecepatan streaming, dan injeksi 429 bisa diatur. Respons berformat seperti API asli
+(termasuk blok usage); request dengan response_format json_object dijawab dengan JSON
+gabungan Strategi/Program Budaya yang valid.
+
+Contoh:
+    python benchmarks/mock_llm_server.py --port 8765 --latency 0.5 --rate-429 0.05
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SECTION_TEXT = (
+    "**Apresiasi Umum:**\n"
+    "Tim telah menunjukkan komitmen yang baik dalam implementasi budaya kerja.\n\n"
+    "**Hal yang Sudah Baik:**\n"
+    "- Kolaborasi antar tim berjalan konsisten\n"
+    "- Komunikasi internal semakin terbuka\n\n"
+    "**Peluang Pengembangan Lebih Lanjut:**\n"
+    "- Keterlibatan pekerja dapat lebih dioptimalkan\n"
+    "- Apresiasi atas perubahan perilaku dapat dilakukan lebih rutin\n"
+)
+
+
+class MockConfig:
+    def __init__(self, latency=0.2, jitter=0.0, stream_chunk_delay=0.005, rate_429=0.0,
+                 retry_after=0.1, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.stream_chunk_delay = stream_chunk_delay
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.rejected = 0
+
+    def next_request(self):
+        """(tolak dengan 429?, jeda sebelum menjawab)"""
+        with self._lock:
+            self.requests += 1
+            reject = self._random.random() < self.rate_429
+            if reject:
+                self.rejected += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+        return reject, delay
+
+
+def completion_text(payload):
+    if (payload.get('response_format') or {}).get('type') == 'json_object':
+        return json.dumps({'strategi_budaya': SECTION_TEXT, 'program_budaya': SECTION_TEXT}, ensure_ascii=False)
+    return SECTION_TEXT
+
+
+def usage_for(payload, text):
+    prompt_chars = sum(len(message.get('content') or '') for message in payload.get('messages', []))
+    prompt_tokens = prompt_chars // 4
+    completion_tokens = len(text) // 4
+    return {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens}
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status, body, headers=None):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            reject, delay = config.next_request()
+            if reject:
+                self._send_json(429, {'error': {'message': 'Rate limit reached (mock)'}},
+                                {'Retry-After': str(config.retry_after)})
+                return
+            time.sleep(delay)
+            text = completion_text(payload)
+            usage = usage_for(payload, text)
+            if not payload.get('stream'):
+                self._send_json(200, {
+                    'id': 'chatcmpl-mock',
+                    'object': 'chat.completion',
+                    'model': payload.get('model'),
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text},
+                                 'finish_reason': 'stop'}],
+                    'usage': usage,
+                })
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            words = text.split(' ')
+            for index, word in enumerate(words):
+                piece = word if index == len(words) - 1 else word + ' '
+                self._send_chunk({'choices': [{'index': 0, 'delta': {'content': piece}}]})
+                if config.stream_chunk_delay:
+                    time.sleep(config.stream_chunk_delay)
+            if (payload.get('stream_options') or {}).get('include_usage'):
+                self._send_chunk({'choices': [], 'usage': usage})
+            self._send_event('[DONE]')
+            self.wfile.write(b'0\r\n\r\n')
+
+        def _send_chunk(self, body):
+            self._send_event(json.dumps(body, ensure_ascii=False))
+
+        def _send_event(self, data):
+            event = f"data: {data}\n\n".encode('utf-8')
+            self.wfile.write(f"{len(event):x}\r\n".encode('ascii') + event + b'\r\n')
+            self.wfile.flush()
+
+    return Handler
+
+
+class MockLLMServer:
+    """Server mock yang berjalan di thread latar; url siap dipakai sebagai RAPPORT_OPENAI_URL."""
+
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        self.config = config or MockConfig()
+        self.server = ThreadingHTTPServer((host, port), make_handler(self.config))
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mock endpoint chat completions untuk benchmark")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.2, help="Jeda sebelum menjawab (detik)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Tambahan jeda acak maksimum (detik)")
+    parser.add_argument('--stream-chunk-delay', type=float, default=0.005, help="Jeda antar potongan SSE (detik)")
+    parser.add_argument('--rate-429', type=float, default=0.0, help="Proporsi request yang dijawab 429")
+    parser.add_argument('--retry-after', type=float, default=0.1, help="Nilai header Retry-After untuk 429")
+    args = parser.parse_args(argv)
+    config = MockConfig(args.latency, args.jitter, args.stream_chunk_delay, args.rate_429, args.retry_after)
+    server = MockLLMServer(config, args.host, args.port)
+    print(f"Mock LLM server: {server.url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
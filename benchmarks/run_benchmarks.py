@@ -0,0 +1,415 @@
+"""Benchmark pembuatan laporan terhadap mock server LLM lokal.
+
+Mengukur: waktu import entry point UI (proses baru, dengan anggaran), load_excel_files (snapshot dingin/hangat), pencocokan HSH, kedua comparison builder,
+ekstraksi PDF & OCR pada fixture sintetis, create_word_document, dan pipeline lengkap pada
+beberapa tingkat konkurensi laporan. Hasil ditulis sebagai JSON agar bisa dibandingkan antar run.
+
+Jalankan dari root repo (membutuhkan folder documents/):
+    python benchmarks/run_benchmarks.py --output bench_results.json
+    python benchmarks/run_benchmarks.py --compare bench_results.json --output bench_new.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_llm_server import SECTION_TEXT, MockConfig, MockLLMServer  # noqa: E402
+
+# Rasio waktu (baru / baseline) yang dianggap regresi pada --compare
+REGRESSION_RATIO = 1.2
+
+# Anggaran waktu import entry point UI (detik, median) dan modul berat yang tidak boleh ikut ter-import
+IMPORT_BUDGET_S = 0.75
+LAZY_MODULES = ('pandas', 'numpy', 'pyarrow', 'openpyxl', 'docx', 'PyPDF2', 'PIL', 'pytesseract', 'requests',
+                'tiktoken')
+IMPORT_PROBE = (
+    "import json, sys, time\n"
+    "started = time.perf_counter()\n"
+    "import RapportLCV_3fabuabu\n"
+    "elapsed = time.perf_counter() - started\n"
+    "print(json.dumps({'seconds': elapsed, 'eager': [m for m in %r if m in sys.modules]}))\n"
+) % (LAZY_MODULES,)
+
+
+def timing_stats(durations):
+    ordered = sorted(durations)
+    return {
+        'n': len(ordered),
+        'min_s': round(ordered[0], 6),
+        'median_s': round(statistics.median(ordered), 6),
+        'p95_s': round(ordered[min(len(ordered) - 1, max(0, -(-95 * len(ordered) // 100) - 1))], 6),
+        'mean_s': round(statistics.fmean(ordered), 6),
+    }
+
+
+def measure(func, repeat, setup=None):
+    durations = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+    return timing_stats(durations)
+
+
+def text_pdf(pages):
+    """PDF minimal (teks Helvetica per halaman) tanpa dependensi tambahan."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(len(pages)))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>")
+    font_id = 3 + 2 * len(pages)
+    for i, text in enumerate(pages):
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+                       f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>")
+        lines = " ".join(f"({line}) Tj 0 -14 Td" for line in text.splitlines())
+        stream = f"BT /F1 11 Tf 72 720 Td {lines} ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    out = "%PDF-1.4\n"
+    offsets = []
+    for i, obj in enumerate(objects):
+        offsets.append(len(out))
+        out += f"{i + 1} 0 obj\n{obj}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n" + "".join(f"{o:010d} 00000 n \n" for o in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    return out.encode('latin-1')
+
+
+def fixture_pdf(page_count=40):
+    pages = []
+    for number in range(page_count):
+        lines = [f"Halaman {number + 1} - Program Budaya ONE Action dan ONE KOLAB"]
+        lines += [f"Goals {i}: meningkatkan kolaborasi dan komunikasi antar tim sebesar {i * 5} persen"
+                  for i in range(30)]
+        pages.append("\n".join(lines))
+    return text_pdf(pages)
+
+
+def fixture_image():
+    from PIL import Image, ImageDraw
+
+    image = Image.new('RGB', (1654, 2339), 'white')
+    draw = ImageDraw.Draw(image)
+    for i in range(60):
+        draw.text((100, 100 + i * 35), f"Program Budaya {i}: kolaborasi, komunikasi, keterlibatan pekerja", fill='black')
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', dpi=(200, 200))
+    return buffer.getvalue()
+
+
+def fixture_workbook(report_index):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = 'PCB'
+    sheet.append(['No', 'Goals', 'Business Initiatives', 'Program', 'Deliverables', 'Target'])
+    for row in range(60):
+        sheet.append([row + 1, f"Goal {row} laporan {report_index}", "Peningkatan kolaborasi lintas fungsi",
+                      "ONE Action", "Sharing session bulanan", f"{row % 12 + 1}/2025"])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+class Upload(io.BytesIO):
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+
+
+def bench_import(repeat, budget):
+    """Import entry point di proses Python baru (cold start) dan cek terhadap anggaran."""
+    durations = []
+    eager = set()
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, '-c', IMPORT_PROBE], cwd=REPO_ROOT,
+                                   capture_output=True, text=True, timeout=120, check=True)
+        probe = json.loads(completed.stdout.strip().splitlines()[-1])
+        durations.append(probe['seconds'])
+        eager.update(probe['eager'])
+    result = timing_stats(durations)
+    result.update({'budget_s': budget, 'eager_modules': sorted(eager),
+                   'within_budget': result['median_s'] <= budget and not eager})
+    return {'import.entry_point': result}
+
+
+def bench_reference_data(repeat):
+    import reference_data
+
+    snapshot = reference_data.get_reference_snapshot()
+    return {
+        'load_excel_files.cold': measure(lambda: snapshot.refresh(force=True), max(1, repeat // 2)),
+        'load_excel_files.warm': measure(snapshot.load, repeat),
+        'reference_data.build': measure(
+            lambda: reference_data.build_reference_data(snapshot.load()), repeat),
+    }
+
+
+def bench_hsh(app, reference_data, repeat):
+    import comparison
+    from hsh_index import HSHIndex
+
+    skor_total, _, skor_benchmark_evidence, _ = reference_data
+    names = skor_benchmark_evidence['HSH_normalized'].tolist()
+    targets = [str(h) for h in skor_total['HSH'].unique().tolist()]
+
+    def match_all(index):
+        for target in targets:
+            index.lookup(target)
+
+    return {
+        'hsh_matching.cold': measure(lambda: match_all(HSHIndex(names)), repeat),
+        'hsh_matching.warm': measure(lambda: [comparison.find_matching_hsh(t, names) for t in targets], repeat),
+    }
+
+
+def bench_comparisons(app, reference_data, repeat):
+    import comparison
+    import gap_engine
+    from section_runtime import _run_section
+
+    skor_total, skor_survei, skor_benchmark_evidence, skor_benchmark_survei = reference_data
+    rows = skor_total[['Fungsi', 'HSH']].drop_duplicates(subset='Fungsi').head(20).itertuples(index=False)
+    targets = list(rows)
+    original_call = comparison.call_openai
+    # Hanya biaya menyusun prompt (tanpa LLM)
+    comparison.call_openai = lambda prompt, **kwargs: prompt
+
+    def build(func, score, benchmark):
+        for fungsi, hsh in targets:
+            _run_section(func, (score, benchmark, hsh, fungsi))
+
+    try:
+        return {
+            'evidence_comparison.cold': measure(
+                lambda: build(comparison.analyze_evidence_comparison, skor_total, skor_benchmark_evidence),
+                repeat, setup=gap_engine.clear_cache),
+            'evidence_comparison.warm': measure(
+                lambda: build(comparison.analyze_evidence_comparison, skor_total, skor_benchmark_evidence), repeat),
+            'survei_comparison.cold': measure(
+                lambda: build(comparison.analyze_survei_comparison, skor_survei, skor_benchmark_survei),
+                repeat, setup=gap_engine.clear_cache),
+            'survei_comparison.warm': measure(
+                lambda: build(comparison.analyze_survei_comparison, skor_survei, skor_benchmark_survei), repeat),
+        }
+    finally:
+        comparison.call_openai = original_call
+
+
+def bench_extraction(repeat):
+    import upload_extraction as config
+    from ocr_engine import OCREngine
+    from pdf_extract import extract_pdf_text
+
+    results = {}
+    pdf = fixture_pdf()
+    results['pdf_extract.40_pages'] = measure(
+        lambda: extract_pdf_text(pdf, max_pages=config.PDF_MAX_PAGES, max_chars=config.PDF_MAX_CHARS,
+                                 workers=config.PDF_WORKERS), repeat)
+    tesseract = shutil.which('tesseract')
+    if tesseract is None:
+        results['ocr.a4_png'] = {'skipped': 'tesseract tidak ditemukan di PATH'}
+    else:
+        engine = OCREngine(cache=None, workers=config.OCR_WORKERS, timeout=config.OCR_TIMEOUT,
+                           target_dpi=config.OCR_TARGET_DPI, tesseract_cmd=tesseract)
+        image = fixture_image()
+        results['ocr.a4_png'] = measure(lambda: engine.ocr_bytes(image), max(1, repeat // 2))
+    return results
+
+
+def bench_docx(app, repeat):
+    analyses = {key: SECTION_TEXT for key in app.SECTION_LABELS}
+    return {'create_word_document': measure(lambda: app.create_word_document("Fungsi Benchmark", analyses), repeat)}
+
+
+def run_report(app, reference_data, fungsi, hsh, report_index, stream):
+    # Selalu memanggil mock server (bukan cache) agar setiap laporan membayar panggilan LLM penuh
+    app.force_refresh_var.set(True)
+    started = time.perf_counter()
+    pcb_content = app.read_uploaded_files([Upload(f"PCB_{report_index}.xlsx", fixture_workbook(report_index))])
+    analyses = app.run_sections_concurrently(
+        app.build_sections(pcb_content, None, reference_data, hsh, fungsi),
+        notice_handler=lambda level, message: None,
+        on_section_update=(lambda key, text: None) if stream else None
+    )
+    failed = [key for key in app.SECTION_LABELS if app.is_error_result(analyses.get(key))]
+    if not failed:
+        app.create_word_document(fungsi, analyses)
+    return time.perf_counter() - started, not failed
+
+
+def bench_pipeline(app, reference_data, server, concurrency_levels, stream):
+    skor_total = reference_data[0]
+    targets = list(skor_total[['Fungsi', 'HSH']].drop_duplicates(subset='Fungsi').itertuples(index=False))
+    results = {}
+    for concurrency in concurrency_levels:
+        requests_before = server.config.requests
+        rejected_before = server.config.rejected
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [
+                executor.submit(run_report, app, reference_data, *targets[i % len(targets)], i, stream)
+                for i in range(concurrency)
+            ]
+            outcomes = [future.result() for future in futures]
+        wall = time.perf_counter() - started
+        durations = [duration for duration, _ in outcomes]
+        stats = timing_stats(durations)
+        results[f'pipeline.c{concurrency}'] = {
+            'reports': concurrency,
+            'failed': sum(1 for _, ok in outcomes if not ok),
+            'wall_s': round(wall, 6),
+            'reports_per_s': round(concurrency / wall, 3),
+            'report_median_s': stats['median_s'],
+            'report_p95_s': stats['p95_s'],
+            'llm_requests': server.config.requests - requests_before,
+            'http_429': server.config.rejected - rejected_before,
+        }
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def headline_seconds(result):
+    """Angka utama untuk perbandingan: median untuk microbenchmark, wall time untuk pipeline."""
+    if 'median_s' in result:
+        return result['median_s']
+    return result.get('wall_s')
+
+
+def compare(baseline, current):
+    """Cetak rasio terhadap baseline; kembalikan daftar benchmark yang melambat."""
+    regressions = []
+    print(f"\n{'benchmark':<30} {'baseline':>10} {'sekarang':>10} {'rasio':>7}")
+    for name, result in current['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if not before or headline_seconds(before) is None or headline_seconds(result) is None:
+            continue
+        ratio = headline_seconds(result) / headline_seconds(before) if headline_seconds(before) else float('inf')
+        flag = '  REGRESI' if ratio > REGRESSION_RATIO else ''
+        if flag:
+            regressions.append(name)
+        print(f"{name:<30} {headline_seconds(before):>10.4f} {headline_seconds(result):>10.4f} {ratio:>7.2f}{flag}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Rapport Writer dengan mock server LLM lokal")
+    parser.add_argument('--output', default='bench_results.json', help="File hasil (JSON)")
+    parser.add_argument('--compare', help="File hasil baseline untuk dibandingkan")
+    parser.add_argument('--repeat', type=int, default=5, help="Pengulangan per microbenchmark")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50],
+                        help="Jumlah laporan bersamaan untuk benchmark pipeline")
+    parser.add_argument('--latency', type=float, default=0.2, help="Latensi mock LLM (detik)")
+    parser.add_argument('--jitter', type=float, default=0.1, help="Tambahan latensi acak maksimum (detik)")
+    parser.add_argument('--rate-429', type=float, default=0.0, help="Proporsi request mock yang dijawab 429")
+    parser.add_argument('--stream', action='store_true', help="Pipeline memakai mode streaming (SSE)")
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET_S,
+                        help="Anggaran median waktu import entry point UI (detik)")
+    parser.add_argument('--skip', nargs='*', default=[],
+                        choices=['import', 'reference', 'hsh', 'comparison', 'extraction', 'docx', 'pipeline'])
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.chdir(REPO_ROOT)
+    workdir = tempfile.mkdtemp(prefix='rapport-bench-')
+    server = MockLLMServer(MockConfig(latency=args.latency, jitter=args.jitter, rate_429=args.rate_429)).start()
+
+    # Cache, snapshot, dan metrik benchmark dipisah dari milik aplikasi
+    os.environ.update({
+        'OPENAI_API_KEY': os.environ.get('OPENAI_API_KEY', 'sk-benchmark'),
+        'RAPPORT_OPENAI_URL': server.url,
+        'RAPPORT_LLM_CACHE_PATH': os.path.join(workdir, 'llm.sqlite'),
+        'RAPPORT_EXTRACT_CACHE_PATH': os.path.join(workdir, 'extract.sqlite'),
+        'RAPPORT_OCR_CACHE_PATH': os.path.join(workdir, 'ocr.sqlite'),
+        'RAPPORT_SNAPSHOT_DIR': os.path.join(workdir, 'snapshot'),
+        'RAPPORT_METRICS_PATH': os.path.join(workdir, 'metrics.jsonl'),
+        'RAPPORT_SECTION_WORKERS': os.environ.get('RAPPORT_SECTION_WORKERS', '5'),
+    })
+    import RapportLCV_3fabuabu as app
+
+    try:
+        reference_data = app.load_excel_files()
+        if reference_data[0] is None:
+            print("Gagal memuat file Excel di folder 'documents'", file=sys.stderr)
+            return 1
+        results = {}
+        steps = [
+            ('import', lambda: bench_import(args.repeat, args.import_budget)),
+            ('reference', lambda: bench_reference_data(args.repeat)),
+            ('hsh', lambda: bench_hsh(app, reference_data, args.repeat)),
+            ('comparison', lambda: bench_comparisons(app, reference_data, args.repeat)),
+            ('extraction', lambda: bench_extraction(args.repeat)),
+            ('docx', lambda: bench_docx(app, args.repeat)),
+            ('pipeline', lambda: bench_pipeline(app, reference_data, server, args.concurrency, args.stream)),
+        ]
+        for name, step in steps:
+            if name in args.skip:
+                continue
+            print(f"▶ {name}...", flush=True)
+            results.update(step())
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'mock': {'latency': args.latency, 'jitter': args.jitter, 'rate_429': args.rate_429,
+                     'stream': args.stream},
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    for name, result in results.items():
+        print(f"{name:<30} {json.dumps(result)}")
+    print(f"Hasil ditulis ke {args.output}")
+
+    status = 0
+    entry_import = results.get('import.entry_point')
+    if entry_import is not None and not entry_import['within_budget']:
+        print(f"Import entry point melebihi anggaran: median {entry_import['median_s']:.3f}s "
+              f"(anggaran {entry_import['budget_s']:.3f}s), modul berat ter-import: "
+              f"{', '.join(entry_import['eager_modules']) or '-'}")
+        status = 1
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(json.load(f), report)
+        if regressions:
+            print(f"{len(regressions)} benchmark melambat lebih dari {REGRESSION_RATIO - 1:.0%}: {', '.join(regressions)}")
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""Analisis perbandingan skor Evidence dan Survei fungsi terhadap benchmark HSH-nya."""
+from gap_engine import EVIDENCE_DIMENSIONS, get_evidence_gaps, get_survei_gaps
+from hsh_index import get_hsh_index
+from llm_service import call_openai
+from section_runtime import notify
+
+def find_matching_hsh(target_hsh, hsh_list):
+    match = get_hsh_index(hsh_list).lookup(target_hsh)
+    if match.tier in ('exact', 'fuzzy'):
+        return hsh_list[match.position]
+    return None
+
+def resolve_benchmark_row(skor_benchmark, fungsi_hsh, sheet_label):
+    """Baris benchmark untuk HSH fungsi (exact → fuzzy → Pertamina Group → baris pertama)."""
+    match = get_hsh_index(skor_benchmark, 'HSH_normalized').lookup(fungsi_hsh)
+    if match.tier != 'exact':
+        notify('warning', f"⚠️ HSH '{fungsi_hsh}' tidak ditemukan exact match di {sheet_label}. Mencoba fuzzy matching...")
+    benchmark_data = skor_benchmark.iloc[[match.position]]
+    if match.tier == 'fuzzy':
+        notify('info', f"✓ Ditemukan match: '{benchmark_data.iloc[0, 0]}' untuk HSH '{fungsi_hsh}'")
+    elif match.tier in ('fallback', 'default'):
+        notify('warning', f"⚠️ Data {sheet_label} untuk HSH '{fungsi_hsh}' tidak ditemukan. Menggunakan benchmark 'Pertamina Group' sebagai referensi.")
+        if match.tier == 'default':
+            notify('info', f"Menggunakan benchmark: '{benchmark_data.iloc[0, 0]}'")
+    return benchmark_data, match.tier
+
+def analyze_evidence_comparison(skor_total, skor_benchmark_evidence, selected_hsh, selected_fungsi):
+    try:
+        gaps = get_evidence_gaps(skor_total, skor_benchmark_evidence)
+        position = gaps.row(selected_fungsi)
+        if position is None:
+            return "Data fungsi tidak ditemukan dalam file SKOR_TOTAL_ALL"
+        fungsi_data = skor_total.iloc[[position]]
+        
+        fungsi_hsh = fungsi_data.iloc[0]['HSH'] if 'HSH' in fungsi_data.columns else selected_hsh
+        benchmark_data, _ = resolve_benchmark_row(skor_benchmark_evidence, fungsi_hsh, 'benchmark')
+        
+        fungsi_values = {}
+        for i, name in enumerate(EVIDENCE_DIMENSIONS):
+            col_idx = 3 + i
+            if col_idx < len(fungsi_data.columns):
+                fungsi_values[name] = fungsi_data.iloc[0, col_idx]
+        
+        benchmark_values = {}
+        for i, name in enumerate(EVIDENCE_DIMENSIONS):
+            col_idx = 1 + i
+            if col_idx < len(benchmark_data.columns):
+                benchmark_values[name] = benchmark_data.iloc[0, col_idx]
+        
+        # Selisih diambil dari tabel gap yang sudah dihitung untuk semua Fungsi
+        differences = gaps.differences(position)
+        
+        benchmark_hsh_display = benchmark_data.iloc[0, 0]
+        
+        comparison_text = f"""
+PERBANDINGAN EVIDENCE
+
+Fungsi: {selected_fungsi}
+HSH Fungsi: {fungsi_hsh}
+HSH Benchmark: {benchmark_hsh_display}
+
+=== DATA FUNGSI ===
+"""
+        for name, value in fungsi_values.items():
+            comparison_text += f"- {name}: {value}\n"
+        
+        comparison_text += f"""
+=== BENCHMARK ({benchmark_hsh_display}) ===
+"""
+        for name, value in benchmark_values.items():
+            comparison_text += f"- {name}: {value}\n"
+        
+        comparison_text += f"""
+=== SELISIH (Fungsi - Benchmark) ===
+"""
+        for name, diff in differences.items():
+            if diff != 'N/A':
+                status = "✓ LEBIH BAIK" if diff > 0 else "⚠ PELUANG PENGEMBANGAN" if diff < 0 else "= SESUAI"
+                comparison_text += f"- {name}: {diff:+.2f} {status}\n"
+        
+        comparison_text += """
+Catatan:
+- Nilai positif (+) = Fungsi LEBIH BAIK dari benchmark
+- Nilai negatif (-) = Fungsi memiliki PELUANG PENGEMBANGAN
+"""
+        
+        prompt = f"""
+Analisis perbandingan Evidence berikut dengan pendekatan APRESIATIF dan PROFESIONAL:
+
+{comparison_text}
+
+EVALUASI:
+Bandingkan performa fungsi dengan benchmark pada aspek:
+1. Strategi Budaya dan implementasinya
+2. Monitoring & Evaluasi oleh AoC dan Pimpinan
+3. Sosialisasi & Partisipasi dalam program budaya
+4. Sistem pelaporan dan apresiasi
+5. Pemahaman program dan sistem reward
+6. Impact to Business dari program budaya
+
+FOKUS: Aspek PERILAKU dalam implementasi budaya kerja
+
+TONE: Apresiatif, profesional, berbasis data
+
+Berikan output dalam format:
+
+**Apresiasi Pencapaian:**
+[Apresiasi terhadap area yang sudah di atas atau sesuai benchmark, soroti komitmen dan konsistensi]
+
+**Hal yang Sudah Baik:**
+- [Area spesifik 1 yang di atas benchmark - dengan angka dan apresiasi]
+- [Area spesifik 2 yang di atas benchmark - dengan angka dan apresiasi]
+- [Area spesifik 3 - jika ada]
+
+**Peluang Pengembangan Lebih Lanjut:**
+- [Area 1 yang dapat dioptimalkan - dengan saran konkret berbasis perilaku]
+- [Area 2 yang dapat dioptimalkan - dengan saran konkret berbasis perilaku]
+- [Area 3 - jika perlu]
+"""
+        return call_openai(prompt, max_tokens=3000)
+    except Exception as e:
+        return f"Error dalam analisis evidence: {str(e)}\n\nDetail error: {e.__class__.__name__}"
+
+def analyze_survei_comparison(skor_survei, skor_benchmark_survei, selected_hsh, selected_fungsi):
+    try:
+        gaps = get_survei_gaps(skor_survei, skor_benchmark_survei)
+        position = gaps.row(selected_fungsi)
+        if position is None:
+            return "Data survei fungsi tidak ditemukan dalam file Skor_SURVEI_ALL"
+        fungsi_data = skor_survei.iloc[[position]]
+        
+        fungsi_hsh = fungsi_data.iloc[0]['HSH'] if 'HSH' in fungsi_data.columns else selected_hsh
+        benchmark_data, _ = resolve_benchmark_row(skor_benchmark_survei, fungsi_hsh, 'benchmark survei')
+        
+        skor_survei_val = fungsi_data.iloc[0]['Skor Survei'] if 'Skor Survei' in fungsi_data.columns else 'N/A'
+        skor_pekerja_val = fungsi_data.iloc[0]['SKOR PEKERJA'] if 'SKOR PEKERJA' in fungsi_data.columns else 'N/A'
+        skor_mitra_val = fungsi_data.iloc[0]['SKOR MITRA KERJA'] if 'SKOR MITRA KERJA' in fungsi_data.columns else 'N/A'
+        
+        p_akhlak = fungsi_data.iloc[0]['P. AKHLAK'] if 'P. AKHLAK' in fungsi_data.columns else 'N/A'
+        p_one = fungsi_data.iloc[0]['P. ONE Pertamina'] if 'P. ONE Pertamina' in fungsi_data.columns else 'N/A'
+        p_program = fungsi_data.iloc[0]['P. Program Budaya'] if 'P. Program Budaya' in fungsi_data.columns else 'N/A'
+        p_keberlanjutan = fungsi_data.iloc[0]['P. Keberlanjutan'] if 'P. Keberlanjutan' in fungsi_data.columns else 'N/A'
+        p_safety = fungsi_data.iloc[0]['P. Safety'] if 'P. Safety' in fungsi_data.columns else 'N/A'
+        
+        mk_akhlak = fungsi_data.iloc[0]['MK. AKHLAK'] if 'MK. AKHLAK' in fungsi_data.columns else 'N/A'
+        mk_one = fungsi_data.iloc[0]['MK. ONE Pertamina'] if 'MK. ONE Pertamina' in fungsi_data.columns else 'N/A'
+        mk_program = fungsi_data.iloc[0]['MK. Program Budaya'] if 'MK. Program Budaya' in fungsi_data.columns else 'N/A'
+        mk_keberlanjutan = fungsi_data.iloc[0]['MK. Keberlanjutan'] if 'MK. Keberlanjutan' in fungsi_data.columns else 'N/A'
+        mk_safety = fungsi_data.iloc[0]['MK. Safety'] if 'MK. Safety' in fungsi_data.columns else 'N/A'
+        
+        benchmark_pekerja = benchmark_data.iloc[0, 6] if len(benchmark_data.columns) > 6 else 'N/A'
+        benchmark_mitra = benchmark_data.iloc[0, 12] if len(benchmark_data.columns) > 12 else 'N/A'
+        benchmark_survei = benchmark_data.iloc[0, 13] if len(benchmark_data.columns) > 13 else 'N/A'
+        
+        b_p_akhlak = benchmark_data.iloc[0, 1] if len(benchmark_data.columns) > 1 else 'N/A'
+        b_p_one = benchmark_data.iloc[0, 2] if len(benchmark_data.columns) > 2 else 'N/A'
+        b_p_program = benchmark_data.iloc[0, 3] if len(benchmark_data.columns) > 3 else 'N/A'
+        b_p_keberlanjutan = benchmark_data.iloc[0, 4] if len(benchmark_data.columns) > 4 else 'N/A'
+        b_p_safety = benchmark_data.iloc[0, 5] if len(benchmark_data.columns) > 5 else 'N/A'
+        
+        b_mk_akhlak = benchmark_data.iloc[0, 7] if len(benchmark_data.columns) > 7 else 'N/A'
+        b_mk_one = benchmark_data.iloc[0, 8] if len(benchmark_data.columns) > 8 else 'N/A'
+        b_mk_program = benchmark_data.iloc[0, 9] if len(benchmark_data.columns) > 9 else 'N/A'
+        b_mk_keberlanjutan = benchmark_data.iloc[0, 10] if len(benchmark_data.columns) > 10 else 'N/A'
+        b_mk_safety = benchmark_data.iloc[0, 11] if len(benchmark_data.columns) > 11 else 'N/A'
+        
+        total_differences = gaps.strict_differences(position, ['Skor Survei', 'SKOR PEKERJA', 'SKOR MITRA KERJA'])
+        diff_survei = total_differences['Skor Survei']
+        diff_pekerja = total_differences['SKOR PEKERJA']
+        diff_mitra = total_differences['SKOR MITRA KERJA']
+        
+        benchmark_hsh_display = benchmark_data.iloc[0, 0]
+        
+        comparison_text = f"""
+PERBANDINGAN SKOR SURVEI
+
+Fungsi: {selected_fungsi}
+HSH Fungsi: {fungsi_hsh}
+HSH Benchmark: {benchmark_hsh_display}
+
+=== RINGKASAN SKOR FUNGSI ===
+• Skor Survei Total: {skor_survei_val}
+• SKOR PEKERJA: {skor_pekerja_val}
+  - P. AKHLAK: {p_akhlak}
+  - P. ONE Pertamina: {p_one}
+  - P. Program Budaya: {p_program}
+  - P. Keberlanjutan: {p_keberlanjutan}
+  - P. Safety: {p_safety}
+
+• SKOR MITRA KERJA: {skor_mitra_val}
+  - MK. AKHLAK: {mk_akhlak}
+  - MK. ONE Pertamina: {mk_one}
+  - MK. Program Budaya: {mk_program}
+  - MK. Keberlanjutan: {mk_keberlanjutan}
+  - MK. Safety: {mk_safety}
+
+=== BENCHMARK ({benchmark_hsh_display}) ===
+• Skor Survei Total: {benchmark_survei}
+• SKOR PEKERJA: {benchmark_pekerja}
+  - P. AKHLAK: {b_p_akhlak}
+  - P. ONE Pertamina: {b_p_one}
+  - P. Program Budaya: {b_p_program}
+  - P. Keberlanjutan: {b_p_keberlanjutan}
+  - P. Safety: {b_p_safety}
+
+• SKOR MITRA KERJA: {benchmark_mitra}
+  - MK. AKHLAK: {b_mk_akhlak}
+  - MK. ONE Pertamina: {b_mk_one}
+  - MK. Program Budaya: {b_mk_program}
+  - MK. Keberlanjutan: {b_mk_keberlanjutan}
+  - MK. Safety: {b_mk_safety}
+
+=== SELISIH (Fungsi - Benchmark) ===
+• Skor Survei Total: {diff_survei} {'✓' if diff_survei != 'N/A' and diff_survei > 0 else '⚠' if diff_survei != 'N/A' and diff_survei < 0 else ''}
+• SKOR PEKERJA: {diff_pekerja} {'✓' if diff_pekerja != 'N/A' and diff_pekerja > 0 else '⚠' if diff_pekerja != 'N/A' and diff_pekerja < 0 else ''}
+• SKOR MITRA KERJA: {diff_mitra} {'✓' if diff_mitra != 'N/A' and diff_mitra > 0 else '⚠' if diff_mitra != 'N/A' and diff_mitra < 0 else ''}
+
+Catatan:
+✓ = Fungsi LEBIH BAIK dari benchmark
+⚠ = Fungsi memiliki PELUANG PENGEMBANGAN
+"""
+        
+        prompt = f"""
+Analisis perbandingan Survei berikut dengan pendekatan APRESIATIF dan PROFESIONAL:
+
+{comparison_text}
+
+EVALUASI:
+Bandingkan persepsi pekerja dan mitra kerja terhadap implementasi budaya pada fungsi dengan benchmark, meliputi:
+1. Pemahaman dan penerapan nilai AKHLAK
+2. Implementasi ONE Pertamina
+3. Partisipasi dalam Program Budaya
+4. Komitmen terhadap Keberlanjutan
+5. Budaya Safety
+
+FOKUS: Aspek PERILAKU - persepsi dan pengalaman pekerja & mitra kerja terhadap budaya kerja
+
+TONE: Apresiatif, profesional, berbasis data survei
+
+Berikan output dalam format:
+
+**Apresiasi Pencapaian:**
+[Apresiasi terhadap skor yang sudah di atas atau sesuai benchmark, soroti area kekuatan dalam persepsi pekerja dan mitra kerja]
+
+**Hal yang Sudah Baik:**
+- [Area spesifik 1 dengan skor di atas benchmark - apresiasi dengan data]
+- [Area spesifik 2 dengan skor di atas benchmark - apresiasi dengan data]
+- [Area spesifik 3 - jika ada]
+
+**Peluang Pengembangan Lebih Lanjut:**
+- [Area 1 yang dapat ditingkatkan - saran konkret untuk meningkatkan persepsi dan pengalaman]
+- [Area 2 yang dapat ditingkatkan - saran konkret untuk meningkatkan persepsi dan pengalaman]
+- [Area 3 - jika perlu]
+"""
+        return call_openai(prompt, max_tokens=3500)
+    except Exception as e:
+        return f"Error dalam analisis survei: {str(e)}\n\nDetail error: {e.__class__.__name__}"
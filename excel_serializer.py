@@ -0,0 +1,123 @@
+"""Serialisasi workbook upload (PCB/Impact) menjadi teks prompt yang ringkas.
+
+Semua sheet dibaca dengan openpyxl mode read-only (streaming), baris/kolom kosong dibuang,
+lalu tiap sheet ditulis sebagai tabel CSV di bawah judul markdown.
+"""
+import csv
+import datetime
+import io
+from contextlib import closing
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from text_chunker import CHARS_PER_TOKEN, estimate_tokens
+
+
+def _is_empty(value):
+    if value is None:
+        return True
+    if isinstance(value, float) and value != value:
+        return True
+    return isinstance(value, str) and not value.strip()
+
+
+def _format_cell(value):
+    if _is_empty(value):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat() if value.time() == datetime.time() else value.isoformat(sep=' ')
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, str):
+        return ' '.join(value.split())
+    return str(value)
+
+
+class LegacyTextSize:
+    """Perkiraan panjang teks format lama (DataFrame.to_string per sheet) tanpa membangun teksnya.
+
+    Lebar tiap kolom dicatat selagi baris dilewatkan; to_string meratakan kolom ke lebar
+    terbesarnya, jadi panjang sheet = (baris + header) x (indeks + jumlah lebar kolom + pemisah).
+    """
+
+    def __init__(self):
+        self.chars = 0
+
+    def track(self, rows):
+        widths = []
+        count = 0
+        for row in rows:
+            count += 1
+            for j, value in enumerate(row):
+                width = 3 if value is None or (isinstance(value, float) and value != value) else len(str(value))
+                if j == len(widths):
+                    widths.append(max(width, len(str(j))))
+                elif width > widths[j]:
+                    widths[j] = width
+            yield row
+        if count:
+            self.chars += (count + 1) * (len(str(count - 1)) + sum(width + 2 for width in widths) + 1)
+
+    @property
+    def tokens(self):
+        return (self.chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def compact_rows(rows):
+    """Buang baris dan kolom yang seluruhnya kosong.
+
+    rows dibaca sekali (boleh iterator); hanya baris yang tidak kosong yang disimpan, karena kolom
+    kosong baru diketahui setelah baris terakhir.
+    """
+    rows = [list(row) for row in rows if not all(_is_empty(value) for value in row)]
+    if not rows:
+        return []
+    width = max(len(row) for row in rows)
+    rows = [row + [None] * (width - len(row)) for row in rows]
+    keep = [j for j in range(width) if not all(_is_empty(row[j]) for row in rows)]
+    return [[row[j] for j in keep] for row in rows]
+
+
+def _read_sheets(file, extension):
+    """Generator (nama sheet, iterator baris) — .xlsx via openpyxl read-only, .xls via pandas.
+
+    Baris tiap sheet harus dibaca sebelum sheet berikutnya diminta; workbook ditutup di akhir.
+    """
+    if extension == 'xls':
+        frames = pd.read_excel(file, sheet_name=None, header=None)
+        for name, df in frames.items():
+            yield name, df.itertuples(index=False, name=None)
+        return
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            yield sheet.title, sheet.iter_rows(values_only=True)
+    finally:
+        # Mode read-only menahan file handle sampai workbook ditutup
+        workbook.close()
+
+
+def serialize_workbook(file, extension='xlsx'):
+    """Teks ringkas seluruh sheet + statistik {'sheets', 'tokens_before', 'tokens_after'}.
+
+    tokens_before: perkiraan token format lama (DataFrame.to_string tiap sheet) sebagai pembanding.
+    """
+    parts = []
+    sheet_count = 0
+    legacy = LegacyTextSize()
+    with closing(_read_sheets(file, extension)) as sheets:
+        for name, rows in sheets:
+            rows = compact_rows(legacy.track(rows))
+            if not rows:
+                continue
+            sheet_count += 1
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator='\n')
+            for row in rows:
+                writer.writerow([_format_cell(value) for value in row])
+            parts.append(f"## Sheet: {name}\n{buffer.getvalue()}")
+    text = "\n".join(parts)
+    return text, {'sheets': sheet_count, 'tokens_before': legacy.tokens, 'tokens_after': estimate_tokens(text)}
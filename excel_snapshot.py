@@ -0,0 +1,173 @@
+"""Snapshot kolumnar (Arrow/Feather) dari workbook skor dan benchmark.
+
+Parsing .xlsx dengan openpyxl lambat; snapshot dibuat sekali lalu di-memory-map pada load berikutnya.
+Snapshot satu sheet dibangun ulang hanya jika mtime/hash workbook sumbernya berubah.
+
+Build manual (misalnya di langkah deploy):
+    python excel_snapshot.py [--force]
+"""
+import argparse
+import copy
+import hashlib
+import json
+import os
+import tempfile
+
+import pandas as pd
+import pyarrow.feather as feather
+
+SNAPSHOT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _to_arrow_safe(df):
+    """Kolom object campuran (mis. baris header di tengah data) diubah jadi numerik atau string."""
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        numeric = pd.to_numeric(df[col], errors='coerce')
+        if numeric.isna().sum() == df[col].isna().sum():
+            df[col] = numeric
+        else:
+            df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+    df.columns = [str(c) for c in df.columns]
+    return df
+
+
+def _replace_atomically(path, write):
+    """Tulis lewat file sementara unik lalu os.replace; write(tmp_path) menulis isinya.
+
+    UI, worker, dan mode batch bisa membangun ulang snapshot bersamaan: nama sementara yang
+    unik mencegah tulisan mereka bercampur di satu file .tmp.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=os.path.basename(path) + '.',
+                                    suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _write_json(manifest):
+    def write(tmp_path):
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+    return write
+
+
+class ExcelSnapshot:
+    """Menyimpan tiap sheet sebagai file .feather (tanpa kompresi, bisa di-memory-map).
+
+    sheets: dict {nama: (path workbook, nama sheet)}.
+    read_sheet(nama, path, sheet) membaca sheet dari Excel dan menambahkan kolom turunan.
+    """
+
+    def __init__(self, directory, sheets, read_sheet):
+        self.directory = directory
+        self.sheets = sheets
+        self.read_sheet = read_sheet
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {'version': SNAPSHOT_VERSION, 'workbooks': {}, 'sheets': {}}
+        if manifest.get('version') != SNAPSHOT_VERSION:
+            return {'version': SNAPSHOT_VERSION, 'workbooks': {}, 'sheets': {}}
+        return manifest
+
+    def _save_manifest(self, manifest):
+        _replace_atomically(self.manifest_path, _write_json(manifest))
+
+    def _sheet_path(self, name):
+        return os.path.join(self.directory, f'{name}.feather')
+
+    def _changed_workbooks(self, manifest, force=False):
+        """Workbook yang isinya berubah; cek mtime/ukuran dulu, hash hanya jika perlu."""
+        changed = {}
+        for path in sorted({path for path, _ in self.sheets.values()}):
+            stat = os.stat(path)
+            recorded = manifest['workbooks'].get(path)
+            fingerprint = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+            if not force and recorded and all(recorded.get(k) == v for k, v in fingerprint.items()):
+                continue
+            fingerprint['sha256'] = file_sha256(path)
+            if not force and recorded and recorded.get('sha256') == fingerprint['sha256']:
+                # Hanya mtime yang berubah (mis. file disalin ulang): cukup perbarui manifest
+                manifest['workbooks'][path] = fingerprint
+                continue
+            changed[path] = fingerprint
+        return changed
+
+    def refresh(self, force=False):
+        """Membangun ulang snapshot sheet yang sumbernya berubah; mengembalikan nama sheet yang dibangun."""
+        os.makedirs(self.directory, exist_ok=True)
+        manifest = self._load_manifest()
+        original = copy.deepcopy(manifest)
+        changed = self._changed_workbooks(manifest, force=force)
+        rebuilt = []
+        for name, (path, sheet_name) in self.sheets.items():
+            recorded = manifest['sheets'].get(name)
+            up_to_date = (
+                path not in changed
+                and recorded == {'workbook': path, 'sheet': sheet_name}
+                and os.path.exists(self._sheet_path(name))
+            )
+            if up_to_date:
+                continue
+            df = _to_arrow_safe(self.read_sheet(name, path, sheet_name))
+            _replace_atomically(self._sheet_path(name),
+                                lambda tmp_path: feather.write_feather(df, tmp_path, compression='uncompressed'))
+            manifest['sheets'][name] = {'workbook': path, 'sheet': sheet_name}
+            rebuilt.append(name)
+        manifest['workbooks'].update(changed)
+        # Tidak menulis ulang manifest jika tidak ada perubahan (refresh dipanggil berkala oleh watcher)
+        if manifest != original:
+            self._save_manifest(manifest)
+        return rebuilt
+
+    def sheet_version(self, name):
+        """mtime_ns file snapshot sheet (berubah setiap kali snapshot sheet dibangun ulang), atau None."""
+        try:
+            return os.stat(self._sheet_path(name)).st_mtime_ns
+        except OSError:
+            return None
+
+    def read(self, name):
+        table = feather.read_table(self._sheet_path(name), memory_map=True)
+        return table.to_pandas(split_blocks=True)
+
+    def load(self):
+        """Refresh bila perlu lalu baca semua sheet dari snapshot."""
+        self.refresh()
+        return {name: self.read(name) for name in self.sheets}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bangun snapshot kolumnar dari workbook di folder documents")
+    parser.add_argument('--force', action='store_true', help="Bangun ulang semua sheet walaupun tidak berubah")
+    args = parser.parse_args(argv)
+
+    from reference_data import get_reference_snapshot
+
+    rebuilt = get_reference_snapshot().refresh(force=args.force)
+    print(f"Snapshot diperbarui: {', '.join(rebuilt)}" if rebuilt else "Snapshot sudah terbaru")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""Perhitungan selisih skor Fungsi vs benchmark untuk semua Fungsi sekaligus (vektor NumPy).
+
+Setiap baris Fungsi dipasangkan dengan baris benchmark hasil resolusi HSH, lalu seluruh
+matriks selisih dihitung dalam satu operasi. Permintaan per Fungsi cukup membaca satu baris.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from hsh_index import get_hsh_index
+
+EVIDENCE_DIMENSIONS = ['Strategi Budaya', 'Monitoring & Evaluasi', 'Sosialisasi & Partisipasi',
+                       'Pelaporan Bulanan', 'Apresiasi Pelanggan', 'Pemahaman Program',
+                       'Reward & Consequences', 'SK AoC', 'Impact to Business']
+# Posisi kolom: SKOR TOTAL_ALL mulai kolom ke-3, sheet benchmark Evidence mulai kolom ke-1
+EVIDENCE_FUNGSI_COLUMNS = list(range(3, 3 + len(EVIDENCE_DIMENSIONS)))
+EVIDENCE_BENCHMARK_COLUMNS = list(range(1, 1 + len(EVIDENCE_DIMENSIONS)))
+
+# Urutan sama dengan kolom 1..13 pada sheet benchmark Survei
+SURVEI_DIMENSIONS = ['P. AKHLAK', 'P. ONE Pertamina', 'P. Program Budaya', 'P. Keberlanjutan', 'P. Safety',
+                     'SKOR PEKERJA', 'MK. AKHLAK', 'MK. ONE Pertamina', 'MK. Program Budaya',
+                     'MK. Keberlanjutan', 'MK. Safety', 'SKOR MITRA KERJA', 'Skor Survei']
+SURVEI_BENCHMARK_COLUMNS = list(range(1, 1 + len(SURVEI_DIMENSIONS)))
+
+CACHE_SIZE = 4
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _numeric_block(df, locators):
+    """Matriks float untuk kolom-kolom (posisi int atau nama kolom).
+
+    convertible menandai sel yang bisa di-float() (angka, string angka, atau NaN);
+    present menandai kolom yang memang ada di sheet.
+    """
+    values = np.full((len(df), len(locators)), np.nan)
+    convertible = np.zeros((len(df), len(locators)), dtype=bool)
+    present = np.zeros(len(locators), dtype=bool)
+    for j, locator in enumerate(locators):
+        if isinstance(locator, int):
+            if locator >= len(df.columns):
+                continue
+            column = df.iloc[:, locator]
+        else:
+            if locator not in df.columns:
+                continue
+            column = df[locator]
+        if pd.api.types.is_numeric_dtype(column):
+            values[:, j] = column.to_numpy(dtype=float, na_value=np.nan)
+            convertible[:, j] = True
+        else:
+            # Kolom teks (mis. sheet Survei yang berisi baris header): pakai float() agar hasilnya sama persis
+            parsed = [_to_float(value) for value in column]
+            values[:, j] = [np.nan if value is None else value for value in parsed]
+            convertible[:, j] = [value is not None for value in parsed]
+        present[j] = True
+    return values, convertible, present
+
+
+class GapTable:
+    """Selisih (Fungsi - Benchmark) untuk semua Fungsi pada satu kelompok dimensi."""
+
+    def __init__(self, fungsi_df, benchmark_df, dimensions, fungsi_columns, benchmark_columns):
+        self.dimensions = list(dimensions)
+        self.fungsi = fungsi_df['Fungsi'].tolist()
+        self.hsh = fungsi_df['HSH'].tolist() if 'HSH' in fungsi_df.columns else [None] * len(fungsi_df)
+        self._row_of = {}
+        for position, name in enumerate(self.fungsi):
+            self._row_of.setdefault(name, position)
+
+        index = get_hsh_index(benchmark_df, 'HSH_normalized')
+        matches = {hsh: index.lookup(hsh) for hsh in set(self.hsh)}
+        self.benchmark_positions = np.array([matches[hsh].position for hsh in self.hsh], dtype=int)
+        self.match_tiers = [matches[hsh].tier for hsh in self.hsh]
+        self.benchmark_hsh = benchmark_df.iloc[:, 0].to_numpy()[self.benchmark_positions]
+
+        fungsi_values, fungsi_ok, fungsi_present = _numeric_block(fungsi_df, fungsi_columns)
+        bench_values, bench_ok, bench_present = _numeric_block(benchmark_df, benchmark_columns)
+        self.fungsi_values = fungsi_values
+        self.benchmark_values = bench_values[self.benchmark_positions]
+        self.present = fungsi_present & bench_present
+        self.convertible = fungsi_ok & bench_ok[self.benchmark_positions]
+        self.diff = self.fungsi_values - self.benchmark_values
+
+    def row(self, fungsi_name):
+        return self._row_of.get(fungsi_name)
+
+    def differences(self, position):
+        """{dimensi: selisih} untuk dimensi yang ada di kedua sheet dan nilainya numerik."""
+        valid = self.present & self.convertible[position]
+        return {
+            name: float(self.diff[position, j])
+            for j, name in enumerate(self.dimensions) if valid[j]
+        }
+
+    def strict_differences(self, position, names):
+        """Selisih untuk dimensi tertentu; dimensi yang tidak ada jadi 'N/A'.
+
+        Jika salah satu nilai tidak numerik, semua dimensi dianggap 'N/A'.
+        """
+        columns = [self.dimensions.index(name) for name in names]
+        if any(self.present[j] and not self.convertible[position, j] for j in columns):
+            return {name: 'N/A' for name in names}
+        return {
+            name: float(self.diff[position, j]) if self.present[j] else 'N/A'
+            for name, j in zip(names, columns)
+        }
+
+    def to_frame(self):
+        """Tabel selisih seluruh Fungsi (satu baris per Fungsi)."""
+        frame = pd.DataFrame(self.diff, columns=self.dimensions)
+        frame = frame.loc[:, self.present]
+        frame.insert(0, 'Match Tier', self.match_tiers)
+        frame.insert(0, 'HSH Benchmark', self.benchmark_hsh)
+        frame.insert(0, 'HSH', self.hsh)
+        frame.insert(0, 'Fungsi', self.fungsi)
+        return frame
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cached(kind, frames, build):
+    """Tabel per objek frame (bukan per isi): data referensi beku dan dipakai bersama, sehingga
+    objek yang sama berarti isi yang sama; saat dimuat ulang cache dikosongkan (clear_cache).
+
+    Frame disimpan bersama tabel agar id-nya tidak dipakai ulang objek lain selama entri ada.
+    """
+    key = (kind,) + tuple(id(df) for df in frames)
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and all(a is b for a, b in zip(entry[0], frames)):
+            _cache.move_to_end(key)
+            return entry[1]
+    table = build()
+    with _cache_lock:
+        _cache[key] = (tuple(frames), table)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return table
+
+
+def get_evidence_gaps(skor_total, skor_benchmark_evidence):
+    return _cached('evidence', (skor_total, skor_benchmark_evidence), lambda: GapTable(
+        skor_total, skor_benchmark_evidence,
+        EVIDENCE_DIMENSIONS, EVIDENCE_FUNGSI_COLUMNS, EVIDENCE_BENCHMARK_COLUMNS
+    ))
+
+
+def get_survei_gaps(skor_survei, skor_benchmark_survei):
+    return _cached('survei', (skor_survei, skor_benchmark_survei), lambda: GapTable(
+        skor_survei, skor_benchmark_survei,
+        SURVEI_DIMENSIONS, SURVEI_DIMENSIONS, SURVEI_BENCHMARK_COLUMNS
+    ))
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,130 @@
+"""Index pencarian HSH untuk sheet benchmark.
+
+Dibangun sekali per daftar nama HSH, lalu setiap lookup cukup O(1) (exact) atau
+beberapa operasi set (fuzzy). Hasil lookup membawa tier yang dipakai untuk audit.
+"""
+import logging
+import threading
+from collections import Counter, OrderedDict, namedtuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_HSH = 'PERTAMINA GROUP'
+NGRAM_SIZE = 3
+
+# Tier: 'exact', 'fuzzy' (substring), 'fallback' (Pertamina Group), 'default' (baris pertama)
+HSHMatch = namedtuple('HSHMatch', ['position', 'tier'])
+
+
+def normalize_hsh(hsh_name):
+    if pd.isna(hsh_name):
+        return ""
+    normalized = str(hsh_name).strip().upper()
+    normalized = ' '.join(normalized.split())
+    return normalized
+
+
+def _ngrams(text):
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+class HSHIndex:
+    """Index atas daftar nama HSH (urutan = posisi baris di sheet).
+
+    Aturan pencocokan sama dengan pencarian linear sebelumnya: exact match pada nama
+    ternormalisasi, lalu baris pertama yang namanya mengandung / terkandung dalam target,
+    lalu baris pertama yang mengandung 'PERTAMINA GROUP', lalu baris pertama.
+    """
+
+    def __init__(self, names):
+        self.names = [normalize_hsh(name) for name in names]
+        self.exact = {}
+        self.ngrams = {}
+        self.short_names = []
+        for position, name in enumerate(self.names):
+            self.exact.setdefault(name, position)
+            if len(name) < NGRAM_SIZE:
+                # Nama terlalu pendek untuk n-gram (termasuk nama kosong) selalu jadi kandidat
+                self.short_names.append(position)
+            for gram in _ngrams(name):
+                self.ngrams.setdefault(gram, []).append(position)
+        self.fallback = next(
+            (position for position, name in enumerate(self.names) if FALLBACK_HSH in name), None
+        )
+        self.tier_counts = Counter()
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def _fuzzy(self, target):
+        if not target:
+            return 0 if self.names else None
+        if len(target) < NGRAM_SIZE:
+            candidates = range(len(self.names))
+        else:
+            # Nama yang mengandung target, atau terkandung dalam target, pasti berbagi n-gram dengannya
+            candidates = set(self.short_names)
+            for gram in _ngrams(target):
+                candidates.update(self.ngrams.get(gram, ()))
+        for position in sorted(candidates):
+            name = self.names[position]
+            if target in name or name in target:
+                return position
+        return None
+
+    def _resolve(self, target):
+        position = self.exact.get(target)
+        if position is not None:
+            return HSHMatch(position, 'exact')
+        position = self._fuzzy(target)
+        if position is not None:
+            return HSHMatch(position, 'fuzzy')
+        if self.fallback is not None:
+            return HSHMatch(self.fallback, 'fallback')
+        if self.names:
+            return HSHMatch(0, 'default')
+        return HSHMatch(None, 'none')
+
+    def lookup(self, hsh_name):
+        target = normalize_hsh(hsh_name)
+        with self._lock:
+            match = self._memo.get(target)
+            if match is None:
+                match = self._memo[target] = self._resolve(target)
+            self.tier_counts[match.tier] += 1
+        logger.debug("HSH lookup %r -> posisi %s (%s)", hsh_name, match.position, match.tier)
+        return match
+
+
+INDEX_CACHE_SIZE = 16
+
+_index_cache = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def get_hsh_index(source, column=None):
+    """Index untuk daftar nama source (atau kolom column dari DataFrame source).
+
+    Key cache adalah identitas objek source (data referensi beku, lihat reference_data), bukan
+    isinya, sehingga lookup tidak perlu menyalin daftar nama; source tidak boleh diubah.
+    """
+    key = (id(source), column)
+    with _index_cache_lock:
+        entry = _index_cache.get(key)
+        if entry is not None and entry[0] is source:
+            _index_cache.move_to_end(key)
+            return entry[1]
+    index = HSHIndex(source[column].tolist() if column is not None else list(source))
+    with _index_cache_lock:
+        # source ikut disimpan agar id-nya tidak dipakai ulang objek lain selama entri ada
+        _index_cache[key] = (source, index)
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
+def clear_index_cache():
+    """Lepas semua index (dipanggil saat data referensi dimuat ulang)."""
+    with _index_cache_lock:
+        _index_cache.clear()
@@ -0,0 +1,315 @@
+"""Antrean job laporan yang persisten (SQLite) untuk diproses worker di proses terpisah.
+
+UI hanya memasukkan job (beserta isi file upload) lalu membaca progresnya; job tetap berjalan
+walaupun tab browser ditutup atau koneksi terputus. Worker mengambil job dengan lease yang
+diperpanjang berkala: jika worker mati, job diambil ulang worker lain setelah lease habis.
+Job yang gagal dicoba ulang dengan jeda bertingkat sampai JOB_MAX_ATTEMPTS kali.
+
+Job dengan input yang sama persis (HSH, Fungsi, dan isi file; lihat input_key) dengan job yang
+sedang berjalan tidak diambil sampai job tersebut selesai, sehingga worker lain tidak membayar
+ulang panggilan LLM yang sama; setelahnya job itu memakai arsip laporan / hasil per bagian.
+
+Hasil per bagian (per fingerprint input, lihat section_graph) juga disimpan di sini sehingga
+bagian yang inputnya tidak berubah dipakai ulang lintas job dan sesi.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+JOB_DB_PATH = os.environ.get("RAPPORT_JOB_DB", os.path.join('.cache', 'jobs.sqlite'))
+# Jumlah job yang diproses bersamaan oleh proses worker yang dijalankan UI (satu proses, satu
+# thread per job, agar single-flight, admission control, dan cache LLM dipakai bersama);
+# 0 = worker dijalankan terpisah: python job_worker.py
+JOB_WORKERS = int(os.environ.get("RAPPORT_JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("RAPPORT_JOB_MAX_ATTEMPTS", "3"))
+# Jeda sebelum percobaan ulang ke-n = JOB_RETRY_SECONDS * 2^(n-1)
+JOB_RETRY_SECONDS = float(os.environ.get("RAPPORT_JOB_RETRY_SECONDS", "30"))
+# Job yang lease-nya tidak diperpanjang selama ini dianggap ditinggal worker-nya
+JOB_LEASE_SECONDS = float(os.environ.get("RAPPORT_JOB_LEASE_SECONDS", "60"))
+# Job selesai/gagal (termasuk file .docx-nya) dihapus setelah umur ini
+JOB_TTL_HOURS = int(os.environ.get("RAPPORT_JOB_TTL_HOURS", "168"))
+# Jumlah hasil per bagian (per fingerprint) yang disimpan untuk dipakai ulang
+SECTION_RESULTS_MAX = int(os.environ.get("RAPPORT_SECTION_RESULTS_MAX", "500"))
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+def input_key(hsh, fungsi, files):
+    """Hash input job (HSH, Fungsi, nama & isi file per peran) untuk mengenali job kembar."""
+    digest = hashlib.sha256(json.dumps([hsh, fungsi]).encode('utf-8'))
+    for role in sorted(files):
+        for name, data in files[role]:
+            digest.update(f"\0{role}\0{name}\0{len(data)}\0".encode('utf-8'))
+            digest.update(data)
+    return digest.hexdigest()
+
+
+class JobQueue:
+    """Tabel job, file upload per job, dan hasil per bagian; aman dipakai banyak thread dan proses."""
+
+    def __init__(self, path=JOB_DB_PATH, max_attempts=JOB_MAX_ATTEMPTS, retry_seconds=JOB_RETRY_SECONDS,
+                 lease_seconds=JOB_LEASE_SECONDS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_seconds = retry_seconds
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " hsh TEXT, fungsi TEXT,"
+            " params TEXT NOT NULL,"
+            " created_at REAL NOT NULL, updated_at REAL NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " not_before REAL NOT NULL DEFAULT 0,"
+            " lease_until REAL, worker TEXT,"
+            " progress TEXT, sections TEXT, error TEXT,"
+            " filename TEXT, docx BLOB, input_key TEXT);"
+            "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at);"
+            "CREATE TABLE IF NOT EXISTS job_files ("
+            " job_id TEXT NOT NULL, role TEXT NOT NULL, position INTEGER NOT NULL,"
+            " name TEXT NOT NULL, data BLOB NOT NULL,"
+            " PRIMARY KEY (job_id, role, position));"
+            "CREATE TABLE IF NOT EXISTS section_results ("
+            " fingerprint TEXT PRIMARY KEY, outputs TEXT NOT NULL, created_at REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS idx_section_results_created ON section_results(created_at);"
+        )
+        # Database dari versi sebelumnya belum punya kolom input_key
+        if 'input_key' not in {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN input_key TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_input ON jobs(input_key, status)")
+
+    def _transaction(self, func):
+        # BEGIN IMMEDIATE: ambil lock tulis di awal agar dua worker tidak mengklaim job yang sama
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def enqueue(self, hsh, fungsi, files, params=None):
+        """Masukkan job baru; files: {role: [(nama, bytes), ...]}. Mengembalikan id job."""
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+
+        def insert(conn):
+            conn.execute(
+                "INSERT INTO jobs (id, status, hsh, fungsi, params, created_at, updated_at, input_key)"
+                " VALUES (?, 'queued', ?, ?, ?, ?, ?, ?)",
+                (job_id, hsh, fungsi, json.dumps(params or {}), now, now, input_key(hsh, fungsi, files))
+            )
+            conn.executemany(
+                "INSERT INTO job_files (job_id, role, position, name, data) VALUES (?, ?, ?, ?, ?)",
+                [(job_id, role, position, name, data)
+                 for role, items in files.items() for position, (name, data) in enumerate(items)]
+            )
+
+        self._transaction(insert)
+        return job_id
+
+    def claim(self, worker):
+        """Ambil job berikutnya yang siap (atau yang ditinggal worker mati); None jika tidak ada.
+
+        Job yang input_key-nya sama dengan job lain yang sedang berjalan (lease masih berlaku)
+        dilewati dulu; worker berikutnya mengambilnya setelah job kembarnya selesai.
+        """
+        def take(conn):
+            now = time.time()
+            while True:
+                row = conn.execute(
+                    "SELECT id, attempts, status FROM jobs AS j"
+                    " WHERE ((status = 'queued' AND not_before <= ?) OR (status = 'running' AND lease_until < ?))"
+                    " AND NOT EXISTS (SELECT 1 FROM jobs AS r WHERE r.input_key = j.input_key AND r.id != j.id"
+                    " AND r.status = 'running' AND r.lease_until >= ?)"
+                    " ORDER BY created_at LIMIT 1",
+                    (now, now, now)
+                ).fetchone()
+                if row is None:
+                    return None
+                job_id, attempts, status = row
+                if status == 'running' and attempts >= self.max_attempts:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                        ("Worker berhenti saat memproses job (percobaan habis)", now, job_id)
+                    )
+                    continue
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?,"
+                    " lease_until = ?, updated_at = ? WHERE id = ?",
+                    (worker, now + self.lease_seconds, now, job_id)
+                )
+                return job_id
+
+        job_id = self._transaction(take)
+        return self.get(job_id) if job_id else None
+
+    def files(self, job_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, name, data FROM job_files WHERE job_id = ? ORDER BY role, position", (job_id,)
+            ).fetchall()
+        files = {}
+        for role, name, data in rows:
+            files.setdefault(role, []).append((name, data))
+        return files
+
+    def heartbeat(self, job_id, worker, progress=None, sections=None):
+        """Perpanjang lease dan simpan progres; False jika job sudah bukan milik worker ini."""
+        now = time.time()
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ?,"
+                " progress = COALESCE(?, progress), sections = COALESCE(?, sections)"
+                " WHERE id = ? AND worker = ? AND status = 'running'",
+                (now + self.lease_seconds, now,
+                 json.dumps(progress, ensure_ascii=False) if progress is not None else None,
+                 json.dumps(sections, ensure_ascii=False) if sections is not None else None,
+                 job_id, worker)
+            ).rowcount
+        return updated > 0
+
+    def complete(self, job_id, worker, sections, docx, filename):
+        now = time.time()
+
+        def finish(conn):
+            # Job yang sudah diambil alih worker lain (lease habis) tidak ditimpa
+            updated = conn.execute(
+                "UPDATE jobs SET status = 'done', sections = ?, docx = ?, filename = ?, error = NULL,"
+                " lease_until = NULL, updated_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (json.dumps(sections, ensure_ascii=False), docx, filename, now, job_id, worker)
+            ).rowcount
+            if updated:
+                conn.execute("DELETE FROM job_files WHERE job_id = ?", (job_id,))
+
+        self._transaction(finish)
+
+    def fail(self, job_id, worker, error, sections=None):
+        """Catat kegagalan; job diantrekan ulang dengan jeda selama percobaan belum habis.
+
+        Mengembalikan True jika job akan dicoba lagi.
+        """
+        now = time.time()
+
+        def record(conn):
+            row = conn.execute("SELECT attempts FROM jobs WHERE id = ? AND worker = ? AND status = 'running'",
+                               (job_id, worker)).fetchone()
+            if row is None:
+                return False
+            retry = row[0] < self.max_attempts
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, sections = COALESCE(?, sections), not_before = ?,"
+                " lease_until = NULL, updated_at = ? WHERE id = ?",
+                ('queued' if retry else 'failed', error,
+                 json.dumps(sections, ensure_ascii=False) if sections is not None else None,
+                 now + self.retry_seconds * 2 ** (row[0] - 1) if retry else 0, now, job_id)
+            )
+            if not retry:
+                conn.execute("DELETE FROM job_files WHERE job_id = ?", (job_id,))
+            return retry
+
+        return self._transaction(record)
+
+    def get(self, job_id, with_docx=False):
+        columns = ("id, status, hsh, fungsi, params, created_at, updated_at, attempts, not_before,"
+                   " progress, sections, error, filename" + (", docx" if with_docx else ""))
+        with self._lock:
+            row = self._conn.execute(f"SELECT {columns} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(zip([c.strip() for c in columns.split(',')], row))
+        job['params'] = json.loads(job['params'])
+        job['progress'] = json.loads(job['progress']) if job['progress'] else {}
+        job['sections'] = json.loads(job['sections']) if job['sections'] else {}
+        job['max_attempts'] = self.max_attempts
+        return job
+
+    def position(self, job_id):
+        """Jumlah job antre yang dibuat lebih dulu (0 = berikutnya diproses)."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued'"
+                " AND created_at < (SELECT created_at FROM jobs WHERE id = ?)", (job_id,)
+            ).fetchone()[0]
+
+    def running_twin(self, job_id):
+        """Id job berjalan dengan input yang sama (yang ditunggu job ini); None jika tidak ada."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT r.id FROM jobs AS j JOIN jobs AS r ON r.input_key = j.input_key AND r.id != j.id"
+                " WHERE j.id = ? AND r.status = 'running' AND r.lease_until >= ? LIMIT 1", (job_id, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def purge(self, max_age_seconds=JOB_TTL_HOURS * 3600):
+        """Hapus job selesai/gagal yang lebih tua dari max_age_seconds."""
+        cutoff = time.time() - max_age_seconds
+
+        def delete(conn):
+            stale = [row[0] for row in conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (cutoff,))]
+            conn.executemany("DELETE FROM job_files WHERE job_id = ?", [(job_id,) for job_id in stale])
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in stale])
+            return len(stale)
+
+        return self._transaction(delete)
+
+    def section_outputs(self, fingerprints):
+        """{fingerprint: {key hasil: teks}} untuk fingerprint yang hasilnya sudah tersimpan."""
+        fingerprints = list(fingerprints)
+        if not fingerprints:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT fingerprint, outputs FROM section_results"
+                f" WHERE fingerprint IN ({','.join('?' * len(fingerprints))})", fingerprints
+            ).fetchall()
+        return {fingerprint: json.loads(outputs) for fingerprint, outputs in rows}
+
+    def save_section_outputs(self, outputs_by_fingerprint, is_error, max_entries=SECTION_RESULTS_MAX):
+        """Simpan hasil per fingerprint; hasil yang mengandung error (is_error) tidak disimpan agar
+        kegagalan sementara tidak menimpa hasil baik untuk fingerprint yang sama."""
+        now = time.time()
+        rows = [(fingerprint, json.dumps(outputs, ensure_ascii=False), now)
+                for fingerprint, outputs in outputs_by_fingerprint.items()
+                if not any(is_error(text) for text in outputs.values())]
+        if not rows:
+            return
+
+        def save(conn):
+            conn.executemany(
+                "INSERT OR REPLACE INTO section_results (fingerprint, outputs, created_at) VALUES (?, ?, ?)", rows
+            )
+            conn.execute(
+                "DELETE FROM section_results WHERE fingerprint NOT IN"
+                " (SELECT fingerprint FROM section_results ORDER BY created_at DESC LIMIT ?)", (max_entries,)
+            )
+
+        self._transaction(save)
+
+
+def start_worker_process(name, jobs=JOB_WORKERS, script=None):
+    """Jalankan `python job_worker.py` (jobs job bersamaan); worker berhenti sendiri jika proses ini mati."""
+    script = script or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'job_worker.py')
+    return subprocess.Popen([sys.executable, script, '--parent-pid', str(os.getpid()), '--name', name,
+                             '--jobs', str(jobs)])
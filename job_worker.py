@@ -0,0 +1,254 @@
+"""Worker antrean laporan: mengambil job dari job_queue, menjalankan analisis, dan menyimpan .docx.
+
+Biasanya dijalankan otomatis oleh UI: satu proses yang memproses RAPPORT_JOB_WORKERS job
+bersamaan (satu thread per job). Semua job dalam proses berbagi single-flight, admission control
+(kuota RPM/TPM penuh), dan cache LLM, sehingga bagian yang sama dari job berbeda hanya dibayar sekali.
+Untuk menjalankan worker terpisah (mis. di server lain yang berbagi file database), set
+RAPPORT_JOB_WORKERS=0 di UI lalu:
+
+    OPENAI_API_KEY=sk-... python job_worker.py --name w1 --jobs 2
+
+Beberapa proses worker hanya berbagi database job: job kembar (input_key sama) tidak dijalankan
+bersamaan, tetapi kuota RPM/TPM tiap proses terpisah (atur RAPPORT_LLM_RPM/TPM per proses).
+
+Metrik Prometheus ditulis worker setelah setiap job ke RAPPORT_METRICS_PROM_PATH dengan label
+worker=<nama>; untuk beberapa proses worker, pakai '{worker}' di path agar tiap proses punya file
+sendiri (mis. /var/lib/node_exporter/rapport_{worker}.prom).
+"""
+import argparse
+import contextvars
+import io
+import itertools
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import RapportLCV_3fabuabu as app
+from job_queue import JobQueue
+from report_archive import ReportArchive, report_input_hash, score_snapshot
+from section_graph import plan_sections, section_fingerprints
+from section_runtime import notices_to
+
+# Interval penyimpanan progres/teks sementara ke database (juga memperpanjang lease job)
+JOB_HEARTBEAT_SECONDS = float(os.environ.get("RAPPORT_JOB_HEARTBEAT_SECONDS", "1"))
+# Interval pemeriksaan job baru saat antrean kosong
+JOB_POLL_SECONDS = float(os.environ.get("RAPPORT_JOB_POLL_SECONDS", "1"))
+
+
+class NamedUpload(io.BytesIO):
+    """Isi file dari database yang meniru objek UploadedFile Streamlit (punya atribut name)."""
+
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+
+
+class JobReporter:
+    """Menampung progres & teks bagian lalu menyimpannya berkala dari thread latar (heartbeat)."""
+
+    def __init__(self, jobs, job_id, worker, interval=JOB_HEARTBEAT_SECONDS):
+        self.jobs = jobs
+        self.job_id = job_id
+        self.worker = worker
+        self.interval = interval
+        self.progress = {'percent': 0, 'status': '', 'notices': []}
+        self.sections = {}
+        self.lost = False
+        self._dirty = True
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, name=f'heartbeat-{job_id}', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def update(self, **progress):
+        with self._lock:
+            self.progress.update(progress)
+            self._dirty = True
+
+    def notice(self, level, message):
+        with self._lock:
+            self.progress['notices'].append((level, message))
+            self._dirty = True
+
+    def set_section(self, key, text):
+        with self._lock:
+            self.sections[key] = text
+            self._dirty = True
+
+    def _flush(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, False
+            progress = dict(self.progress) if dirty else None
+            sections = dict(self.sections) if dirty else None
+        if not self.jobs.heartbeat(self.job_id, self.worker, progress, sections):
+            # Lease habis dan job diambil worker lain; hasil run ini tidak disimpan
+            self.lost = True
+
+    def _beat(self):
+        while not self._stop.wait(self.interval):
+            self._flush()
+        self._flush()
+
+
+def run_job(jobs, archive, job, reporter):
+    """Jalankan satu job; kembalikan dict laporan (analyses, failed, fingerprints, scores, source_id)."""
+    params = job['params']
+    hsh, fungsi = job['hsh'], job['fungsi']
+    # Percobaan ulang memakai hasil bagian yang sudah berhasil di percobaan sebelumnya
+    force_refresh = bool(params.get('force_refresh')) and job['attempts'] == 1
+    app.session_id_var.set(params.get('session_id') or job['id'])
+    app.force_refresh_var.set(force_refresh)
+    files = jobs.files(job['id'])
+    metrics = app.get_metrics()
+
+    reporter.update(percent=5, status="📄 Membaca dokumen...")
+    # Pesan ekstraksi (mis. ringkasan token Excel) ditampilkan di progres job
+    with notices_to(reporter.notice):
+        with metrics.timed('read_uploads', section='pcb'):
+            pcb_content = app.read_uploaded_files([NamedUpload(name, data) for name, data in files.get('pcb', [])])
+        with metrics.timed('read_uploads', section='impact'):
+            impact_files = [NamedUpload(name, data) for name, data in files.get('impact', [])]
+            impact_content = app.read_uploaded_files(impact_files) if impact_files else None
+
+    from reference_data import get_reference_data
+    reference_data = get_reference_data()
+    sections = app.build_sections(pcb_content, impact_content, reference_data, hsh, fungsi)
+    # Hanya bagian yang inputnya berubah sejak run sebelumnya (job mana pun) yang dihitung ulang
+    fingerprints = section_fingerprints(
+        sections, app.section_inputs(pcb_content, impact_content, reference_data, hsh, fungsi))
+    report = {'fingerprints': fingerprints, 'scores': score_snapshot(reference_data, fungsi), 'source_id': None}
+    # Dokumen, skor, dan model sama persis dengan laporan yang sudah diarsipkan: tidak perlu analisis ulang
+    unchanged = None if force_refresh else archive.find_unchanged(hsh, fungsi, report_input_hash(fingerprints))
+    if unchanged is not None:
+        for key, text in unchanged['sections'].items():
+            reporter.set_section(key, text)
+        reporter.update(percent=90, unchanged_since=unchanged['period'],
+                        status=f"♻️ Input tidak berubah sejak laporan periode {unchanged['period']}")
+        return dict(report, analyses=unchanged['sections'], failed=[], source_id=unchanged['id'])
+    sections_to_run, reused = plan_sections(
+        sections, fingerprints, jobs.section_outputs(fingerprints.values()), app.is_error_result, force=force_refresh)
+    analyses = {}
+    for outputs in reused.values():
+        analyses.update(outputs)
+    for key, text in analyses.items():
+        reporter.set_section(key, text)
+
+    def on_section_done(key, label, done, total):
+        reporter.update(percent=10 + int(85 * done / total), status=f"✓ {label} selesai ({done}/{total})")
+
+    def on_queue_update(key, position):
+        label = app.SECTION_LABELS.get(key, "Strategi & Program Budaya")
+        if position is None:
+            reporter.update(status=f"🔍 {label}: request dikirim ke OpenAI...")
+        else:
+            reporter.update(status=f"⏳ {label}: menunggu antrean OpenAI (posisi {position + 1})")
+
+    reporter.update(percent=10, reused=len(reused), status="🔍 Menganalisis Strategi Budaya, Program Budaya, "
+                                                         "Impact, Evidence, dan Survei...")
+    with metrics.timed('analyses'):
+        computed = app.run_sections_concurrently(
+            sections_to_run,
+            on_section_done=on_section_done,
+            on_section_update=reporter.set_section if params.get('stream') else None,
+            on_queue_update=on_queue_update,
+            notice_handler=reporter.notice
+        )
+    for key, text in computed.items():
+        reporter.set_section(key, text)
+    analyses.update(computed)
+    jobs.save_section_outputs(app.section_outputs(fingerprints, sections_to_run, analyses), app.is_error_result)
+    failed = [key for key in app.SECTION_LABELS if app.is_error_result(analyses.get(key))]
+    return dict(report, analyses=analyses, failed=failed)
+
+
+def process_job(jobs, archive, job, worker):
+    reporter = JobReporter(jobs, job['id'], worker)
+    reporter.start()
+    filename = app.report_filename(job['fungsi'])
+    try:
+        report = run_job(jobs, archive, job, reporter)
+        analyses, failed = report['analyses'], report['failed']
+        if failed:
+            error = f"{app.SECTION_LABELS[failed[0]]}: {str(analyses.get(failed[0]))[:300]}"
+        else:
+            reporter.update(percent=95, status="📝 Membuat dokumen Word...")
+            with app.get_metrics().timed('create_word_document'):
+                docx = app.create_word_document(job['fungsi'], analyses).getvalue()
+            archive.store(job['hsh'], job['fungsi'], report['fingerprints'], analyses, report['scores'], docx,
+                          filename, job_id=job['id'], source_id=report['source_id'])
+    except Exception as e:
+        analyses, failed, error = None, True, f"{e.__class__.__name__}: {e}"
+    finally:
+        reporter.stop()
+    if reporter.lost:
+        return 'lost'
+    if failed:
+        return 'retry' if jobs.fail(job['id'], worker, error, analyses) else 'failed'
+    jobs.complete(job['id'], worker, analyses, docx, filename)
+    return 'done'
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Worker antrean laporan Rapport")
+    parser.add_argument('--name', default='w1', help="Nama worker (untuk identitas lease job)")
+    parser.add_argument('--jobs', type=int, default=1, help="Jumlah job yang diproses bersamaan")
+    parser.add_argument('--parent-pid', type=int, help="Berhenti jika proses dengan PID ini (UI) sudah tidak ada")
+    parser.add_argument('--once', action='store_true', help="Berhenti saat antrean kosong")
+    return parser.parse_args(argv)
+
+
+def handle_job(jobs, archive, job, worker, name):
+    try:
+        status = process_job(jobs, archive, job, worker)
+    except Exception as e:
+        # Mis. database terkunci saat menyimpan hasil; lease habis dan job diambil ulang
+        status = f"error ({e.__class__.__name__}: {e})"
+    app.get_metrics().flush_prometheus()
+    print(f"[{name}] {status.upper()}: job {job['id']} ({job['fungsi']})", flush=True)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    jobs = JobQueue()
+    archive = ReportArchive()
+    worker = f"{socket.gethostname()}:{os.getpid()}:{args.name}"
+    # Setiap klaim punya identitas lease sendiri agar thread job di proses ini tidak saling menimpa
+    claims = itertools.count(1)
+    slots = threading.BoundedSemaphore(max(1, args.jobs))
+    running = set()
+    metrics = app.get_metrics()
+    if metrics.prometheus_path:
+        metrics.set_prometheus_output(metrics.prometheus_path.replace('{worker}', args.name), {'worker': args.name})
+    jobs.purge()
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs), thread_name_prefix='job') as executor:
+        while args.parent_pid is None or os.getppid() == args.parent_pid:
+            if not slots.acquire(timeout=JOB_POLL_SECONDS):
+                continue
+            owner = f"{worker}/{next(claims)}"
+            job = jobs.claim(owner)
+            if job is None:
+                slots.release()
+                # Job kembar yang sedang ditahan baru bisa diambil setelah job yang berjalan selesai
+                running = {future for future in running if not future.done()}
+                if args.once and not running:
+                    break
+                time.sleep(JOB_POLL_SECONDS)
+                continue
+            # Konteks kosong per job: session_id_var/force_refresh_var tidak terbawa ke job berikutnya
+            future = executor.submit(contextvars.Context().run, handle_job, jobs, archive, job, owner, args.name)
+            future.add_done_callback(lambda _: slots.release())
+            running.add(future)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
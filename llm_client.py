@@ -0,0 +1,133 @@
+import json
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+
+# Status yang bersifat sementara dan layak dicoba ulang
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMRequestError(Exception):
+    """Request ke API gagal setelah semua percobaan ulang habis."""
+
+    def __init__(self, message, status_code=None, attempts=0):
+        super().__init__(message)
+        self.status_code = status_code
+        self.attempts = attempts
+
+
+def parse_retry_after(value):
+    """Nilai header Retry-After (detik atau tanggal HTTP) dalam detik, atau None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMClient:
+    """HTTP client bersama: koneksi keep-alive (pooling) + retry dengan exponential backoff dan jitter."""
+
+    def __init__(self, api_key, url=OPENAI_CHAT_URL, connect_timeout=5.0, read_timeout=60.0,
+                 max_retries=4, backoff_base=1.0, backoff_max=30.0, pool_size=10):
+        self.api_key = api_key
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+
+    def _backoff(self, attempt, retry_after=None):
+        # Full jitter: acak antara 0 dan batas eksponensial; Retry-After dari server jadi batas bawah
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    def _post(self, payload, stream=False, info=None):
+        info = {} if info is None else info
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            info['attempts'] = attempt + 1
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = LLMRequestError(f"{e.__class__.__name__}: {e}", attempts=attempt + 1)
+                retry_after = None
+            else:
+                info['status_code'] = response.status_code
+                if response.status_code == 200:
+                    return response
+                last_error = LLMRequestError(
+                    f"{response.status_code} - {response.text}",
+                    status_code=response.status_code, attempts=attempt + 1
+                )
+                response.close()
+                if response.status_code not in RETRYABLE_STATUS:
+                    raise last_error
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if attempt < self.max_retries:
+                time.sleep(self._backoff(attempt, retry_after))
+        raise last_error
+
+    def post_json(self, payload, info=None):
+        """POST payload ke endpoint chat completions dan kembalikan JSON respons.
+
+        Jika info (dict) diberikan, diisi 'attempts', 'status_code', dan 'usage'.
+        """
+        result = self._post(payload, info=info).json()
+        if info is not None:
+            info['usage'] = result.get('usage')
+        return result
+
+    def post_stream(self, payload, on_delta, info=None):
+        """POST dalam mode streaming (server-sent events).
+
+        on_delta(text) dipanggil untuk setiap potongan konten; teks lengkap dikembalikan.
+        Percobaan ulang hanya terjadi sebelum stream dimulai. info seperti pada post_json
+        (usage diminta lewat stream_options dan dikirim server di potongan terakhir).
+        """
+        payload = dict(payload, stream=True, stream_options={"include_usage": True})
+        response = self._post(payload, stream=True, info=info)
+        pieces = []
+        try:
+            response.encoding = 'utf-8'
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    break
+                chunk = json.loads(data)
+                if chunk.get('usage') and info is not None:
+                    info['usage'] = chunk['usage']
+                choices = chunk.get('choices') or []
+                if not choices:
+                    continue
+                delta = (choices[0].get('delta') or {}).get('content')
+                if delta:
+                    pieces.append(delta)
+                    on_delta(delta)
+        except (requests.ConnectionError, requests.Timeout, ValueError) as e:
+            raise LLMRequestError(f"Stream terputus: {e.__class__.__name__}: {e}")
+        finally:
+            response.close()
+        return ''.join(pieces)
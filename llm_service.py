@@ -0,0 +1,204 @@
+"""Panggilan OpenAI untuk semua analisis: cache respons, single-flight, antrean bersama, dan metrik.
+
+HTTP client (requests) dan API key baru dimuat saat request pertama benar-benar dikirim.
+"""
+import os
+import time
+
+import streamlit as st
+
+from admission import AdmissionController, AdmissionRejected
+from llm_cache import LLMResponseCache, make_cache_key
+from section_runtime import (SECTION_WORKERS, current_stream_sink, force_refresh_var, get_metrics,
+                             queue_position_var, section_var, session_id_var)
+from single_flight import SingleFlight
+from text_chunker import estimate_tokens
+
+OPENAI_MODEL = "gpt-4o"  # atau "gpt-4o-mini" jika ingin lebih hemat
+# Endpoint chat completions (bisa diarahkan ke server lain, mis. mock server benchmark)
+OPENAI_API_URL = os.environ.get("RAPPORT_OPENAI_URL") or None
+
+# Cache respons LLM di disk
+LLM_CACHE_PATH = os.environ.get("RAPPORT_LLM_CACHE_PATH", os.path.join('.cache', 'llm_responses.sqlite'))
+LLM_CACHE_MAX_MB = int(os.environ.get("RAPPORT_LLM_CACHE_MAX_MB", "50"))
+LLM_CACHE_TTL_HOURS = int(os.environ.get("RAPPORT_LLM_CACHE_TTL_HOURS", "168"))
+
+# HTTP client OpenAI: timeout koneksi/baca terpisah dan jumlah percobaan ulang
+LLM_CONNECT_TIMEOUT = float(os.environ.get("RAPPORT_LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.environ.get("RAPPORT_LLM_READ_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.environ.get("RAPPORT_LLM_MAX_RETRIES", "4"))
+
+# Kuota OpenAI bersama untuk semua sesi di proses ini (sesuaikan dengan kuota akun; 0 = tanpa batas):
+# request/menit, token/menit (prompt + max_tokens dipesan di awal), panjang antrean, dan waktu tunggu maksimum
+LLM_RPM = int(os.environ.get("RAPPORT_LLM_RPM", "500"))
+LLM_TPM = int(os.environ.get("RAPPORT_LLM_TPM", "300000"))
+LLM_MAX_QUEUE = int(os.environ.get("RAPPORT_LLM_MAX_QUEUE", "200"))
+LLM_MAX_WAIT = float(os.environ.get("RAPPORT_LLM_MAX_WAIT", "300"))
+
+SYSTEM_PROMPT = """Anda adalah konsultan senior budaya kerja perusahaan yang berpengalaman dengan pendekatan apresiatif dan profesional. 
+
+TONE & GAYA KOMUNIKASI:
+- Gunakan bahasa yang apresiatif, menghargai usaha yang telah dilakukan
+- Profesional namun hangat dan mendukung
+- Fokus pada kekuatan (strength-based approach) sebelum memberikan saran perbaikan
+- Hindari kata-kata negatif atau menghakimi
+- Gunakan frasa seperti "telah menunjukkan komitmen yang baik", "dapat lebih dioptimalkan", "peluang untuk pengembangan lebih lanjut"
+- Berikan apresiasi spesifik terhadap pencapaian yang ada
+
+FOKUS ANALISIS:
+- Fokus pada aspek PERILAKU (behavior): perubahan mindset, kolaborasi, komunikasi, kepemimpinan, keterlibatan, partisipasi
+- Hindari aspek teknis operasional
+- Berikan analisis yang singkat, padat, jelas, dan actionable
+- Setiap poin harus spesifik dan dapat ditindaklanjuti
+
+FORMAT OUTPUT:
+- Mulai dengan apresiasi umum
+- "Hal yang Sudah Baik" harus spesifik dan menghargai pencapaian
+- "Hal yang Dapat Diperbaiki" disampaikan sebagai peluang pengembangan, bukan kritik"""
+
+# Pembatas laju request global (opsional, dipakai mode batch)
+_rate_limiter = None
+
+def set_rate_limiter(limiter):
+    global _rate_limiter
+    _rate_limiter = limiter
+
+@st.cache_resource
+def get_llm_cache():
+    return LLMResponseCache(
+        LLM_CACHE_PATH,
+        max_bytes=LLM_CACHE_MAX_MB * 1024 * 1024,
+        ttl_seconds=LLM_CACHE_TTL_HOURS * 3600
+    )
+
+@st.cache_resource
+def get_admission_controller():
+    return AdmissionController(rpm=LLM_RPM, tpm=LLM_TPM, max_queue=LLM_MAX_QUEUE, max_wait=LLM_MAX_WAIT)
+
+def admit_request(prompt, max_tokens):
+    """Tunggu giliran di antrean bersama; kembalikan jumlah token yang dipesan."""
+    queue_sink = queue_position_var.get()
+    queued = []
+
+    def on_position(position):
+        queued.append(position)
+        if queue_sink is not None:
+            queue_sink(position)
+
+    started = time.perf_counter()
+    reserved = get_admission_controller().acquire(
+        session_id_var.get(), estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(prompt) + max_tokens,
+        on_position=on_position
+    )
+    if queued:
+        get_metrics().record_stage('llm_queue_wait', time.perf_counter() - started, section=section_var.get())
+        if queue_sink is not None:
+            queue_sink(None)
+    return reserved
+
+def get_openai_api_key():
+    """API key dari env var OPENAI_API_KEY (mode batch) atau st.secrets (AMAN, untuk UI)."""
+    return os.environ.get("OPENAI_API_KEY") or st.secrets["openai"]["api_key"]
+
+@st.cache_resource
+def get_llm_client():
+    from llm_client import OPENAI_CHAT_URL, LLMClient
+    return LLMClient(
+        get_openai_api_key(),
+        url=OPENAI_API_URL or OPENAI_CHAT_URL,
+        connect_timeout=LLM_CONNECT_TIMEOUT,
+        read_timeout=LLM_READ_TIMEOUT,
+        max_retries=LLM_MAX_RETRIES,
+        pool_size=max(10, SECTION_WORKERS * 2)
+    )
+
+@st.cache_resource
+def get_single_flight():
+    return SingleFlight()
+
+# Fungsi untuk memanggil OpenAI API
+def call_openai(prompt, max_tokens=4500, temperature=0.3, response_format=None):
+    """Memanggil OpenAI API untuk analisis (respons sukses disimpan di cache disk)
+
+    Request identik yang sedang berjalan (dari sesi atau bagian lain) tidak dikirim ulang;
+    pemanggil menunggu dan memakai hasil yang sama.
+    """
+    started = time.perf_counter()
+    stream = current_stream_sink()
+    cache_key = make_cache_key(OPENAI_MODEL, SYSTEM_PROMPT, prompt, temperature, max_tokens, response_format)
+    cached = lookup_cached_response(cache_key, stream, started)
+    if cached is not None:
+        return cached
+    content, shared = get_single_flight().do(
+        cache_key,
+        lambda publish: request_completion(prompt, max_tokens, temperature, response_format, cache_key,
+                                           publish if stream is not None else None),
+        on_delta=stream
+    )
+    if shared:
+        get_metrics().record_llm_call(time.perf_counter() - started, section=section_var.get(),
+                                      coalesced=True, stream=stream is not None)
+    return content
+
+def lookup_cached_response(cache_key, stream, started):
+    if force_refresh_var.get():
+        return None
+    cached = get_llm_cache().get(cache_key)
+    if cached is not None:
+        if stream is not None:
+            stream(cached)
+        get_metrics().record_llm_call(time.perf_counter() - started, section=section_var.get(),
+                                      cache_hit=True, stream=stream is not None)
+    return cached
+
+def request_completion(prompt, max_tokens, temperature, response_format, cache_key, stream):
+    started = time.perf_counter()
+    # Cek ulang: request identik sebelumnya bisa saja baru selesai dan tersimpan di cache
+    cached = lookup_cached_response(cache_key, stream, started)
+    if cached is not None:
+        return cached
+    from llm_client import LLMRequestError
+    if _rate_limiter is not None:
+        _rate_limiter.acquire()
+    try:
+        reserved = admit_request(prompt, max_tokens)
+    except AdmissionRejected as e:
+        return f"Error calling OpenAI API: {str(e)}"
+    info = {}
+    try:
+        data = {
+            "model": OPENAI_MODEL,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": temperature,
+            "max_completion_tokens": max_tokens  # ✅ DIPERBAIKI: max_tokens → max_completion_tokens
+        }
+        if response_format is not None:
+            data["response_format"] = response_format
+        if stream is not None:
+            content = get_llm_client().post_stream(data, stream, info=info)
+        else:
+            result = get_llm_client().post_json(data, info=info)
+            content = result['choices'][0]['message']['content']
+        get_llm_cache().set(cache_key, content)
+        return content
+    except LLMRequestError as e:
+        return f"Error calling OpenAI API: {str(e)}"
+    except Exception as e:
+        return f"Exception in OpenAI API call: {str(e)}"
+    finally:
+        usage = info.get('usage') or {}
+        get_admission_controller().settle(reserved, usage.get('total_tokens'))
+        get_metrics().record_llm_call(
+            time.perf_counter() - started, section=section_var.get(),
+            prompt_tokens=usage.get('prompt_tokens'), completion_tokens=usage.get('completion_tokens'),
+            attempts=info.get('attempts', 0), status=info.get('status_code'), stream=stream is not None
+        )
@@ -0,0 +1,238 @@
+"""Metrik per tahap (durasi) dan per panggilan LLM (token, retry, cache hit, status HTTP).
+
+Setiap kejadian ditulis sebagai satu baris JSON (JSON lines) dan disimpan di memori untuk
+ringkasan p50/p95. File JSON lines dirotasi (satu cadangan .1) saat melebihi max_bytes.
+Opsional: file teks format Prometheus (untuk textfile collector).
+
+Ringkasan dari file JSON lines:
+    python metrics.py .cache/metrics.jsonl
+"""
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+DEFAULT_METRICS_PATH = os.path.join('.cache', 'metrics.jsonl')
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+QUANTILES = (0.5, 0.95)
+
+
+def percentile(values, q):
+    """Persentil nearest-rank dari daftar angka (None jika kosong)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+    return ordered[index]
+
+
+def event_name(event):
+    """(jenis, nama tahap, bagian) untuk pengelompokan ringkasan."""
+    return event['type'], event.get('stage', 'llm_call'), event.get('section') or '-'
+
+
+def summarize(events):
+    """Ringkasan per (jenis, tahap, bagian): jumlah, p50/p95 durasi, token, retry, cache hit."""
+    groups = defaultdict(list)
+    for event in events:
+        groups[event_name(event)].append(event)
+    rows = []
+    for (kind, stage, section), items in sorted(groups.items()):
+        durations = [item['seconds'] for item in items]
+        row = {
+            'type': kind,
+            'stage': stage,
+            'section': section,
+            'count': len(items),
+            'p50_s': percentile(durations, 0.5),
+            'p95_s': percentile(durations, 0.95),
+        }
+        if kind == 'llm':
+            row.update({
+                'prompt_tokens': sum(item.get('prompt_tokens') or 0 for item in items),
+                'completion_tokens': sum(item.get('completion_tokens') or 0 for item in items),
+                'retries': sum(max(0, (item.get('attempts') or 1) - 1) for item in items),
+                'cache_hits': sum(1 for item in items if item.get('cache_hit')),
+                'coalesced': sum(1 for item in items if item.get('coalesced')),
+                'errors': sum(1 for item in items if item.get('status') not in (200, None)),
+            })
+        rows.append(row)
+    return rows
+
+
+def _label_text(labels):
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+class MetricsRecorder:
+    """Pencatat metrik bersama (aman dipakai banyak thread)."""
+
+    def __init__(self, path=DEFAULT_METRICS_PATH, prometheus_path=None, window=5000, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.prometheus_path = prometheus_path
+        # Label tetap untuk semua seri Prometheus (mis. nama proses worker)
+        self.prometheus_labels = {}
+        self.max_bytes = max_bytes
+        self._events = deque(maxlen=window)
+        self._counters = defaultdict(float)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        for target in (path, prometheus_path):
+            directory = os.path.dirname(target) if target else ''
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    def set_prometheus_output(self, path, labels=None):
+        """Ganti file Prometheus dan label tetapnya (mis. satu file per proses worker)."""
+        directory = os.path.dirname(path) if path else ''
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.prometheus_path = path
+        self.prometheus_labels = dict(labels or {})
+
+    def _record(self, event):
+        event = dict(event, ts=round(time.time(), 3))
+        line = json.dumps(event, ensure_ascii=False)
+        with self._lock:
+            self._events.append(event)
+            if event['type'] == 'llm':
+                section = event.get('section') or '-'
+                source = 'cache_hit' if event.get('cache_hit') else 'coalesced' if event.get('coalesced') else 'api'
+                self._counters[('rapport_llm_calls_total', section, source, str(event.get('status')))] += 1
+                self._counters[('rapport_llm_prompt_tokens_total', section)] += event.get('prompt_tokens') or 0
+                self._counters[('rapport_llm_completion_tokens_total', section)] += event.get('completion_tokens') or 0
+                self._counters[('rapport_llm_retries_total', section)] += max(0, (event.get('attempts') or 1) - 1)
+            if self.path:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+                    size = f.tell()
+                if self.max_bytes and size > self.max_bytes:
+                    # Proses lain yang menulis file yang sama membuka ulang file per kejadian
+                    os.replace(self.path, self.path + '.1')
+
+    def record_stage(self, stage, seconds, section=None, **labels):
+        self._record(dict(labels, type='stage', stage=stage, section=section, seconds=round(seconds, 4)))
+
+    def record_llm_call(self, seconds, section=None, prompt_tokens=None, completion_tokens=None,
+                        attempts=0, cache_hit=False, status=None, stream=False, coalesced=False):
+        self._record({
+            'type': 'llm',
+            'section': section,
+            'seconds': round(seconds, 4),
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'attempts': attempts,
+            'cache_hit': cache_hit,
+            'status': status,
+            'stream': stream,
+            'coalesced': coalesced,
+        })
+
+    @contextmanager
+    def timed(self, stage, section=None, **labels):
+        """Mencatat durasi blok with sebagai satu tahap."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(stage, time.perf_counter() - started, section=section, **labels)
+
+    def events(self):
+        with self._lock:
+            return list(self._events)
+
+    def summary(self):
+        return summarize(self.events())
+
+    def prometheus_text(self):
+        """Metrik dalam format teks Prometheus (kuantil dihitung dari jendela kejadian terakhir)."""
+        lines = []
+        constant = self.prometheus_labels
+        groups = defaultdict(list)
+        for event in self.events():
+            groups[event_name(event)].append(event['seconds'])
+        for metric, kind in (('rapport_stage_duration_seconds', 'stage'), ('rapport_llm_call_duration_seconds', 'llm')):
+            lines.append(f"# TYPE {metric} summary")
+            for (event_kind, stage, section), durations in sorted(groups.items()):
+                if event_kind != kind:
+                    continue
+                labels = dict(constant, stage=stage, section=section) if kind == 'stage' else dict(constant, section=section)
+                for q in QUANTILES:
+                    lines.append(f"{metric}{_label_text(dict(labels, quantile=q))} {percentile(durations, q)}")
+                lines.append(f"{metric}_sum{_label_text(labels)} {sum(durations)}")
+                lines.append(f"{metric}_count{_label_text(labels)} {len(durations)}")
+        with self._lock:
+            counters = dict(self._counters)
+        names = {
+            'rapport_llm_calls_total': ('section', 'source', 'status'),
+            'rapport_llm_prompt_tokens_total': ('section',),
+            'rapport_llm_completion_tokens_total': ('section',),
+            'rapport_llm_retries_total': ('section',),
+        }
+        for metric, label_names in names.items():
+            lines.append(f"# TYPE {metric} counter")
+            for key, value in sorted(counters.items()):
+                if key[0] == metric:
+                    lines.append(f"{metric}{_label_text(dict(constant, **dict(zip(label_names, key[1:]))))} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def flush_prometheus(self):
+        """Tulis file Prometheus (jika dikonfigurasi) secara atomik."""
+        if not self.prometheus_path:
+            return
+        tmp_path = self.prometheus_path + '.tmp'
+        with self._flush_lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp_path, self.prometheus_path)
+
+
+def tail_lines(path, count, block_size=64 * 1024):
+    """count baris terakhir file (dibaca mundur dari akhir file, tanpa membaca seluruh isinya)."""
+    with open(path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        data = b''
+        while position > 0 and data.count(b'\n') <= count:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    lines = data.splitlines()
+    if position > 0:
+        # Baris pertama terpotong di tengah
+        lines = lines[1:]
+    return [line.decode('utf-8') for line in lines[-count:]]
+
+
+def load_events(path, limit=None):
+    """Kejadian dari file JSON lines; limit = hanya sejumlah kejadian terakhir."""
+    if limit is not None:
+        lines = tail_lines(path, limit)
+    else:
+        with open(path, encoding='utf-8') as f:
+            lines = f.readlines()
+    return [json.loads(line) for line in (line.strip() for line in lines) if line]
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else DEFAULT_METRICS_PATH
+    rows = summarize(load_events(path))
+    print(f"{'jenis':<6} {'tahap':<22} {'bagian':<22} {'n':>5} {'p50 (s)':>9} {'p95 (s)':>9} {'token in':>10} {'token out':>10}")
+    for row in rows:
+        print(f"{row['type']:<6} {row['stage']:<22} {row['section']:<22} {row['count']:>5} "
+              f"{row['p50_s']:>9.3f} {row['p95_s']:>9.3f} "
+              f"{row.get('prompt_tokens', ''):>10} {row.get('completion_tokens', ''):>10}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""OCR gambar/scan dengan pra-pemrosesan, process pool, timeout, dan cache hasil per hash konten.
+
+Setiap frame (mis. halaman TIFF multi-page) di-OCR sebagai tugas terpisah di worker.
+"""
+import hashlib
+import io
+import math
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+from PIL import Image, ImageOps, ImageSequence
+
+# Naikkan jika pra-pemrosesan/parameter OCR berubah agar hasil lama di cache tidak dipakai
+OCR_VERSION = 1
+
+WINDOWS_TESSERACT_PATH = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+
+
+def find_tesseract(configured=None):
+    """Path tesseract: konfigurasi eksplisit, lalu PATH, lalu lokasi instalasi default Windows.
+
+    None berarti pytesseract memakai 'tesseract' apa adanya (error jelas saat OCR dijalankan).
+    """
+    if configured:
+        return configured
+    found = shutil.which('tesseract')
+    if found:
+        return found
+    if os.name == 'nt' and os.path.exists(WINDOWS_TESSERACT_PATH):
+        return WINDOWS_TESSERACT_PATH
+    return None
+
+
+def _otsu_threshold(histogram):
+    total = sum(histogram)
+    weighted_total = sum(i * count for i, count in enumerate(histogram))
+    background = weighted_background = 0
+    best_threshold, best_variance = 127, -1.0
+    for i, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += i * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = i, variance
+    return best_threshold
+
+
+def preprocess(image, target_dpi=300, max_side=3500):
+    """Perkecil ke target DPI (atau sisi terpanjang max_side), grayscale, lalu binarisasi (Otsu)."""
+    image = ImageOps.exif_transpose(image)
+    scale = 1.0
+    dpi = image.info.get('dpi')
+    if dpi and dpi[0] and float(dpi[0]) > target_dpi:
+        scale = target_dpi / float(dpi[0])
+    longest = max(image.size) * scale
+    if longest > max_side:
+        scale *= max_side / longest
+    if scale < 1.0:
+        width, height = image.size
+        image = image.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS)
+    gray = ImageOps.autocontrast(image.convert('L'))
+    threshold = _otsu_threshold(gray.histogram())
+    return gray.point(lambda value: 255 if value > threshold else 0).convert('1')
+
+
+def count_frames(data):
+    with Image.open(io.BytesIO(data)) as image:
+        return getattr(image, 'n_frames', 1)
+
+
+def ocr_frame(data, frame, options):
+    """Dijalankan di worker: OCR satu frame dari gambar (bytes)."""
+    import pytesseract
+
+    if options.get('tesseract_cmd'):
+        pytesseract.pytesseract.tesseract_cmd = options['tesseract_cmd']
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageSequence.Iterator(image)[frame].copy()
+    prepared = preprocess(image, options['target_dpi'], options['max_side'])
+    return pytesseract.image_to_string(prepared, lang=options['lang'], timeout=options['timeout'])
+
+
+class OCREngine:
+    def __init__(self, cache=None, workers=2, timeout=60, target_dpi=300, max_side=3500,
+                 lang='ind+eng', tesseract_cmd=None):
+        self.cache = cache
+        self.workers = workers
+        self.timeout = timeout
+        self.options = {
+            'target_dpi': target_dpi,
+            'max_side': max_side,
+            'lang': lang,
+            'timeout': timeout,
+            'tesseract_cmd': tesseract_cmd,
+        }
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        # spawn (bukan fork) karena proses Streamlit sudah multi-thread
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def cache_key(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        return f"ocr:v{OCR_VERSION}:{self.options['lang']}:{digest}"
+
+    def ocr_many(self, images):
+        """OCR banyak gambar (bytes) sekaligus; hasil sesuai urutan input.
+
+        Gambar yang sama (hash sama) hanya di-OCR sekali dan hasilnya diambil dari cache jika ada.
+        """
+        keys = [self.cache_key(data) for data in images]
+        results = {}
+        pending = {}
+        for key, data in zip(keys, images):
+            if key in results or key in pending:
+                continue
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None:
+                results[key] = cached
+            else:
+                pending[key] = data
+
+        if pending:
+            pool = self._get_pool()
+            futures = {
+                key: [pool.submit(ocr_frame, data, frame, self.options) for frame in range(count_frames(data))]
+                for key, data in pending.items()
+            }
+            # Tesseract sendiri dibatasi timeout per frame; tenggat total ini menjaga worker yang macet
+            task_count = sum(len(frame_futures) for frame_futures in futures.values())
+            deadline = time.monotonic() + self.timeout * (math.ceil(task_count / self.workers) + 1)
+            for key, frame_futures in futures.items():
+                texts = []
+                for future in frame_futures:
+                    try:
+                        texts.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+                    except FutureTimeoutError:
+                        raise RuntimeError(f"OCR melebihi batas waktu {self.timeout} detik")
+                text = "\n".join(texts)
+                results[key] = text
+                if self.cache is not None:
+                    self.cache.set(key, text)
+        return [results[key] for key in keys]
+
+    def ocr_bytes(self, data):
+        return self.ocr_many([data])[0]
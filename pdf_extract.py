@@ -0,0 +1,85 @@
+"""Ekstraksi teks PDF per halaman secara paralel (process pool) dengan batas halaman/karakter.
+
+Halaman tanpa teks tetapi berisi gambar (hasil scan) dikembalikan sebagai gambar
+agar bisa di-OCR oleh pemanggil.
+"""
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import PyPDF2
+
+# PDF kecil diproses langsung; process pool hanya dipakai jika jumlah halaman melebihi ambang ini
+PARALLEL_MIN_PAGES = 8
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    # spawn (bukan fork) karena proses Streamlit sudah multi-thread
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _page_images(page):
+    try:
+        return [image.data for image in page.images]
+    except Exception:
+        return []
+
+
+def extract_page_range(data, start, stop):
+    """Dijalankan di worker: [(nomor halaman, teks, gambar jika halaman tanpa teks)]."""
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    pages = []
+    for number in range(start, stop):
+        page = reader.pages[number]
+        text = page.extract_text() or ""
+        images = _page_images(page) if not text.strip() else []
+        pages.append((number, text, images))
+    return pages
+
+
+def _split_ranges(page_count, parts):
+    size = -(-page_count // parts)
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def extract_pdf_text(data, max_pages=100, max_chars=200000, workers=None, ocr=None):
+    """Teks PDF (bytes) digabung per halaman.
+
+    ocr(list of image bytes) -> teks dipanggil untuk halaman yang hanya berisi gambar.
+    """
+    page_count = len(PyPDF2.PdfReader(io.BytesIO(data)).pages)
+    limit = min(page_count, max_pages) if max_pages else page_count
+    workers = workers or min(4, os.cpu_count() or 1)
+
+    if limit >= PARALLEL_MIN_PAGES and workers > 1:
+        pool = _get_pool(workers)
+        futures = [pool.submit(extract_page_range, data, start, stop)
+                   for start, stop in _split_ranges(limit, workers)]
+        pages = [page for future in futures for page in future.result()]
+    else:
+        pages = extract_page_range(data, 0, limit)
+
+    parts = []
+    total_chars = 0
+    for number, text, images in pages:
+        if not text.strip() and images and ocr is not None:
+            text = ocr(images)
+        if total_chars + len(text) > max_chars:
+            parts.append(text[:max(0, max_chars - total_chars)])
+            parts.append(f"\n[... teks dipotong pada {max_chars} karakter (halaman {number + 1} dari {page_count}) ...]\n")
+            break
+        parts.append(text + "\n")
+        total_chars += len(text) + 1
+    else:
+        if limit < page_count:
+            parts.append(f"[... {page_count - limit} halaman berikutnya tidak diproses (batas {limit} halaman) ...]\n")
+    return "".join(parts)
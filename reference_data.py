@@ -0,0 +1,239 @@
+"""Data referensi skor (SKOR TOTAL, Survei, benchmark) sebagai satu objek bersama per proses.
+
+Sheet dibaca dari snapshot kolumnar, divalidasi terhadap skema, kolom numerik di-downcast,
+HSH/Fungsi dijadikan kategori, lalu nilai kolomnya dibuat read-only. Semua sesi memakai
+objek yang sama (tanpa salinan per rerun), jadi DataFrame di dalamnya tidak boleh diubah;
+turunkan dulu (filter/copy) jika perlu kolom tambahan.
+
+Watcher di thread latar memeriksa workbook secara berkala (mtime, lalu hash); hanya sheet yang
+berubah yang dibaca ulang, lalu objek baru menggantikan yang lama sekaligus. Analisis yang sedang
+berjalan tetap memakai objek lama sampai selesai.
+"""
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from excel_snapshot import ExcelSnapshot
+from gap_engine import (EVIDENCE_BENCHMARK_COLUMNS, EVIDENCE_FUNGSI_COLUMNS, SURVEI_BENCHMARK_COLUMNS,
+                        SURVEI_DIMENSIONS, clear_cache as clear_gap_cache)
+from hsh_index import clear_index_cache, normalize_hsh
+
+logger = logging.getLogger(__name__)
+
+# Snapshot kolumnar dari workbook skor (dibangun ulang otomatis jika workbook berubah)
+SNAPSHOT_DIR = os.environ.get("RAPPORT_SNAPSHOT_DIR", os.path.join('.cache', 'snapshot'))
+REFERENCE_SHEETS = {
+    'skor_total': ('documents/SKOR_TOTAL_ALL.xlsx', 'SKOR TOTAL_ALL'),
+    'skor_survei': ('documents/Skor_SURVEI_ALL.xlsx', 'Skor_SURVEI_ALL_FUNGSI'),
+    'skor_benchmark_evidence': ('documents/Skor_benchmark.xlsx', 'Evidence'),
+    'skor_benchmark_survei': ('documents/Skor_benchmark.xlsx', 'Survei'),
+}
+
+# Interval pemeriksaan perubahan workbook oleh watcher (detik; 0 = tanpa watcher)
+REFERENCE_POLL_SECONDS = float(os.environ.get("RAPPORT_REFERENCE_POLL_SECONDS", "30"))
+
+CATEGORICAL_COLUMNS = ('HSH', 'Fungsi', 'HSH_normalized')
+
+
+class ReferenceSchemaError(ValueError):
+    """Sheet referensi tidak sesuai skema yang dipakai analisis."""
+
+
+class SheetSchema:
+    """Kolom wajib (nama), kolom numerik (posisi int atau nama), dan jumlah kolom minimum."""
+
+    def __init__(self, required=(), numeric=(), min_columns=0):
+        self.required = tuple(required) + ('HSH_normalized',)
+        self.numeric = tuple(numeric)
+        self.min_columns = max(min_columns, *(n + 1 for n in self.numeric if isinstance(n, int)), 0)
+
+    def problems(self, df):
+        found = []
+        missing = [name for name in self.required if name not in df.columns]
+        if missing:
+            found.append(f"kolom tidak ada: {', '.join(missing)}")
+        if len(df.columns) < self.min_columns:
+            found.append(f"hanya {len(df.columns)} kolom, minimal {self.min_columns}")
+            return found
+        for locator in self.numeric:
+            if not isinstance(locator, int) and locator not in df.columns:
+                found.append(f"kolom tidak ada: {locator}")
+                continue
+            column = df.iloc[:, locator] if isinstance(locator, int) else df[locator]
+            if not pd.api.types.is_numeric_dtype(column):
+                found.append(f"kolom '{column.name}' bukan numerik ({column.dtype})")
+        return found
+
+
+# Posisi kolom mengikuti gap_engine; sheet benchmark Survei menyimpan baris header di dalam data
+# sehingga kolomnya berupa teks (dikonversi saat menghitung selisih)
+REFERENCE_SCHEMA = {
+    'skor_total': SheetSchema(required=('Fungsi', 'HSH'), numeric=EVIDENCE_FUNGSI_COLUMNS),
+    'skor_survei': SheetSchema(required=('Fungsi', 'HSH'), numeric=SURVEI_DIMENSIONS),
+    'skor_benchmark_evidence': SheetSchema(numeric=EVIDENCE_BENCHMARK_COLUMNS),
+    'skor_benchmark_survei': SheetSchema(min_columns=max(SURVEI_BENCHMARK_COLUMNS) + 1),
+}
+
+
+def read_reference_sheet(name, path, sheet_name):
+    """Membaca satu sheet dari Excel dan menambahkan kolom HSH_normalized."""
+    df = pd.read_excel(path, sheet_name=sheet_name)
+    if name.startswith('skor_benchmark'):
+        df['HSH_normalized'] = df.iloc[:, 0].apply(normalize_hsh)
+    elif 'HSH' in df.columns:
+        df['HSH_normalized'] = df['HSH'].apply(normalize_hsh)
+    return df
+
+
+def get_reference_snapshot():
+    return ExcelSnapshot(SNAPSHOT_DIR, REFERENCE_SHEETS, read_reference_sheet)
+
+
+def _downcast(values):
+    """Integer ke tipe terkecil; float ke float32 hanya jika nilainya tidak berubah."""
+    if values.dtype.kind in 'iu':
+        return pd.to_numeric(values, downcast='integer')
+    if values.dtype.kind == 'f':
+        narrowed = values.astype(np.float32)
+        if np.array_equal(narrowed.astype(values.dtype), values, equal_nan=True):
+            return narrowed
+    return values
+
+
+def freeze_frame(df):
+    """Salinan ringkas df: numerik di-downcast & read-only, HSH/Fungsi kategori."""
+    columns = {}
+    for name in df.columns:
+        column = df[name]
+        if name in CATEGORICAL_COLUMNS:
+            columns[name] = column.astype('category')
+        elif isinstance(column.dtype, np.dtype) and column.dtype.kind in 'iuf':
+            values = _downcast(column.to_numpy())
+            if values.flags.writeable:
+                values = values.view()
+                values.flags.writeable = False
+            columns[name] = values
+        else:
+            columns[name] = column
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def validate_frames(frames):
+    problems = [
+        f"{name}: {problem}"
+        for name, df in frames.items()
+        for problem in REFERENCE_SCHEMA[name].problems(df)
+    ]
+    if problems:
+        raise ReferenceSchemaError("Format data referensi tidak sesuai: " + "; ".join(problems))
+
+
+class ReferenceData(namedtuple('ReferenceData', list(REFERENCE_SHEETS))):
+    """Empat DataFrame referensi (bisa di-unpack seperti tuple); dipakai bersama, jangan diubah."""
+    __slots__ = ()
+
+    def memory_bytes(self):
+        return int(sum(df.memory_usage(deep=True).sum() for df in self))
+
+
+def freeze_frames(frames):
+    """Validasi lalu bekukan sheet yang diberikan (bisa sebagian); {nama: DataFrame beku}."""
+    validate_frames(frames)
+    return {name: freeze_frame(df) for name, df in frames.items()}
+
+
+def build_reference_data(frames):
+    return ReferenceData(**freeze_frames({name: frames[name] for name in REFERENCE_SHEETS}))
+
+
+def invalidate_dependent_caches():
+    """Cache turunan data referensi (index HSH, tabel gap) dibangun ulang dari data baru.
+
+    Prompt perbandingan dan hasil per bagian tidak perlu dihapus: key cache LLM adalah teks prompt
+    dan fingerprint bagian dihitung dari isi data, sehingga data baru otomatis tidak cocok dengan
+    entri lama.
+    """
+    clear_gap_cache()
+    clear_index_cache()
+
+
+class ReferenceStore:
+    """Pemegang ReferenceData terkini; reload() membaca ulang hanya sheet yang snapshot-nya berubah."""
+
+    def __init__(self, snapshot, poll_seconds=REFERENCE_POLL_SECONDS):
+        self.snapshot = snapshot
+        self.poll_seconds = poll_seconds
+        self.version = 0
+        self.loaded_at = None
+        self.last_error = None
+        self._data = None
+        self._sheet_versions = {}
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def current(self):
+        data = self._data
+        if data is None:
+            self.reload()
+            data = self._data
+        return data
+
+    def reload(self):
+        """Perbarui snapshot workbook yang berubah lalu tukar data; kembalikan nama sheet yang dimuat ulang."""
+        with self._reload_lock:
+            self.snapshot.refresh()
+            versions = {name: self.snapshot.sheet_version(name) for name in self.snapshot.sheets}
+            changed = [name for name in self.snapshot.sheets
+                       if self._data is None or versions[name] != self._sheet_versions.get(name)]
+            if not changed:
+                return []
+            frozen = freeze_frames({name: self.snapshot.read(name) for name in changed})
+            data = ReferenceData(**frozen) if self._data is None else self._data._replace(**frozen)
+            # Satu assignment: pembaca melihat data lama atau data baru, tidak pernah campuran
+            self._data = data
+            self._sheet_versions = versions
+            self.version += 1
+            self.loaded_at = time.time()
+            invalidate_dependent_caches()
+            if self.version > 1:
+                logger.info("Data referensi dimuat ulang: %s", ", ".join(changed))
+            return changed
+
+    def start_watcher(self):
+        if self.poll_seconds <= 0 or self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, name='reference-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.reload()
+                self.last_error = None
+            except Exception as e:
+                # Data lama tetap dipakai (mis. workbook sedang disalin atau skemanya rusak)
+                if str(e) != self.last_error:
+                    logger.warning("Gagal memuat ulang data referensi: %s", e)
+                self.last_error = str(e)
+
+
+@st.cache_resource
+def get_reference_store():
+    store = ReferenceStore(get_reference_snapshot())
+    store.start_watcher()
+    return store
+
+
+def get_reference_data():
+    """ReferenceData terkini, satu objek bersama per proses (tidak di-pickle/disalin per sesi)."""
+    return get_reference_store().current()
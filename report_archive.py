@@ -0,0 +1,131 @@
+"""Arsip laporan yang sudah selesai (SQLite), diindeks per HSH, Fungsi, periode, dan hash input.
+
+Setiap laporan menyimpan teks per bagian, fingerprint input per bagian (lihat section_graph),
+snapshot skor Fungsi saat laporan dibuat, dan file .docx-nya. Laporan lama bisa dibuka tanpa
+memanggil LLM; jika hash input sama dengan laporan sebelumnya untuk Fungsi yang sama (dokumen,
+skor, model, dan prompt tidak berubah), teks laporan tersebut dipakai ulang tanpa analisis baru.
+Arsip dibatasi ARCHIVE_MAX_REPORTS laporan per (HSH, Fungsi) dan ARCHIVE_MAX_AGE_DAYS hari.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+ARCHIVE_DB_PATH = os.environ.get("RAPPORT_ARCHIVE_DB", os.path.join('archive', 'reports.sqlite'))
+# Retensi: laporan terlama per (HSH, Fungsi) di atas batas ini, atau yang lebih tua dari umur ini, dihapus
+ARCHIVE_MAX_REPORTS = int(os.environ.get("RAPPORT_ARCHIVE_MAX_REPORTS", "24"))
+ARCHIVE_MAX_AGE_DAYS = int(os.environ.get("RAPPORT_ARCHIVE_MAX_AGE_DAYS", "400"))
+
+# Kolom metadata (tanpa isi besar) untuk daftar arsip
+SUMMARY_COLUMNS = ('id', 'hsh', 'fungsi', 'period', 'input_hash', 'created_at', 'job_id', 'source_id', 'filename')
+
+
+def current_period(now=None):
+    """Periode laporan: bulan pembuatan (YYYY-MM)."""
+    return (now or datetime.now()).strftime('%Y-%m')
+
+
+def report_input_hash(fingerprints):
+    """Satu hash untuk seluruh input laporan, dari fingerprint semua bagiannya."""
+    text = '|'.join(f"{key}={fingerprint}" for key, fingerprint in sorted(fingerprints.items()))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def score_snapshot(reference_data, fungsi):
+    """Baris skor Evidence dan Survei milik Fungsi (list of dict) seperti saat laporan dibuat."""
+    skor_total, skor_survei = reference_data[0], reference_data[1]
+    return {
+        name: json.loads(df[df['Fungsi'] == fungsi].drop(columns='HSH_normalized', errors='ignore')
+                         .to_json(orient='records', force_ascii=False))
+        for name, df in (('skor_total', skor_total), ('skor_survei', skor_survei))
+    }
+
+
+class ReportArchive:
+    def __init__(self, path=ARCHIVE_DB_PATH, max_reports=ARCHIVE_MAX_REPORTS, max_age_days=ARCHIVE_MAX_AGE_DAYS):
+        self.path = path
+        self.max_reports = max_reports
+        self.max_age_seconds = max_age_days * 86400
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS reports ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " hsh TEXT NOT NULL, fungsi TEXT NOT NULL, period TEXT NOT NULL,"
+            " input_hash TEXT NOT NULL, created_at REAL NOT NULL,"
+            " job_id TEXT UNIQUE, source_id INTEGER,"
+            " fingerprints TEXT NOT NULL, sections TEXT NOT NULL, scores TEXT NOT NULL,"
+            " filename TEXT NOT NULL, docx BLOB NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS idx_reports_fungsi ON reports(hsh, fungsi, period, created_at);"
+            "CREATE INDEX IF NOT EXISTS idx_reports_input ON reports(input_hash, created_at);"
+        )
+        self._conn.commit()
+
+    def store(self, hsh, fungsi, fingerprints, sections, scores, docx, filename, job_id=None, source_id=None,
+              period=None):
+        """Simpan laporan selesai; job yang sama hanya diarsipkan sekali. Mengembalikan id arsip.
+
+        Laporan lama Fungsi ini di luar batas retensi ikut dihapus.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR REPLACE INTO reports (hsh, fungsi, period, input_hash, created_at, job_id, source_id,"
+                " fingerprints, sections, scores, filename, docx) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (hsh, fungsi, period or current_period(), report_input_hash(fingerprints), now, job_id,
+                 source_id, json.dumps(fingerprints), json.dumps(sections, ensure_ascii=False),
+                 json.dumps(scores, ensure_ascii=False), filename, docx)
+            )
+            self._conn.execute(
+                "DELETE FROM reports WHERE hsh = ? AND fungsi = ? AND (created_at < ? OR id NOT IN"
+                " (SELECT id FROM reports WHERE hsh = ? AND fungsi = ? ORDER BY created_at DESC LIMIT ?))",
+                (hsh, fungsi, now - self.max_age_seconds, hsh, fungsi, self.max_reports)
+            )
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def _summaries(self, where, params):
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM reports WHERE {where}"
+                " ORDER BY created_at DESC", params
+            ).fetchall()
+        return [dict(zip(SUMMARY_COLUMNS, row)) for row in rows]
+
+    def list_reports(self, hsh, fungsi):
+        """Metadata laporan untuk satu Fungsi, terbaru lebih dulu."""
+        return self._summaries("hsh = ? AND fungsi = ?", (hsh, fungsi))
+
+    def find_unchanged(self, hsh, fungsi, input_hash, before_period=None):
+        """Laporan terbaru Fungsi ini dengan input yang sama persis (sebelum before_period jika diisi).
+
+        input_hash berasal dari fingerprint bagian yang mencakup versi prompt dan pengaturan generasi,
+        jadi laporan dari prompt/model lama tidak pernah cocok; laporan di luar umur retensi juga tidak.
+        """
+        where = "hsh = ? AND fungsi = ? AND input_hash = ? AND created_at >= ?"
+        params = (hsh, fungsi, input_hash, time.time() - self.max_age_seconds)
+        if before_period:
+            where += " AND period < ?"
+            params += (before_period,)
+        matches = self._summaries(where, params)
+        return self.get(matches[0]['id']) if matches else None
+
+    def get(self, report_id, with_docx=True):
+        columns = SUMMARY_COLUMNS + ('fingerprints', 'sections', 'scores') + (('docx',) if with_docx else ())
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(columns)} FROM reports WHERE id = ?", (report_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        report = dict(zip(columns, row))
+        for name in ('fingerprints', 'sections', 'scores'):
+            report[name] = json.loads(report[name])
+        return report
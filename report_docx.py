@@ -0,0 +1,78 @@
+"""Penyusunan laporan Word (.docx) dari hasil analisis per bagian."""
+import io
+from datetime import datetime
+
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.shared import Pt
+
+def create_word_document(fungsi_name, analyses):
+    doc = Document()
+    style = doc.styles['Normal']
+    font = style.font
+    font.name = 'Calibri'
+    font.size = Pt(11)
+    
+    title = doc.add_heading('Rapport Writer Assistance', 0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    
+    today = datetime.now().strftime('%d %B %Y')
+    subtitle = doc.add_paragraph()
+    subtitle_run = subtitle.add_run(f'Laporan Analisis Implementasi Budaya Kerja\n{fungsi_name}\n{today}')
+    subtitle_run.bold = True
+    subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    
+    doc.add_paragraph()
+    doc.add_paragraph('_' * 80)
+    doc.add_paragraph()
+    
+    intro = doc.add_paragraph()
+    intro_run = intro.add_run(
+        'Laporan ini disusun dengan pendekatan apresiatif untuk memberikan gambaran komprehensif '
+        'mengenai implementasi budaya kerja dengan fokus pada aspek perilaku (behavior). '
+        'Analisis dilakukan berdasarkan data evidence, survei, dan perbandingan dengan benchmark.'
+    )
+    intro_run.italic = True
+    doc.add_paragraph()
+    
+    doc.add_heading('1. Analisis Strategi Budaya', 1)
+    doc.add_paragraph(analyses['strategi_budaya'])
+    doc.add_paragraph()
+    
+    doc.add_heading('2. Analisis Program Budaya', 1)
+    doc.add_paragraph(analyses['program_budaya'])
+    doc.add_paragraph()
+    
+    doc.add_heading('3. Analisis Impact to Business', 1)
+    doc.add_paragraph(analyses['impact'])
+    doc.add_paragraph()
+    
+    doc.add_heading('4. Analisis Perbandingan Evidence dengan Benchmark', 1)
+    doc.add_paragraph(analyses['evidence_comparison'])
+    doc.add_paragraph()
+    
+    doc.add_heading('5. Analisis Perbandingan Survei dengan Benchmark', 1)
+    doc.add_paragraph(analyses['survei_comparison'])
+    doc.add_paragraph()
+    
+    doc.add_paragraph()
+    doc.add_paragraph('_' * 80)
+    doc.add_paragraph()
+    
+    closing = doc.add_paragraph()
+    closing_run = closing.add_run(
+        'Laporan ini disusun sebagai bahan refleksi dan pengembangan berkelanjutan dalam implementasi '
+        'budaya kerja. Kami mengapresiasi komitmen dan dedikasi seluruh tim dalam mewujudkan '
+        'transformasi budaya yang positif dan berkelanjutan.'
+    )
+    closing_run.italic = True
+    
+    doc.add_paragraph()
+    footer = doc.add_paragraph()
+    footer.add_run(f'\nDibuat oleh Rapport Writer Assistance\n{datetime.now().strftime("%d %B %Y, %H:%M WIB")}').italic = True
+    footer.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    
+    doc_io = io.BytesIO()
+    doc.save(doc_io)
+    doc_io.seek(0)
+    return doc_io
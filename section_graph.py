@@ -0,0 +1,100 @@
+"""Graf dependensi bagian laporan: setiap bagian hanya bergantung pada sebagian input.
+
+Fingerprint tiap bagian dihitung dari input yang dipakainya; bagian yang fingerprint-nya sama
+dengan run sebelumnya (dan hasilnya tidak error) dipakai ulang tanpa memanggil LLM lagi.
+Input 'prompt:<bagian>' berisi versi prompt dan kode/template pembentuk prompt bagian itu,
+sehingga hasil dari prompt lama tidak dipakai ulang setelah prompt diubah.
+"""
+import functools
+import hashlib
+import inspect
+import sys
+
+# Versi prompt per bagian: naikkan jika hasil bagian berubah karena hal di luar template yang
+# ikut di-hash (lihat section_prompts di modul utama), mis. helper atau modul lain yang dipanggil
+PROMPT_VERSIONS = {
+    'pcb_combined': 1,
+    'strategi_budaya': 1,
+    'program_budaya': 1,
+    'impact': 1,
+    'evidence_comparison': 1,
+    'survei_comparison': 1,
+}
+
+# Bagian → nama input yang mempengaruhi hasilnya ('map_reduce': pengaturan ringkasan dokumen besar)
+SECTION_DEPENDENCIES = {
+    'pcb_combined': ('model', 'prompt:pcb_combined', 'map_reduce', 'pcb'),
+    'strategi_budaya': ('model', 'prompt:strategi_budaya', 'map_reduce', 'pcb'),
+    'program_budaya': ('model', 'prompt:program_budaya', 'map_reduce', 'pcb'),
+    'impact': ('model', 'prompt:impact', 'map_reduce', 'impact'),
+    'evidence_comparison': ('model', 'prompt:evidence_comparison', 'fungsi', 'evidence_scores'),
+    'survei_comparison': ('model', 'prompt:survei_comparison', 'fungsi', 'survei_scores'),
+}
+
+
+def prompt_inputs(prompts):
+    """{'prompt:<bagian>': (versi, template...)} dari {bagian: tuple fungsi/teks pembentuk prompt}."""
+    return {f'prompt:{key}': (PROMPT_VERSIONS[key],) + tuple(material) for key, material in prompts.items()}
+
+
+@functools.lru_cache(maxsize=None)
+def _source(func):
+    try:
+        return inspect.getsource(func)
+    except (OSError, TypeError):
+        return f"{func.__module__}.{func.__qualname__}"
+
+
+def fingerprint_value(value):
+    """Hash SHA-256 stabil untuk teks, DataFrame, fungsi (kode sumbernya), atau tuple/list dari semuanya."""
+    digest = hashlib.sha256()
+    _update(digest, value)
+    return digest.hexdigest()
+
+
+def _update(digest, value):
+    # pandas tidak di-import di sini: jika belum dimuat, value pasti bukan DataFrame
+    pd = sys.modules.get('pandas')
+    if pd is not None and isinstance(value, pd.DataFrame):
+        digest.update(b'df:')
+        digest.update(repr(list(value.columns)).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(value, index=False).values.tobytes())
+    elif isinstance(value, (tuple, list)):
+        digest.update(f'seq{len(value)}:'.encode('utf-8'))
+        for item in value:
+            _update(digest, item)
+    elif value is None:
+        digest.update(b'none;')
+    elif callable(value):
+        # Fungsi pembentuk prompt: kode sumbernya (template & max_tokens) ikut di-hash
+        source = _source(value).encode('utf-8')
+        digest.update(f'code{len(source)}:'.encode('utf-8') + source)
+    else:
+        text = str(value).encode('utf-8')
+        digest.update(f'str{len(text)}:'.encode('utf-8') + text)
+
+
+def section_fingerprints(section_keys, inputs):
+    """{bagian: fingerprint} dari fingerprint input yang menjadi dependensinya."""
+    input_fingerprints = {name: fingerprint_value(value) for name, value in inputs.items()}
+    fingerprints = {}
+    for key in section_keys:
+        parts = [f"{name}={input_fingerprints[name]}" for name in SECTION_DEPENDENCIES[key]]
+        fingerprints[key] = hashlib.sha256(f"{key}|{'|'.join(parts)}".encode('utf-8')).hexdigest()
+    return fingerprints
+
+
+def plan_sections(sections, fingerprints, previous, is_error, force=False):
+    """Bagi sections menjadi (yang harus dijalankan, {bagian: hasil lama yang dipakai ulang}).
+
+    previous: {fingerprint: {key hasil: teks}} dari run sebelumnya.
+    """
+    to_run = {}
+    reused = {}
+    for key, section in sections.items():
+        outputs = previous.get(fingerprints[key])
+        if not force and outputs is not None and not any(is_error(text) for text in outputs.values()):
+            reused[key] = outputs
+        else:
+            to_run[key] = section
+    return to_run, reused
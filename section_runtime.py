@@ -0,0 +1,171 @@
+"""Eksekusi paralel bagian laporan: pesan & streaming per worker thread, context var, dan metrik.
+
+Dipakai UI, mode batch, dan modul analisis (notify, current_stream_sink, context var sesi).
+"""
+import contextvars
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import streamlit as st
+
+from metrics import MetricsRecorder
+
+# Jumlah worker untuk menjalankan analisis per bagian secara paralel
+SECTION_WORKERS = int(os.environ.get("RAPPORT_SECTION_WORKERS", "5"))
+
+# Metrik durasi per tahap dan pemakaian token per panggilan LLM (JSON lines; opsional file Prometheus)
+METRICS_PATH = os.environ.get("RAPPORT_METRICS_PATH", os.path.join('.cache', 'metrics.jsonl'))
+METRICS_PROM_PATH = os.environ.get("RAPPORT_METRICS_PROM_PATH") or None
+# File JSON lines dirotasi (satu cadangan .1) saat melebihi ukuran ini
+METRICS_MAX_MB = int(os.environ.get("RAPPORT_METRICS_MAX_MB", "20"))
+
+ERROR_PREFIXES = (
+    "Error calling OpenAI API",
+    "Exception in OpenAI API call",
+    "Error dalam analisis",
+)
+
+def is_error_result(text):
+    return not isinstance(text, str) or text.startswith(ERROR_PREFIXES)
+
+# Konteks per worker thread: pesan st.warning/st.info ditampung dulu lalu ditampilkan di main thread,
+# dan potongan teks streaming diteruskan lewat callback ke main thread
+_section_local = threading.local()
+
+def notify(level, message):
+    messages = getattr(_section_local, 'messages', None)
+    if messages is not None:
+        messages.append((level, message))
+    else:
+        getattr(st, level)(message)
+
+def current_stream_sink():
+    return getattr(_section_local, 'stream', None)
+
+@contextmanager
+def streaming_disabled():
+    """Menonaktifkan streaming sementara (mis. untuk respons JSON yang tidak layak ditampilkan)."""
+    stream = current_stream_sink()
+    _section_local.stream = None
+    try:
+        yield
+    finally:
+        _section_local.stream = stream
+
+@contextmanager
+def notices_to(handler):
+    """Pesan notify() di thread ini diteruskan ke handler(level, message) di akhir blok (mis. di worker
+    tanpa UI), bukan ke st.*."""
+    previous = getattr(_section_local, 'messages', None)
+    messages = _section_local.messages = []
+    try:
+        yield
+    finally:
+        _section_local.messages = previous
+        for level, message in messages:
+            handler(level, message)
+
+# Jika True, call_openai mengabaikan cache dan selalu memanggil API (diset dari sidebar)
+force_refresh_var = contextvars.ContextVar('force_refresh', default=False)
+
+# Bagian laporan yang sedang dikerjakan (label metrik untuk panggilan LLM di dalamnya)
+section_var = contextvars.ContextVar('section', default=None)
+
+# Identitas sesi untuk antrean adil, dan callback posisi antrean (None = tidak ditampilkan)
+session_id_var = contextvars.ContextVar('session_id', default='default')
+queue_position_var = contextvars.ContextVar('queue_position', default=None)
+
+@st.cache_resource
+def get_metrics():
+    return MetricsRecorder(METRICS_PATH, prometheus_path=METRICS_PROM_PATH, max_bytes=METRICS_MAX_MB * 1024 * 1024)
+
+def _run_section(func, args, stream=None, section=None, queue_sink=None):
+    _section_local.messages = []
+    _section_local.stream = stream
+    section_var.set(section)
+    queue_position_var.set(queue_sink)
+    try:
+        with get_metrics().timed('section', section=section):
+            result = func(*args)
+    except Exception as e:
+        result = f"Error dalam analisis: {str(e)}\n\nDetail error: {e.__class__.__name__}"
+    finally:
+        messages = _section_local.messages
+        _section_local.messages = None
+        _section_local.stream = None
+    return result, messages
+
+def show_notice(level, message):
+    getattr(st, level)(message)
+
+def run_sections_concurrently(sections, on_section_done=None, max_workers=SECTION_WORKERS,
+                              notice_handler=show_notice, on_section_update=None, on_queue_update=None):
+    """Menjalankan beberapa analisis sekaligus.
+
+    sections: dict {key: (label, func, args)}; func boleh mengembalikan dict {key: teks} untuk
+    beberapa bagian sekaligus. on_section_done(key, label, done, total)
+    dan notice_handler(level, message) dipanggil di thread pemanggil setiap kali satu bagian selesai.
+    Jika on_section_update(key, text) diberikan, call_openai berjalan dalam mode streaming dan
+    callback ini menerima teks sementara tiap bagian selama token masih berdatangan, lalu teks akhirnya.
+    on_queue_update(key, posisi) menerima posisi antrean OpenAI saat sebuah bagian harus menunggu
+    (posisi None berarti request sudah dikirim).
+    """
+    results = {}
+    labels = {key: label for key, (label, _, _) in sections.items()}
+    total = len(sections)
+    events = queue.Queue()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        for key, (label, func, args) in sections.items():
+            stream = None
+            if on_section_update is not None:
+                stream = lambda delta, key=key: events.put(('delta', key, delta))
+            queue_sink = None
+            if on_queue_update is not None:
+                queue_sink = lambda position, key=key: events.put(('queue', key, position))
+            future = executor.submit(contextvars.copy_context().run, _run_section, func, args, stream, key,
+                                     queue_sink)
+            future.add_done_callback(lambda f, key=key: events.put(('done', key, f)))
+
+        partial = {}
+        done = 0
+        done_keys = set()
+        while done < total:
+            batch = [events.get()]
+            while True:
+                try:
+                    batch.append(events.get_nowait())
+                except queue.Empty:
+                    break
+            # Gabungkan semua delta yang sudah menumpuk agar UI cukup digambar ulang sekali per bagian
+            updated = []
+            for kind, key, payload in batch:
+                if kind == 'queue':
+                    if key not in done_keys:
+                        on_queue_update(key, payload)
+                    continue
+                if kind == 'delta':
+                    partial[key] = partial.get(key, '') + payload
+                    if key not in updated:
+                        updated.append(key)
+                    continue
+                result, messages = payload.result()
+                for level, message in messages:
+                    notice_handler(level, message)
+                # Satu bagian boleh menghasilkan beberapa hasil sekaligus (dict {key: teks})
+                parts = result if isinstance(result, dict) else {key: result}
+                for part_key, text in parts.items():
+                    results[part_key] = text
+                    if on_section_update is not None:
+                        on_section_update(part_key, text)
+                done += 1
+                done_keys.add(key)
+                if on_section_done is not None:
+                    on_section_done(key, labels[key], done, total)
+            for key in updated:
+                if key not in done_keys:
+                    on_section_update(key, partial[key])
+    return results
+
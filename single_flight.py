@@ -0,0 +1,72 @@
+"""Penggabungan (single-flight) request identik yang sedang berjalan.
+
+Pemanggil pertama untuk sebuah key menjalankan fungsi; pemanggil berikutnya dengan key yang sama
+selama fungsi masih berjalan menunggu dan memakai hasil yang sama. Potongan teks streaming dari
+pemanggil pertama diteruskan juga ke pemanggil yang ikut menunggu.
+"""
+import threading
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.deltas = []
+        self.subscribers = []
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._flights)
+
+    def do(self, key, func, on_delta=None):
+        """Jalankan func(publish) sekali per key yang sedang berjalan; kembalikan (hasil, dibagi?).
+
+        publish(delta) dipakai func untuk meneruskan potongan teks ke semua pemanggil.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                # Potongan yang sudah terkirim diulang dulu, sisanya diteruskan langsung
+                for delta in flight.deltas:
+                    if on_delta is not None:
+                        on_delta(delta)
+                if on_delta is not None:
+                    flight.subscribers.append(on_delta)
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if on_delta is not None and not flight.deltas and isinstance(flight.result, str):
+                on_delta(flight.result)
+            return flight.result, True
+
+        def publish(delta):
+            with self._lock:
+                flight.deltas.append(delta)
+                subscribers = list(flight.subscribers)
+            if on_delta is not None:
+                on_delta(delta)
+            for subscriber in subscribers:
+                subscriber(delta)
+
+        try:
+            flight.result = func(publish)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
@@ -0,0 +1,71 @@
+"""AdmissionController: giliran round-robin antar sesi dan penolakan saat antrean penuh."""
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "kondisi tidak tercapai"
+        time.sleep(0.005)
+
+
+def test_sessions_take_turns_round_robin():
+    # 10 request/detik, bucket dikosongkan agar semua request antre
+    controller = AdmissionController(rpm=600)
+    controller.requests.level = 0
+    admitted = []
+    lock = threading.Lock()
+
+    def request(session):
+        controller.acquire(session, tokens=0)
+        with lock:
+            admitted.append(session)
+
+    threads = []
+    for session, count in (('sesi-a', 4), ('sesi-b', 2)):
+        for _ in range(count):
+            thread = threading.Thread(target=request, args=(session,))
+            thread.start()
+            threads.append(thread)
+        wait_until(lambda: controller.stats()['waiting'] + len(admitted) == len(threads))
+    for thread in threads:
+        thread.join(timeout=5)
+
+    # Sesi B tidak menunggu semua request sesi A selesai
+    assert admitted == ['sesi-a', 'sesi-b', 'sesi-a', 'sesi-b', 'sesi-a', 'sesi-a']
+
+
+def test_reports_queue_position_to_waiters():
+    controller = AdmissionController(rpm=600)
+    controller.requests.level = 0
+    positions = []
+    blocker = threading.Thread(target=controller.acquire, args=('sesi-a', 0))
+    blocker.start()
+    wait_until(lambda: controller.stats()['waiting'] == 1)
+    controller.acquire('sesi-b', 0, on_position=positions.append)
+    blocker.join(timeout=5)
+    assert positions[0] == 1 and positions[-1] == 0
+
+
+def test_rejects_when_queue_is_full_or_wait_too_long():
+    controller = AdmissionController(rpm=1, max_queue=1, max_wait=0.2)
+    controller.requests.level = 0
+    waiter = threading.Thread(target=lambda: pytest.raises(AdmissionRejected, controller.acquire, 'sesi-a', 0))
+    waiter.start()
+    wait_until(lambda: controller.stats()['waiting'] == 1)
+    with pytest.raises(AdmissionRejected):
+        controller.acquire('sesi-b', 0)
+    waiter.join(timeout=5)
+    assert controller.stats() == {'waiting': 0, 'sessions_waiting': 0}
+
+
+def test_settle_returns_unused_tokens():
+    controller = AdmissionController(tpm=1000)
+    reserved = controller.acquire('sesi-a', tokens=800)
+    controller.settle(reserved, used=300)
+    assert controller.tokens.level == pytest.approx(1000 - 800 + 500, abs=1)
@@ -0,0 +1,118 @@
+"""Antrean job: klaim oleh dua worker (dua koneksi ke satu database), lease, percobaan ulang, job kembar."""
+import threading
+import time
+
+import pytest
+
+from job_queue import JobQueue
+
+FILES = {'pcb': [('PCB.xlsx', b'pcb')], 'impact': []}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'jobs.sqlite')
+
+
+def make_queue(db_path, **kwargs):
+    kwargs.setdefault('retry_seconds', 0)
+    return JobQueue(db_path, **kwargs)
+
+
+def test_concurrent_claimers_never_share_a_job(db_path):
+    producer = make_queue(db_path)
+    job_ids = {producer.enqueue('HSH', f'Fungsi {i}', FILES) for i in range(30)}
+    claimed = {'a': [], 'b': []}
+
+    def claim_all(name):
+        jobs = make_queue(db_path)
+        while True:
+            job = jobs.claim(name)
+            if job is None:
+                return
+            claimed[name].append(job['id'])
+
+    threads = [threading.Thread(target=claim_all, args=(name,)) for name in claimed]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not set(claimed['a']) & set(claimed['b'])
+    assert set(claimed['a']) | set(claimed['b']) == job_ids
+
+
+def test_expired_lease_is_reclaimed_and_old_owner_is_fenced(db_path):
+    first = make_queue(db_path, lease_seconds=0.2)
+    second = make_queue(db_path, lease_seconds=0.2)
+    job_id = first.enqueue('HSH', 'Fungsi', FILES)
+    assert first.claim('w1')['id'] == job_id
+    assert second.claim('w2') is None
+
+    time.sleep(0.3)
+    reclaimed = second.claim('w2')
+    assert reclaimed['id'] == job_id and reclaimed['attempts'] == 2
+
+    # Worker lama tidak boleh lagi memperpanjang, menggagalkan, atau menyelesaikan job
+    assert not first.heartbeat(job_id, 'w1', {'percent': 50})
+    assert not first.fail(job_id, 'w1', 'gagal')
+    first.complete(job_id, 'w1', {'impact': 'lama'}, b'old', 'old.docx')
+    assert first.get(job_id)['status'] == 'running'
+
+    second.complete(job_id, 'w2', {'impact': 'baru'}, b'new', 'new.docx')
+    job = first.get(job_id, with_docx=True)
+    assert job['status'] == 'done' and job['docx'] == b'new' and job['sections'] == {'impact': 'baru'}
+    assert first.files(job_id) == {}
+
+
+def test_failed_job_is_retried_with_backoff_until_attempts_run_out(db_path):
+    jobs = make_queue(db_path, max_attempts=2, retry_seconds=0.2)
+    job_id = jobs.enqueue('HSH', 'Fungsi', FILES)
+    jobs.claim('w1')
+    assert jobs.fail(job_id, 'w1', 'HTTP 429', {'impact': 'sebagian'})
+    job = jobs.get(job_id)
+    assert job['status'] == 'queued' and job['sections'] == {'impact': 'sebagian'}
+    assert jobs.claim('w1') is None
+
+    time.sleep(0.25)
+    assert jobs.claim('w1')['attempts'] == 2
+    assert not jobs.fail(job_id, 'w1', 'HTTP 429')
+    assert jobs.get(job_id)['status'] == 'failed'
+    assert jobs.files(job_id) == {}
+
+
+def test_abandoned_job_fails_when_attempts_are_exhausted(db_path):
+    jobs = make_queue(db_path, max_attempts=1, lease_seconds=0.1)
+    job_id = jobs.enqueue('HSH', 'Fungsi', FILES)
+    jobs.claim('w1')
+    time.sleep(0.15)
+    assert jobs.claim('w2') is None
+    assert jobs.get(job_id)['status'] == 'failed'
+
+
+def test_twin_job_waits_for_the_running_one(db_path):
+    jobs = make_queue(db_path)
+    first = jobs.enqueue('HSH', 'Fungsi', FILES)
+    twin = jobs.enqueue('HSH', 'Fungsi', FILES)
+    other = jobs.enqueue('HSH', 'Fungsi lain', FILES)
+
+    assert jobs.claim('w1')['id'] == first
+    # Job kembar dilewati; job dengan input lain tetap bisa diambil
+    assert jobs.running_twin(twin) == first
+    assert jobs.claim('w2')['id'] == other
+    assert jobs.claim('w3') is None
+
+    jobs.complete(first, 'w1', {}, b'docx', 'a.docx')
+    assert jobs.running_twin(twin) is None
+    assert jobs.claim('w3')['id'] == twin
+
+
+def test_section_outputs_with_errors_do_not_replace_good_results(db_path):
+    jobs = make_queue(db_path)
+
+    def is_error(text):
+        return not isinstance(text, str) or text.startswith('Error')
+
+    jobs.save_section_outputs({'fp1': {'impact': 'baik'}}, is_error)
+    jobs.save_section_outputs({'fp1': {'impact': 'Error calling OpenAI API: 500'},
+                               'fp2': {'strategi_budaya': 'ok', 'program_budaya': None}}, is_error)
+    assert jobs.section_outputs(['fp1', 'fp2']) == {'fp1': {'impact': 'baik'}}
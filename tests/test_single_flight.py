@@ -0,0 +1,87 @@
+"""SingleFlight: pemanggil yang ikut menunggu memakai hasil (dan potongan streaming) pemanggil pertama."""
+import threading
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_followers_share_the_leader_result_and_stream():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def work(publish):
+        calls.append(1)
+        publish('Halo ')
+        started.set()
+        release.wait(5)
+        publish('dunia')
+        return 'Halo dunia'
+
+    results = {}
+
+    def call(name):
+        deltas = []
+        result, shared = flight.do('key', work, on_delta=deltas.append)
+        results[name] = (result, shared, ''.join(deltas))
+
+    leader = threading.Thread(target=call, args=('leader',))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=call, args=(f'f{i}',)) for i in range(3)]
+    for thread in followers:
+        thread.start()
+    threading.Event().wait(0.05)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(timeout=5)
+
+    assert len(calls) == 1
+    assert results['leader'] == ('Halo dunia', False, 'Halo dunia')
+    for name in ('f0', 'f1', 'f2'):
+        # Potongan yang terkirim sebelum ikut menunggu diulang lebih dulu
+        assert results[name] == ('Halo dunia', True, 'Halo dunia')
+    assert flight.in_flight() == 0
+
+
+def test_leader_error_reaches_followers_and_is_not_cached():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing(publish):
+        started.set()
+        release.wait(5)
+        raise RuntimeError("HTTP 500")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do('key', failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    started.wait(5)
+    threads.append(threading.Thread(target=call))
+    threads[1].start()
+    threading.Event().wait(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert errors == ['HTTP 500', 'HTTP 500']
+
+    # Key yang gagal dijalankan ulang pada panggilan berikutnya
+    assert flight.do('key', lambda publish: 'ok') == ('ok', False)
+
+
+def test_different_keys_run_independently():
+    flight = SingleFlight()
+    assert flight.do('a', lambda publish: 1) == (1, False)
+    assert flight.do('b', lambda publish: 2) == (2, False)
+    with pytest.raises(ValueError):
+        flight.do('c', lambda publish: int('x'))
@@ -0,0 +1,64 @@
+"""Estimasi token dan pemecahan teks panjang menjadi potongan dengan batas token.
+
+Potongan dibuat per baris/paragraf; hanya baris yang sendirinya melebihi batas yang dipotong
+di tengah (pada batas token jika tiktoken terpasang, selain itu pada batas karakter).
+"""
+# Perkiraan karakter per token jika tiktoken tidak tersedia
+CHARS_PER_TOKEN = 4
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """Encoding tiktoken (di-import saat pertama dipakai), atau None jika tiktoken tidak terpasang."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding('o200k_base')
+        except ImportError:
+            _encoding = None
+        _encoding_loaded = True
+    return _encoding
+
+
+def estimate_tokens(text):
+    """Jumlah token (tiktoken jika terpasang, selain itu perkiraan ~4 karakter per token)."""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _split_long_line(line, max_tokens):
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(line)
+        return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+    size = max_tokens * CHARS_PER_TOKEN
+    return [line[i:i + size] for i in range(0, len(line), size)]
+
+
+def split_text(text, max_tokens):
+    """Potongan teks berurutan yang masing-masing <= max_tokens (perkiraan)."""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for line in text.splitlines(keepends=True):
+        line_tokens = estimate_tokens(line)
+        if line_tokens > max_tokens:
+            pieces = _split_long_line(line, max_tokens)
+        else:
+            pieces = [line]
+        for piece in pieces:
+            piece_tokens = line_tokens if len(pieces) == 1 else estimate_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("".join(current))
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("".join(current))
+    return chunks
@@ -0,0 +1,166 @@
+"""Ekstraksi teks file upload (Excel, PDF, gambar) dengan cache hasil bersama untuk semua sesi.
+
+Parser PDF, OCR (PIL/pytesseract), dan openpyxl baru di-import saat file jenis tersebut pertama
+kali diproses.
+"""
+import hashlib
+import logging
+import os
+
+import streamlit as st
+
+from llm_cache import LLMResponseCache
+from section_runtime import notify
+
+logger = logging.getLogger(__name__)
+
+# Batas ekstraksi PDF (halaman & karakter) dan jumlah proses paralel
+PDF_MAX_PAGES = int(os.environ.get("RAPPORT_PDF_MAX_PAGES", "100"))
+PDF_MAX_CHARS = int(os.environ.get("RAPPORT_PDF_MAX_CHARS", "200000"))
+PDF_WORKERS = int(os.environ.get("RAPPORT_PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# OCR: jumlah proses, timeout per gambar (detik), target DPI, dan cache hasil di disk
+OCR_WORKERS = int(os.environ.get("RAPPORT_OCR_WORKERS", "2"))
+OCR_TIMEOUT = int(os.environ.get("RAPPORT_OCR_TIMEOUT", "60"))
+OCR_TARGET_DPI = int(os.environ.get("RAPPORT_OCR_TARGET_DPI", "300"))
+OCR_CACHE_PATH = os.environ.get("RAPPORT_OCR_CACHE_PATH", os.path.join('.cache', 'ocr_results.sqlite'))
+
+# Cache hasil ekstraksi file upload (bersama untuk semua sesi), key = SHA-256 isi file + versi ekstraktor
+EXTRACT_CACHE_PATH = os.environ.get("RAPPORT_EXTRACT_CACHE_PATH", os.path.join('.cache', 'extracted_uploads.sqlite'))
+EXTRACT_CACHE_MAX_MB = int(os.environ.get("RAPPORT_EXTRACT_CACHE_MAX_MB", "200"))
+# Naikkan jika logika ekstraksi (Excel/PDF) berubah agar hasil lama di cache tidak dipakai
+EXTRACTOR_VERSION = 1
+
+IMAGE_EXTENSIONS = ['png', 'jpg', 'jpeg', 'tif', 'tiff']
+UPLOAD_TYPES = ['xlsx', 'xls', 'pdf'] + IMAGE_EXTENSIONS
+
+# Executable tesseract; kosong = cari di PATH (lalu lokasi instalasi default di Windows)
+TESSERACT_CMD = os.environ.get("RAPPORT_TESSERACT_CMD", "")
+
+def ocr_page_images(images):
+    try:
+        return "\n".join(get_ocr_engine().ocr_many(images))
+    except Exception as e:
+        return f"Error reading image: {str(e)}"
+
+def extract_text_from_pdf(pdf_file):
+    try:
+        from pdf_extract import extract_pdf_text
+        data = pdf_file.getvalue() if hasattr(pdf_file, 'getvalue') else pdf_file.read()
+        return extract_pdf_text(data, max_pages=PDF_MAX_PAGES, max_chars=PDF_MAX_CHARS,
+                                workers=PDF_WORKERS, ocr=ocr_page_images)
+    except Exception as e:
+        return f"Error reading PDF: {str(e)}"
+
+@st.cache_resource
+def get_ocr_engine():
+    from ocr_engine import OCREngine, find_tesseract
+    return OCREngine(
+        cache=LLMResponseCache(OCR_CACHE_PATH, max_bytes=50 * 1024 * 1024, ttl_seconds=30 * 24 * 3600),
+        workers=OCR_WORKERS,
+        timeout=OCR_TIMEOUT,
+        target_dpi=OCR_TARGET_DPI,
+        tesseract_cmd=find_tesseract(TESSERACT_CMD)
+    )
+
+def extract_text_from_image(image_file):
+    try:
+        data = image_file.getvalue() if hasattr(image_file, 'getvalue') else image_file.read()
+        return get_ocr_engine().ocr_bytes(data)
+    except Exception as e:
+        return f"Error reading image: {str(e)}"
+
+def file_extension_of(uploaded_file):
+    return uploaded_file.name.split('.')[-1].lower()
+
+@st.cache_resource
+def get_extraction_cache():
+    return LLMResponseCache(
+        EXTRACT_CACHE_PATH,
+        max_bytes=EXTRACT_CACHE_MAX_MB * 1024 * 1024,
+        ttl_seconds=30 * 24 * 3600
+    )
+
+def extraction_cache_key(uploaded_file):
+    from ocr_engine import OCR_VERSION
+    digest = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+    extension = file_extension_of(uploaded_file)
+    return f"extract:v{EXTRACTOR_VERSION}.{OCR_VERSION}:{extension}:{PDF_MAX_PAGES}:{PDF_MAX_CHARS}:{digest}"
+
+EXTRACTION_ERROR_MARKERS = ("Error reading", "Format file tidak didukung")
+
+def store_extraction(cache_key, text):
+    # Hasil yang berisi pesan error tidak disimpan agar upload ulang dicoba lagi
+    if text is not None and not any(marker in text for marker in EXTRACTION_ERROR_MARKERS):
+        get_extraction_cache().set(cache_key, text)
+
+def extract_uploaded_file(uploaded_file):
+    if uploaded_file is None:
+        return None
+    
+    file_extension = file_extension_of(uploaded_file)
+    
+    try:
+        if file_extension in ['xlsx', 'xls']:
+            from excel_serializer import serialize_workbook
+            text, stats = serialize_workbook(uploaded_file, file_extension)
+            notify('caption', f"📉 {uploaded_file.name}: {stats['sheets']} sheet, "
+                              f"~{stats['tokens_before']:,} → ~{stats['tokens_after']:,} token")
+            return text
+        elif file_extension == 'pdf':
+            return extract_text_from_pdf(uploaded_file)
+        elif file_extension in IMAGE_EXTENSIONS:
+            return extract_text_from_image(uploaded_file)
+        else:
+            return "Format file tidak didukung"
+    except Exception as e:
+        return f"Error reading file: {str(e)}"
+
+def read_uploaded_file(uploaded_file):
+    """Teks file upload; file yang isinya sama diambil dari cache ekstraksi tanpa parsing/OCR ulang."""
+    if uploaded_file is None:
+        return None
+    cache_key = extraction_cache_key(uploaded_file)
+    cached = get_extraction_cache().get(cache_key)
+    if cached is not None:
+        return cached
+    text = extract_uploaded_file(uploaded_file)
+    store_extraction(cache_key, text)
+    return text
+
+def read_uploaded_files(uploaded_files):
+    """Menggabungkan isi beberapa file upload; gambar yang belum ada di cache di-OCR paralel dalam satu batch."""
+    if not uploaded_files:
+        return None
+    if not isinstance(uploaded_files, (list, tuple)):
+        uploaded_files = [uploaded_files]
+    if len(uploaded_files) == 1:
+        return read_uploaded_file(uploaded_files[0])
+    
+    cache = get_extraction_cache()
+    cache_keys = {id(f): extraction_cache_key(f) for f in uploaded_files}
+    texts = {}
+    for uploaded_file in uploaded_files:
+        cached = cache.get(cache_keys[id(uploaded_file)])
+        if cached is not None:
+            texts[id(uploaded_file)] = cached
+    
+    images = [f for f in uploaded_files
+              if id(f) not in texts and file_extension_of(f) in IMAGE_EXTENSIONS]
+    if len(images) > 1:
+        try:
+            for f, text in zip(images, get_ocr_engine().ocr_many([f.getvalue() for f in images])):
+                texts[id(f)] = text
+                store_extraction(cache_keys[id(f)], text)
+        except Exception:
+            # Dicoba lagi per file di bawah; dicatat agar kegagalan OCR yang sistematis tetap terlihat
+            logger.warning("OCR batch %d gambar gagal, diproses ulang satu per satu", len(images), exc_info=True)
+    
+    parts = []
+    for uploaded_file in uploaded_files:
+        text = texts.get(id(uploaded_file))
+        if text is None:
+            text = extract_uploaded_file(uploaded_file)
+            store_extraction(cache_keys[id(uploaded_file)], text)
+        parts.append(f"=== {uploaded_file.name} ===\n{text}")
+    return "\n\n".join(parts)